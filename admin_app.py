@@ -5,18 +5,29 @@ Shares the same database with main app
 """
 
 import logging
+import os
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from fastapi import FastAPI, Request, status
+import anyio
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.proxyheaders import ProxyHeadersMiddleware
 
+from fixjeict_app.assets import CachedStaticFiles
+from fixjeict_app.auth import verify_admin
 from fixjeict_app.config import settings
-from fixjeict_app.database import init_db
+from fixjeict_app.database import check_db
+from fixjeict_app.metrics import MetricsMiddleware, instrument_sqlalchemy, metrics, metrics_response
+from fixjeict_app.profiler import MODES, ProfilerBusy, profiler
+from fixjeict_app.services.health_service import health_service
+from fixjeict_app.services.image_service import image_service
+from fixjeict_app.services.template_service import template_service
+from fixjeict_app.slow_query_log import log_slow_queries
+from fixjeict_app.tracing import TracingMiddleware, trace_sqlalchemy, tracer
 
 # Configure logging
 logging.basicConfig(
@@ -33,14 +44,37 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info(f"Starting FixJeICT Admin v{settings.APP_VERSION}")
     logger.info(f"Debug mode: {settings.DEBUG}")
 
-    # Initialize database (same as main app)
-    init_db()
-    logger.info("Database initialized")
+    # Schema changes are applied once per deploy by the migration CLI
+    check_db()
+
+    # Reverse routing for url_for() in templates
+    template_service.register_routes(admin_app.routes)
+
+    # Load compiled templates from the bytecode cache before the first request
+    template_service.precompile()
+
+    # Per-route latency and DB time, aggregated across workers at /metrics
+    instrument_sqlalchemy()
+    metrics.start()
+
+    # Statements over SLOW_QUERY_MS, with their plan, for /admin/slow-queries
+    log_slow_queries()
+
+    # Sampled request traces with a span per statement, template and API call
+    trace_sqlalchemy()
+    tracer.start()
+
+    # On-demand profiles of any worker via /admin/debug/profile
+    profiler.start("admin")
 
     yield
 
     # Shutdown
     logger.info("Shutting down FixJeICT Admin")
+    image_service.shutdown()
+    metrics.stop()
+    tracer.stop()
+    profiler.stop()
 
 
 # Create FastAPI application
@@ -71,6 +105,12 @@ admin_app.add_middleware(
 # GZip compression
 admin_app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Request tracing (root span per sampled request)
+admin_app.add_middleware(TracingMiddleware, service="fixjeict-admin")
+
+# Request metrics (outermost, so the measured time includes the other middleware)
+admin_app.add_middleware(MetricsMiddleware, app_name="admin")
+
 
 # Exception handlers
 @admin_app.exception_handler(Exception)
@@ -93,9 +133,17 @@ async def not_found_handler(request: Request, exc: Exception) -> HTMLResponse:
 # Static files (shared with main app)
 static_dir = settings.BASE_DIR / "fixjeict_app" / "static"
 if static_dir.exists():
-    admin_app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+    admin_app.mount("/static", CachedStaticFiles(directory=str(static_dir)), name="static")
     logger.info(f"Static files mounted from: {static_dir}")
 
+# Uploaded images; generated variants are content-addressed and never change
+settings.MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+admin_app.mount(
+    "/media",
+    CachedStaticFiles(directory=str(settings.MEDIA_DIR), immutable_prefix="images/"),
+    name="media",
+)
+
 
 # Include only admin router
 from fixjeict_app.routers import admin
@@ -103,8 +151,9 @@ from fixjeict_app.routers import admin
 admin_app.include_router(admin.router, tags=["Admin"])
 
 
-# Health check endpoint
+# Liveness: the process is up and serving requests; never touches the database
 @admin_app.get("/admin/health")
+@admin_app.get("/admin/health/live")
 async def health_check():
     """Health check endpoint for monitoring"""
     return {
@@ -114,6 +163,83 @@ async def health_check():
     }
 
 
+# Readiness: database, WAL, disk space, event relay, external APIs and backups
+@admin_app.get("/admin/health/ready")
+async def readiness_check():
+    """Readiness probe; 503 when any check fails, "warn" checks still count as ready"""
+    result = await health_service.readiness()
+    return JSONResponse(
+        {"app": f"{settings.APP_NAME} Admin", "version": settings.APP_VERSION, **result},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE if result["status"] == "fail" else status.HTTP_200_OK,
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@admin_app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """Prometheus metrics for all workers of both apps"""
+    return await metrics_response(request)
+
+
+# Profiling (guarded by the admin credentials; PROFILER_ENABLED=false removes it)
+@admin_app.get("/admin/debug/workers", include_in_schema=False, dependencies=[Depends(verify_admin)])
+async def debug_workers():
+    """Workers of both apps that can be profiled"""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return {"this_worker": os.getpid(), "workers": await anyio.to_thread.run_sync(profiler.workers)}
+
+
+@admin_app.get("/admin/debug/profile", include_in_schema=False, dependencies=[Depends(verify_admin)])
+async def debug_profile(
+    seconds: float = 10,
+    mode: str = "cpu",
+    pid: Optional[int] = None,
+    interval_ms: Optional[float] = None,
+    idle: bool = False,
+):
+    """
+    Profile a worker for `seconds`: mode=cpu returns collapsed stacks for a
+    flamegraph, mode=alloc a tracemalloc growth report. Without `pid` this
+    admin worker is profiled; see /admin/debug/workers for the others.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if mode not in MODES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"mode must be one of {', '.join(MODES)}")
+    if not 0 < seconds <= settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be between 0 and {settings.PROFILE_MAX_SECONDS:g}",
+        )
+    if interval_ms is not None and interval_ms < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="interval_ms must be at least 1")
+
+    target = pid or os.getpid()
+    if target == os.getpid():
+        try:
+            body = await anyio.to_thread.run_sync(profiler.run, mode, seconds, interval_ms, idle)
+        except ProfilerBusy as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        status_code = status.HTTP_200_OK
+    else:
+        workers = await anyio.to_thread.run_sync(profiler.workers)
+        if target not in {worker["pid"] for worker in workers}:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No profilable worker with pid {target}")
+        status_code, body = await profiler.request(target, mode, seconds, interval_ms, idle)
+
+    if status_code != status.HTTP_200_OK:
+        raise HTTPException(status_code=status_code, detail=body)
+    extension = "collapsed" if mode == "cpu" else "txt"
+    return PlainTextResponse(
+        body,
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{target}-{mode}-{int(time.time())}.{extension}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -2,19 +2,30 @@ import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 from starlette.middleware.proxyheaders import ProxyHeadersMiddleware
+from starlette.types import Receive, Scope, Send
 
+from fixjeict_app.assets import CachedStaticFiles
 from fixjeict_app.config import settings
-from fixjeict_app.database import init_db
+from fixjeict_app.database import check_db
+from fixjeict_app.metrics import MetricsMiddleware, instrument_sqlalchemy, metrics, metrics_response
+from fixjeict_app.profiler import profiler
+from fixjeict_app.services.attachment_service import ATTACHMENT_PATH
+from fixjeict_app.services.event_service import event_hub
+from fixjeict_app.services.health_service import health_service
+from fixjeict_app.services.image_service import image_service
+from fixjeict_app.services.kb_index import kb_index
+from fixjeict_app.services.template_service import template_service
+from fixjeict_app.slow_query_log import log_slow_queries
+from fixjeict_app.tracing import TracingMiddleware, trace_sqlalchemy, tracer
 
 # Configure logging
 logging.basicConfig(
@@ -32,14 +43,41 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info(f"Debug mode: {settings.DEBUG}")
     logger.info(f"Database: {settings.DATABASE_URL}")
 
-    # Initialize database
-    init_db()
-    logger.info("Database initialized")
+    # Schema changes are applied once per deploy by the migration CLI
+    check_db()
+
+    # Reverse routing for url_for() in templates
+    template_service.register_routes(app.routes)
+
+    # Load compiled templates from the bytecode cache before the first request
+    template_service.precompile()
+
+    # Per-route latency and DB time, aggregated across workers at /metrics
+    instrument_sqlalchemy()
+    metrics.start()
+
+    # Statements over SLOW_QUERY_MS, with their plan, for /admin/slow-queries
+    log_slow_queries()
+
+    # Sampled request traces with a span per statement, template and API call
+    trace_sqlalchemy()
+    tracer.start()
+
+    # Lets the admin portal profile this worker (/admin/debug/profile?pid=...)
+    profiler.start("main")
+
+    # Knowledge base suggestions and related articles, built off the request path
+    kb_index.start()
 
     yield
 
     # Shutdown
     logger.info(f"Shutting down {settings.APP_NAME}")
+    event_hub.close()
+    image_service.shutdown()
+    metrics.stop()
+    tracer.stop()
+    profiler.stop()
 
 
 # Create FastAPI application
@@ -67,8 +105,22 @@ app.add_middleware(
     https_only=settings.is_production,
 )
 
-# GZip compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# GZip compression, except for attachment downloads
+class ContentGZipMiddleware(GZipMiddleware):
+    """
+    Attachments are sent by FileResponse as they are on disk (sendfile where
+    the server supports it), and some Starlette versions would also gzip
+    their 206 Range responses; so they bypass compression.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and ATTACHMENT_PATH.match(scope["path"]):
+            await self.app(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
+
+
+app.add_middleware(ContentGZipMiddleware, minimum_size=1000)
 
 # CORS (be permissive in development, restrictive in production)
 app.add_middleware(
@@ -83,6 +135,12 @@ app.add_middleware(
 if settings.is_production:
     app.add_middleware(HTTPSRedirectMiddleware)
 
+# Request tracing (root span per sampled request)
+app.add_middleware(TracingMiddleware, service="fixjeict-main")
+
+# Request metrics (outermost, so the measured time includes the other middleware)
+app.add_middleware(MetricsMiddleware, app_name="main")
+
 
 # Exception handlers
 @app.exception_handler(Exception)
@@ -105,9 +163,17 @@ async def not_found_handler(request: Request, exc: Exception) -> HTMLResponse:
 # Static files
 static_dir = settings.BASE_DIR / "fixjeict_app" / "static"
 if static_dir.exists():
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+    app.mount("/static", CachedStaticFiles(directory=str(static_dir)), name="static")
     logger.info(f"Static files mounted from: {static_dir}")
 
+# Uploaded images; generated variants are content-addressed and never change
+settings.MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+app.mount(
+    "/media",
+    CachedStaticFiles(directory=str(settings.MEDIA_DIR), immutable_prefix="images/"),
+    name="media",
+)
+
 
 # Include routers
 from fixjeict_app.routers import admin, auth, public, tickets
@@ -118,8 +184,9 @@ app.include_router(tickets.router, tags=["Tickets"])
 app.include_router(admin.router, tags=["Admin"])
 
 
-# Health check endpoint
+# Liveness: the process is up and serving requests; never touches the database
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
     """Health check endpoint for monitoring"""
     return {
@@ -129,16 +196,45 @@ async def health_check():
     }
 
 
+# Readiness: database, WAL, disk space, event relay, external APIs and backups
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe; 503 when any check fails, "warn" checks still count as ready"""
+    result = await health_service.readiness()
+    return JSONResponse(
+        {"app": settings.APP_NAME, "version": settings.APP_VERSION, **result},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE if result["status"] == "fail" else status.HTTP_200_OK,
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """Prometheus metrics for all workers of both apps; on the public app only with METRICS_TOKEN set"""
+    if not settings.METRICS_TOKEN:
+        # Without a token, scrape the admin port instead
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return await metrics_response(request)
+
+
 # Note: The root route "/" is handled by public.router, so no need to define it here
 
 
 if __name__ == "__main__":
+    import os
+
     import uvicorn
 
+    from fixjeict_app.prestart import run as prestart
+
+    # Migrations, assets and templates once here instead of in every worker
+    prestart()
+    os.environ["AUTO_MIGRATE"] = "false"
+
     uvicorn.run(
         "app:app",
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
-        workers=1 if settings.DEBUG else settings.WORKERS,
+        workers=1 if settings.DEBUG else settings.worker_count,
     )
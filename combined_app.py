@@ -0,0 +1,92 @@
+"""
+Combined application - main app and admin portal in one process
+For small servers: both apps share the engine pools, template caches and
+background threads instead of running as two sets of processes.
+
+Requests arriving on ADMIN_PORT (or with Host: ADMIN_HOST) go to the admin
+app, everything else to the main app. Each app keeps its own middleware,
+so the session cookies stay separate (fixjeict_session vs
+fixjeict_admin_session) and the admin port can still be firewalled.
+    python -m fixjeict_app.serve combined
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from starlette.routing import Router
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from admin_app import admin_app
+from app import app
+from fixjeict_app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_) -> AsyncGenerator[None, None]:
+    """Start up both apps; the shared services only start once"""
+    async with app.router.lifespan_context(app):
+        async with admin_app.router.lifespan_context(admin_app):
+            logger.info(
+                f"Serving the admin portal on port {settings.ADMIN_PORT}"
+                + (f" and host {settings.ADMIN_HOST}" if settings.ADMIN_HOST else "")
+            )
+            yield
+
+
+class AppDispatcher:
+    """Sends each request to the main or the admin app, by listener port or Host header"""
+
+    def __init__(self, main: ASGIApp, admin: ASGIApp, admin_port: int, admin_host: str = ""):
+        self.main = main
+        self.admin = admin
+        self.admin_port = admin_port
+        self.admin_host = admin_host.lower().encode()
+        # Runs the lifespan of both apps, like FastAPI.router does for one
+        self.router = Router(lifespan=lifespan)
+
+    def is_admin(self, scope: Scope) -> bool:
+        # The port of the socket that accepted the connection, not the one the client asked for
+        server = scope.get("server")
+        if server and server[1] == self.admin_port:
+            return True
+        if self.admin_host:
+            for name, value in scope["headers"]:
+                if name == b"host":
+                    return value.lower().split(b":")[0] == self.admin_host
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.router(scope, receive, send)
+        elif self.is_admin(scope):
+            await self.admin(scope, receive, send)
+        else:
+            await self.main(scope, receive, send)
+
+
+combined_app = AppDispatcher(app, admin_app, settings.ADMIN_PORT, settings.ADMIN_HOST)
+
+
+if __name__ == "__main__":
+    import socket
+
+    import uvicorn
+
+    from fixjeict_app.prestart import run as prestart
+
+    # Migrations, assets and templates before the apps start
+    prestart()
+
+    # One server process listening on both ports
+    sockets = []
+    for port in (settings.PORT, settings.ADMIN_PORT):
+        sock = socket.socket(socket.AF_INET6 if ":" in settings.HOST else socket.AF_INET)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((settings.HOST, port))
+        sockets.append(sock)
+
+    server = uvicorn.Server(uvicorn.Config(combined_app))
+    server.run(sockets=sockets)
@@ -0,0 +1,43 @@
+"""
+Ticket archival CLI.
+
+Usage:
+    python -m fixjeict_app.archive run [--months N]
+    python -m fixjeict_app.archive sizes
+"""
+
+import argparse
+import logging
+import sys
+
+from .database import SessionLocal
+from .services.archive_service import archive_service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m fixjeict_app.archive")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Archive long-closed tickets")
+    run_parser.add_argument("--months", type=int, help="Override ARCHIVE_AFTER_MONTHS")
+    subparsers.add_parser("sizes", help="Show hot and archive table sizes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        if args.command == "run":
+            moved = archive_service.archive_closed_tickets(db, months=args.months)
+            print(f"Archived {moved} ticket(s)")
+            return 0
+
+        for table in archive_service.table_sizes(db):
+            size = f"{table['bytes']} bytes" if table["bytes"] is not None else ""
+            print(f"{table['table']:<24} {table['rows']:>10} rows  {size}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
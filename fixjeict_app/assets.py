@@ -0,0 +1,205 @@
+"""
+Static asset pipeline.
+
+`python -m fixjeict_app.assets build` copies every file under
+fixjeict_app/static to static/build/ with a content hash in its name,
+precompresses text assets (gzip, plus brotli when the package is
+installed), writes build/manifest.json and generates the service worker
+with the hashed asset list. Templates resolve hashed names through the
+manifest. Hashed files are served with a one-year immutable Cache-Control.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import stat
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = settings.BASE_DIR / "fixjeict_app" / "static"
+BUILD_DIR = STATIC_DIR / "build"
+MANIFEST_PATH = BUILD_DIR / "manifest.json"
+SERVICE_WORKER_SOURCE = STATIC_DIR / "sw.js"
+SERVICE_WORKER_BUILD = BUILD_DIR / "sw.js"
+
+# Never fingerprinted: the service worker must keep a stable URL
+UNHASHED_FILES = {"sw.js"}
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".json", ".svg", ".txt", ".html", ".map"}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+SW_ASSETS_PATTERN = re.compile(r"const STATIC_ASSETS = \[[\s\S]*?\];")
+
+
+class AssetManifest:
+    """Maps static file names to their fingerprinted build names"""
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = path
+        self._entries: Optional[Dict[str, str]] = None
+
+    def load(self) -> Dict[str, str]:
+        try:
+            self._entries = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            self._entries = {}
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable asset manifest {self.path}: {e}")
+            self._entries = {}
+        return self._entries
+
+    def resolve(self, filename: str) -> str:
+        """Path under /static/ for a file, hashed when the manifest knows it"""
+        entries = self._entries if self._entries is not None else self.load()
+        return entries.get(filename, filename)
+
+
+# Global asset manifest instance
+asset_manifest = AssetManifest()
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with long-lived caching for fingerprinted assets.
+
+    Files under immutable_prefix (build/ by default) never change under the
+    same name, so they are sent with an immutable one-year Cache-Control,
+    and a precompressed .br/.gz sibling is served when the client accepts it. Everything else must be
+    revalidated (cheap thanks to ETag/Last-Modified).
+    """
+
+    def __init__(self, *args, immutable_prefix: str = f"{BUILD_DIR.name}/", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_prefix = immutable_prefix
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        hashed = path.startswith(self.immutable_prefix) and not path.endswith("sw.js")
+        response = None
+        if hashed and scope["method"] in ("GET", "HEAD"):
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if hashed else REVALIDATE_CACHE_CONTROL
+        if hashed:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Optional[Response]:
+        accepted = {
+            token.split(";")[0].strip()
+            for token in Headers(scope=scope).get("accept-encoding", "").split(",")
+        }
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = self.file_response(full_path, stat_result, scope)
+            response.headers["Content-Encoding"] = encoding
+            return response
+        return None
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _compress(path: Path, data: bytes) -> None:
+    """Write .gz and .br siblings when they are actually smaller"""
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gzipped) < len(data):
+        _write_atomic(path.with_name(path.name + ".gz"), gzipped)
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            _write_atomic(path.with_name(path.name + ".br"), compressed)
+
+
+def build_service_worker(manifest: Dict[str, str]) -> Path:
+    """Generate the service worker with the hashed asset list baked in"""
+    assets = ["/"] + [f"/static/{hashed}" for hashed in sorted(manifest.values())]
+    listing = ",\n".join(f"    '{url}'" for url in assets)
+    source = SERVICE_WORKER_SOURCE.read_text()
+    generated, count = SW_ASSETS_PATTERN.subn(lambda _: f"const STATIC_ASSETS = [\n{listing}\n];", source)
+    if not count:
+        raise RuntimeError(f"No STATIC_ASSETS list found in {SERVICE_WORKER_SOURCE}")
+    _write_atomic(SERVICE_WORKER_BUILD, generated.encode())
+    return SERVICE_WORKER_BUILD
+
+
+def build() -> Dict[str, str]:
+    """
+    Fingerprint and precompress all static files; returns the manifest.
+
+    Files from earlier builds are left in place so pages rendered by
+    workers that have not restarted yet keep working.
+    """
+    manifest: Dict[str, str] = {}
+    for path in sorted(STATIC_DIR.rglob("*")):
+        if not path.is_file() or BUILD_DIR in path.parents or path.name in UNHASHED_FILES:
+            continue
+        relative = path.relative_to(STATIC_DIR)
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed = relative.with_name(f"{path.stem}.{digest}{path.suffix}")
+        target = BUILD_DIR / hashed
+
+        if not target.exists():
+            _write_atomic(target, data)
+            if path.suffix in COMPRESSIBLE_SUFFIXES:
+                _compress(target, data)
+        manifest[relative.as_posix()] = f"{BUILD_DIR.name}/{hashed.as_posix()}"
+
+    _write_atomic(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    build_service_worker(manifest)
+    asset_manifest.load()
+    logger.info(f"Built {len(manifest)} static assets into {BUILD_DIR}")
+    return manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m fixjeict_app.assets")
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    manifest = build()
+    for source, hashed in sorted(manifest.items()):
+        print(f"{source} -> {hashed}")
+    if brotli is None:
+        print("brotli not installed: only gzip variants were written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
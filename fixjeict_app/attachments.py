@@ -0,0 +1,48 @@
+"""
+Ticket attachment maintenance CLI.
+
+Usage:
+    python -m fixjeict_app.attachments prune [--min-age-hours N]
+    python -m fixjeict_app.attachments sizes
+"""
+
+import argparse
+import logging
+import sys
+
+from sqlalchemy import func
+
+from .database import SessionLocal
+from .models import Attachment
+from .services.attachment_service import attachment_service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m fixjeict_app.attachments")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prune_parser = subparsers.add_parser("prune", help="Delete files no attachment refers to")
+    prune_parser.add_argument("--min-age-hours", type=float, default=1, help="Keep files younger than this")
+    subparsers.add_parser("sizes", help="Show attachment count and stored bytes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        if args.command == "prune":
+            removed = attachment_service.prune(db, min_age=args.min_age_hours * 3600)
+            print(f"Removed {removed} file(s)")
+            return 0
+
+        count, total = db.query(func.count(Attachment.id), func.coalesce(func.sum(Attachment.size), 0)).one()
+        files = [path for path in attachment_service.directory.glob("*/*") if path.parent.name != "tmp"]
+        stored = sum(path.stat().st_size for path in files)
+        print(f"{count} attachment(s), {total} bytes uploaded")
+        print(f"{len(files)} file(s), {stored} bytes on disk in {attachment_service.directory}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -132,12 +132,18 @@ def require_admin(user: User = Depends(require_login)) -> User:
 
 def has_ticket_access(user: User, ticket_id: int, db: Session) -> bool:
     """Check if user has access to a ticket"""
-    from .models import Ticket
+    from .models import ArchivedTicket, Ticket
 
     ticket = db.query(Ticket).filter_by(id=ticket_id).first()
+    if not ticket:
+        ticket = db.query(ArchivedTicket).filter_by(id=ticket_id).first()
     if not ticket:
         return False
+    return can_access_ticket(user, ticket)
+
 
+def can_access_ticket(user: User, ticket) -> bool:
+    """Check if user has access to a loaded (hot or archived) ticket"""
     # Admin and fixers have access to all tickets
     if user.role in ["admin", "fixer"]:
         # Fixers only have access if they're assigned or ticket is unassigned
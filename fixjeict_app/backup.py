@@ -0,0 +1,423 @@
+"""
+Online, consistent SQLite backups.
+
+Full backups copy the live database through the sqlite3 backup API in page
+steps, so writers keep going while it runs, and stream the copy into a
+compressed file. Incremental backups store only the pages that changed
+since the previous backup. Every backup gets a JSON manifest with per-page
+hashes, used for the next incremental and to verify restores.
+
+Usage:
+    python -m fixjeict_app.backup auto|full|incremental
+    python -m fixjeict_app.backup verify [MANIFEST]
+    python -m fixjeict_app.backup restore MANIFEST DEST
+    python -m fixjeict_app.backup prune
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from .config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, gzip is used instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Give up on paged copying after this many restarts caused by concurrent writes
+MAX_BACKUP_RESTARTS = 5
+
+
+def _page_hash(page: bytes) -> str:
+    return hashlib.blake2b(page, digest_size=16).hexdigest()
+
+
+@contextmanager
+def _open_write(path: Path) -> Iterator[BinaryIO]:
+    """Streaming compressed writer; codec follows the file extension"""
+    if path.name.endswith(".zst"):
+        with open(path, "wb") as raw, zstandard.ZstdCompressor(level=3).stream_writer(raw) as out:
+            yield out
+    else:
+        with gzip.open(path, "wb", compresslevel=6) as out:
+            yield out
+
+
+@contextmanager
+def _open_read(path: Path) -> Iterator[BinaryIO]:
+    if path.name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} is zstd-compressed but the zstandard package is not installed")
+        with open(path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as src:
+            yield src
+    else:
+        with gzip.open(path, "rb") as src:
+            yield src
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class BackupService:
+    """Full and incremental backups of the SQLite database"""
+
+    def __init__(self, db_path: Optional[Path] = None, backup_dir: Optional[Path] = None):
+        self.db_path = Path(db_path or settings.database_path)
+        self.backup_dir = Path(backup_dir or settings.BACKUP_DIR)
+        self.prefix = self.db_path.stem
+        self.extension = ".zst" if zstandard is not None else ".gz"
+
+    # Snapshots
+
+    def _snapshot(self, dest: Path) -> None:
+        """Copy a consistent snapshot of the live database to dest"""
+        restarts = 0
+        last_remaining = None
+
+        def progress(status, remaining, total):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > MAX_BACKUP_RESTARTS:
+                    raise sqlite3.OperationalError(f"backup restarted {restarts} times")
+            last_remaining = remaining
+
+        src = sqlite3.connect(str(self.db_path), timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000)
+        dst = sqlite3.connect(str(dest))
+        try:
+            src.backup(dst, pages=settings.BACKUP_PAGES_PER_STEP, progress=progress)
+        finally:
+            dst.close()
+            src.close()
+
+    def _snapshot_with_fallback(self, dest: Path) -> None:
+        try:
+            self._snapshot(dest)
+        except sqlite3.OperationalError as e:
+            # Busy enough that paged copying keeps restarting: in WAL mode a
+            # single-step copy only holds a read snapshot and does not block writers
+            logger.warning(f"Paged backup failed ({e}), retrying in a single step")
+            dest.unlink(missing_ok=True)
+            src = sqlite3.connect(str(self.db_path))
+            dst = sqlite3.connect(str(dest))
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+
+    @staticmethod
+    def _page_size(path: Path) -> int:
+        conn = sqlite3.connect(str(path))
+        try:
+            return conn.execute("PRAGMA page_size").fetchone()[0]
+        finally:
+            conn.close()
+
+    def _new_name(self) -> str:
+        stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        name = f"{self.prefix}_{stamp}"
+        counter = 1
+        while (self.backup_dir / f"{name}.json").exists():
+            counter += 1
+            name = f"{self.prefix}_{stamp}_{counter}"
+        return name
+
+    # Manifests
+
+    def manifests(self) -> List[Dict]:
+        """All backup manifests, oldest first"""
+        result = []
+        for path in sorted(self.backup_dir.glob(f"{self.prefix}_*.json")):
+            try:
+                manifest = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable manifest {path.name}: {e}")
+                continue
+            manifest["manifest"] = path.name
+            result.append(manifest)
+        result.sort(key=lambda m: m["created_at"])
+        return result
+
+    def _load_manifest(self, name: str) -> Dict:
+        path = self.backup_dir / name
+        manifest = json.loads(path.read_text())
+        manifest["manifest"] = path.name
+        return manifest
+
+    def _write_manifest(self, name: str, manifest: Dict) -> Path:
+        path = self.backup_dir / f"{name}.json"
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, path)
+        return path
+
+    # Backups
+
+    def full(self) -> Path:
+        """Take a full compressed backup; returns the manifest path"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        name = self._new_name()
+        snapshot = self.backup_dir / f"{name}.snapshot"
+        data_file = self.backup_dir / f"{name}.full.db{self.extension}"
+        started = time.monotonic()
+        try:
+            self._snapshot_with_fallback(snapshot)
+            page_size = self._page_size(snapshot)
+            hashes = []
+            digest = hashlib.sha256()
+            with open(snapshot, "rb") as src, _open_write(data_file) as out:
+                while True:
+                    page = src.read(page_size)
+                    if not page:
+                        break
+                    hashes.append(_page_hash(page))
+                    digest.update(page)
+                    out.write(page)
+        finally:
+            snapshot.unlink(missing_ok=True)
+
+        path = self._write_manifest(
+            name,
+            {
+                "type": "full",
+                "created_at": datetime.utcnow().isoformat(),
+                "data_file": data_file.name,
+                "base": f"{name}.json",
+                "parent": None,
+                "page_size": page_size,
+                "page_count": len(hashes),
+                "sha256": digest.hexdigest(),
+                "page_hashes": hashes,
+            },
+        )
+        logger.info(
+            f"Full backup {data_file.name}: {len(hashes)} pages, "
+            f"{data_file.stat().st_size} bytes in {time.monotonic() - started:.1f}s"
+        )
+        return path
+
+    def incremental(self) -> Path:
+        """Store only pages changed since the latest backup; falls back to full"""
+        existing = self.manifests()
+        if not existing:
+            return self.full()
+        parent = existing[-1]
+
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        name = self._new_name()
+        snapshot = self.backup_dir / f"{name}.snapshot"
+        data_file = self.backup_dir / f"{name}.inc{self.extension}"
+        started = time.monotonic()
+        try:
+            self._snapshot_with_fallback(snapshot)
+            page_size = self._page_size(snapshot)
+            if page_size != parent["page_size"]:
+                logger.info("Page size changed since last backup, taking a full backup")
+                return self.full()
+
+            previous = parent["page_hashes"]
+            hashes = []
+            changed = 0
+            digest = hashlib.sha256()
+            with open(snapshot, "rb") as src, _open_write(data_file) as out:
+                page_no = 0
+                while True:
+                    page = src.read(page_size)
+                    if not page:
+                        break
+                    page_hash = _page_hash(page)
+                    hashes.append(page_hash)
+                    digest.update(page)
+                    if page_no >= len(previous) or previous[page_no] != page_hash:
+                        out.write(page_no.to_bytes(4, "big"))
+                        out.write(page)
+                        changed += 1
+                    page_no += 1
+        finally:
+            snapshot.unlink(missing_ok=True)
+
+        path = self._write_manifest(
+            name,
+            {
+                "type": "incremental",
+                "created_at": datetime.utcnow().isoformat(),
+                "data_file": data_file.name,
+                "base": parent["base"],
+                "parent": parent["manifest"],
+                "page_size": page_size,
+                "page_count": len(hashes),
+                "changed_pages": changed,
+                "sha256": digest.hexdigest(),
+                "page_hashes": hashes,
+            },
+        )
+        logger.info(
+            f"Incremental backup {data_file.name}: {changed}/{len(hashes)} pages changed "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        return path
+
+    def auto(self) -> Path:
+        """Full backup once per BACKUP_FULL_INTERVAL_DAYS, incremental otherwise"""
+        fulls = [m for m in self.manifests() if m["type"] == "full"]
+        if fulls:
+            last_full = datetime.fromisoformat(fulls[-1]["created_at"])
+            if datetime.utcnow() - last_full < timedelta(days=settings.BACKUP_FULL_INTERVAL_DAYS):
+                return self.incremental()
+        return self.full()
+
+    # Restore and verification
+
+    def _chain(self, manifest: Dict) -> List[Dict]:
+        chain = [manifest]
+        while chain[0]["parent"]:
+            chain.insert(0, self._load_manifest(chain[0]["parent"]))
+        return chain
+
+    def restore(self, manifest_name: str, dest: Path) -> Path:
+        """Rebuild the database as of a backup into dest and verify it"""
+        target = self._load_manifest(manifest_name)
+        chain = self._chain(target)
+        dest = Path(dest)
+        tmp = dest.with_name(dest.name + ".restoring")
+        page_size = target["page_size"]
+
+        with _open_read(self.backup_dir / chain[0]["data_file"]) as src, open(tmp, "wb") as out:
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                out.write(chunk)
+
+        for step in chain[1:]:
+            with _open_read(self.backup_dir / step["data_file"]) as src, open(tmp, "r+b") as out:
+                while True:
+                    header = _read_exact(src, 4)
+                    if not header:
+                        break
+                    page = _read_exact(src, page_size)
+                    out.seek(int.from_bytes(header, "big") * page_size)
+                    out.write(page)
+                out.truncate(step["page_count"] * page_size)
+
+        self._verify_file(tmp, target)
+        os.replace(tmp, dest)
+        logger.info(f"Restored {manifest_name} ({len(chain)} file(s)) to {dest}")
+        return dest
+
+    @staticmethod
+    def _verify_file(path: Path, manifest: Dict) -> None:
+        digest = hashlib.sha256()
+        with open(path, "rb") as src:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                digest.update(chunk)
+        if digest.hexdigest() != manifest["sha256"]:
+            raise RuntimeError(f"Checksum mismatch restoring {manifest['manifest']}")
+
+        conn = sqlite3.connect(str(path))
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            conn.close()
+        if result != "ok":
+            raise RuntimeError(f"Integrity check failed for {manifest['manifest']}: {result}")
+
+    def verify(self, manifest_name: Optional[str] = None) -> bool:
+        """Restore a backup (default: the latest) to a scratch file and check it"""
+        if manifest_name is None:
+            existing = self.manifests()
+            if not existing:
+                logger.error("No backups to verify")
+                return False
+            manifest_name = existing[-1]["manifest"]
+
+        scratch = self.backup_dir / f".verify-{os.getpid()}.db"
+        try:
+            self.restore(manifest_name, scratch)
+            logger.info(f"Verified {manifest_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Verification of {manifest_name} failed: {e}")
+            return False
+        finally:
+            scratch.unlink(missing_ok=True)
+
+    # Retention
+
+    def prune(self) -> int:
+        """Delete backup chains whose newest backup is past BACKUP_RETENTION_DAYS"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.BACKUP_RETENTION_DAYS)
+        chains: Dict[str, List[Dict]] = {}
+        for manifest in self.manifests():
+            chains.setdefault(manifest["base"], []).append(manifest)
+
+        newest_base = max(chains, key=lambda b: chains[b][-1]["created_at"], default=None)
+        removed = 0
+        for base, members in chains.items():
+            if base == newest_base:
+                continue
+            if datetime.fromisoformat(members[-1]["created_at"]) >= cutoff:
+                continue
+            for manifest in members:
+                (self.backup_dir / manifest["data_file"]).unlink(missing_ok=True)
+                (self.backup_dir / manifest["manifest"]).unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} backup(s) older than {settings.BACKUP_RETENTION_DAYS} days")
+        return removed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m fixjeict_app.backup")
+    parser.add_argument("command", choices=["auto", "full", "incremental", "verify", "restore", "prune"])
+    parser.add_argument("manifest", nargs="?", help="Manifest file name (verify/restore)")
+    parser.add_argument("dest", nargs="?", help="Restore destination path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if settings.database_path is None:
+        print("Backups are only supported for SQLite databases", file=sys.stderr)
+        return 1
+
+    service = BackupService()
+    if args.command in ("auto", "full", "incremental"):
+        path = getattr(service, args.command)()
+        print(path)
+        service.prune()
+        return 0
+    if args.command == "verify":
+        return 0 if service.verify(args.manifest) else 1
+    if args.command == "restore":
+        if not args.manifest or not args.dest:
+            parser.error("restore needs MANIFEST and DEST")
+        service.restore(args.manifest, Path(args.dest))
+        return 0
+    service.prune()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,13 @@
 import logging
+import threading
 from typing import List, Optional
 
-import httpx
 from sqlalchemy.orm import Session
 
 from .config import settings
+from .metrics import track_external
 from .models import Ticket
+from .tracing import KIND_CLIENT, traced
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +21,23 @@ class CloudflareService:
         self.zone_id = settings.CLOUDFLARE_ZONE_ID
         self.email_domain = settings.EMAIL_DOMAIN
         self.base_url = "https://api.cloudflare.com/client/v4"
+        self._http = None
+        self._http_lock = threading.Lock()
 
     def _is_configured(self) -> bool:
         """Check if Cloudflare service is properly configured"""
         return all([self.api_key, self.account_id, self.zone_id, self.email_domain])
 
+    def _client(self):
+        """Shared httpx client, created on first use so importing this module stays cheap"""
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    import httpx
+
+                    self._http = httpx.Client()
+        return self._http
+
     def _get_headers(self) -> dict:
         """Get headers for API requests"""
         return {
@@ -31,6 +45,7 @@ class CloudflareService:
             "Content-Type": "application/json",
         }
 
+    @traced("cloudflare.create_rule", KIND_CLIENT)
     def create_email_forwarding(self, local_part: str, destination_email: str) -> Optional[str]:
         """Create an email forwarding rule via Cloudflare Email Routing"""
         if not self._is_configured():
@@ -59,8 +74,9 @@ class CloudflareService:
 
         try:
             url = f"{self.base_url}/accounts/{self.account_id}/email/routing/rules"
-            response = httpx.post(url, headers=self._get_headers(), json=rule_data)
-            response.raise_for_status()
+            with track_external("cloudflare", "create_rule"):
+                response = self._client().post(url, headers=self._get_headers(), json=rule_data)
+                response.raise_for_status()
             result = response.json()
 
             if result.get("success"):
@@ -71,6 +87,7 @@ class CloudflareService:
             logger.error(f"Failed to create email forwarding: {e}")
             return None
 
+    @traced("cloudflare.delete_rule", KIND_CLIENT)
     def delete_email_forwarding(self, rule_id: str) -> bool:
         """Delete an email forwarding rule"""
         if not self._is_configured():
@@ -78,14 +95,16 @@ class CloudflareService:
 
         try:
             url = f"{self.base_url}/accounts/{self.account_id}/email/routing/rules/{rule_id}"
-            response = httpx.delete(url, headers=self._get_headers())
-            response.raise_for_status()
+            with track_external("cloudflare", "delete_rule"):
+                response = self._client().delete(url, headers=self._get_headers())
+                response.raise_for_status()
             logger.info(f"Deleted email forwarding rule: {rule_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to delete email forwarding: {e}")
             return False
 
+    @traced("cloudflare.list_rules", KIND_CLIENT)
     def list_email_forwardings(self) -> List[dict]:
         """List all email forwarding rules"""
         if not self._is_configured():
@@ -93,8 +112,9 @@ class CloudflareService:
 
         try:
             url = f"{self.base_url}/accounts/{self.account_id}/email/routing/rules"
-            response = httpx.get(url, headers=self._get_headers())
-            response.raise_for_status()
+            with track_external("cloudflare", "list_rules"):
+                response = self._client().get(url, headers=self._get_headers())
+                response.raise_for_status()
             result = response.json()
 
             if result.get("success"):
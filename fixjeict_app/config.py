@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -20,6 +20,49 @@ class Settings(BaseSettings):
         description="Database connection URL"
     )
 
+    AUTO_MIGRATE: bool = Field(
+        default=False,
+        description="Apply pending schema migrations at startup (single-process setups only)"
+    )
+
+    # SQLite connection profile (applied to every new connection)
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(
+        default=5000,
+        description="Milliseconds to wait for a lock before failing with 'database is locked'"
+    )
+    SQLITE_CACHE_SIZE_KB: int = Field(
+        default=64000,
+        description="Page cache size per connection in KiB"
+    )
+    SQLITE_MMAP_SIZE: int = Field(
+        default=268435456,
+        description="Bytes of the database file to memory-map (0 disables mmap)"
+    )
+    SQLITE_SYNCHRONOUS: str = Field(
+        default="NORMAL",
+        description="PRAGMA synchronous level (NORMAL is safe with WAL)"
+    )
+    SQLITE_TEMP_STORE: str = Field(
+        default="MEMORY",
+        description="Where SQLite keeps temporary tables and indices"
+    )
+    SQLITE_FOREIGN_KEYS: bool = Field(
+        default=True,
+        description="Enforce foreign key constraints"
+    )
+    SQLITE_SPLIT_READ_WRITE: bool = Field(
+        default=True,
+        description="Use a separate reader pool and a writer engine for write transactions"
+    )
+    SQLITE_WRITE_POOL_OVERFLOW: int = Field(
+        default=4,
+        description="Writer connections beyond the first; they queue on the SQLite write lock for up to SQLITE_BUSY_TIMEOUT_MS"
+    )
+    SQLITE_READ_POOL_SIZE: int = Field(
+        default=8,
+        description="Number of pooled read-only SQLite connections"
+    )
+
     # Security
     SECRET_KEY: str = Field(
         default="change-this-in-production",
@@ -59,7 +102,272 @@ class Settings(BaseSettings):
     HOST: str = Field(default="0.0.0.0", description="Server host")
     PORT: int = Field(default=5000, description="Server port")
     ADMIN_PORT: int = Field(default=5001, description="Admin port (optional)")
-    WORKERS: int = Field(default=4, description="Number of worker processes")
+    WORKERS: int = Field(default=0, description="Worker processes of the main app; 0 sizes them from the CPU count")
+
+    # Process manager (python -m fixjeict_app.serve)
+    WORKERS_MAX: int = Field(
+        default=8,
+        description="Upper bound for the automatic worker count (SQLite has a single writer)"
+    )
+    PRELOAD_APP: bool = Field(
+        default=True,
+        description="Import the app once in the manager and fork the workers from it"
+    )
+    WORKER_MAX_REQUESTS: int = Field(
+        default=5000,
+        description="Replace a worker after this many requests to cap memory growth (0: never)"
+    )
+    WORKER_MAX_REQUESTS_JITTER: int = Field(
+        default=500,
+        description="Random extra requests per worker so they are not all replaced at once"
+    )
+    WORKER_TIMEOUT: int = Field(
+        default=60,
+        description="Seconds a worker may stop responding before the manager restarts it"
+    )
+    WORKER_GRACEFUL_TIMEOUT: int = Field(
+        default=30,
+        description="Seconds a stopping worker gets to finish in-flight requests"
+    )
+    WORKER_KEEPALIVE: int = Field(default=5, description="Seconds to hold idle keep-alive connections")
+
+    # Combined deployment (python -m fixjeict_app.serve combined)
+    ADMIN_HOST: str = Field(
+        default="",
+        description="Host name that reaches the admin portal in combined mode, besides ADMIN_PORT (empty: port only)"
+    )
+
+    # Real-time events (Server-Sent Events)
+    EVENTS_HEARTBEAT_SECONDS: float = Field(
+        default=15.0,
+        description="Seconds between SSE keep-alive comments"
+    )
+    EVENTS_POLL_INTERVAL: float = Field(
+        default=1.0,
+        description="Seconds between polls for events published by other workers"
+    )
+    EVENTS_QUEUE_SIZE: int = Field(
+        default=50,
+        description="Max buffered events per SSE connection before a resync is forced"
+    )
+    EVENTS_RETENTION_HOURS: int = Field(
+        default=24,
+        description="Hours to keep published events for reconnect replay"
+    )
+
+    # Ticket assignment
+    AUTO_ASSIGN_TICKETS: bool = Field(
+        default=False,
+        description="Assign new tickets to the best-scoring fixer on creation"
+    )
+    ASSIGNMENT_HOURS_WINDOW_DAYS: int = Field(
+        default=7,
+        description="Days of logged time counted towards a fixer's recent workload"
+    )
+    ASSIGNMENT_REFRESH_SECONDS: int = Field(
+        default=300,
+        description="Seconds before in-memory fixer stats are reloaded from the database"
+    )
+
+    # Templates
+    TEMPLATE_CACHE_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / ".template_cache",
+        description="Directory for compiled template bytecode shared by all workers"
+    )
+    TEMPLATE_FRAGMENT_CACHE_SECONDS: int = Field(
+        default=300,
+        description="Default lifetime of {% cache %} template fragments (0 disables)"
+    )
+
+    # Metrics
+    METRICS_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "metrics",
+        description="Directory where each worker process writes its metrics snapshot"
+    )
+    METRICS_FLUSH_SECONDS: float = Field(
+        default=5.0,
+        description="Seconds between metrics snapshots; bounds how stale other workers' numbers are"
+    )
+    METRICS_TOKEN: Optional[str] = Field(
+        default=None,
+        description="Bearer token required for /metrics; when unset only the admin app serves /metrics, without a token"
+    )
+
+    # Tracing
+    TRACE_EXPORTER: str = Field(
+        default="none",
+        description="Where finished spans go: none, file (OTLP/JSON lines in TRACE_FILE) or otlp (HTTP collector)"
+    )
+    TRACE_SAMPLE_RATE: float = Field(
+        default=0.01,
+        description="Fraction of requests traced; an incoming traceparent header overrides it"
+    )
+    TRACE_FILE: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "traces.jsonl",
+        description="Output of the file exporter"
+    )
+    TRACE_OTLP_ENDPOINT: str = Field(
+        default="http://localhost:4318/v1/traces",
+        description="OTLP/HTTP traces endpoint of the collector for the otlp exporter"
+    )
+    TRACE_EXPORT_INTERVAL: float = Field(
+        default=5.0,
+        description="Seconds between span export batches"
+    )
+
+    # Slow-query log
+    SLOW_QUERY_MS: float = Field(
+        default=200.0,
+        description="Statements slower than this are logged with their query plan (0 disables)"
+    )
+    SLOW_QUERY_EXPLAIN: bool = Field(
+        default=True,
+        description="Capture EXPLAIN QUERY PLAN for slow SELECTs (once per query shape per worker)"
+    )
+    SLOW_QUERY_LOG: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "slow_queries.jsonl",
+        description="JSON-lines log shared by all workers, shown at /admin/slow-queries"
+    )
+    SLOW_QUERY_LOG_MAX_MB: int = Field(
+        default=10,
+        description="Size at which the slow-query log is rotated (one old file is kept)"
+    )
+
+    # Profiler (/admin/debug/profile)
+    PROFILER_ENABLED: bool = Field(
+        default=True,
+        description="Allow on-demand CPU and allocation profiles of live workers from the admin portal"
+    )
+    PROFILE_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "profiles",
+        description="Where workers announce themselves and exchange profile requests and results"
+    )
+    PROFILE_MAX_SECONDS: float = Field(
+        default=60.0,
+        description="Longest profile that can be requested"
+    )
+    PROFILE_INTERVAL_MS: float = Field(
+        default=10.0,
+        description="Default time between stack samples for CPU profiles"
+    )
+    PROFILE_TRACEMALLOC_FRAMES: int = Field(
+        default=10,
+        description="Stack depth recorded per allocation in allocation profiles"
+    )
+    PROFILE_POLL_SECONDS: float = Field(
+        default=1.0,
+        description="How often each worker checks for profile requests addressed to it"
+    )
+
+    # Health checks
+    HEALTH_CACHE_SECONDS: float = Field(
+        default=5.0,
+        description="Seconds a readiness result is reused before the checks run again"
+    )
+    HEALTH_DB_TIMEOUT_SECONDS: float = Field(
+        default=2.0,
+        description="Deadline for the readiness database ping"
+    )
+    HEALTH_WAL_WARN_MB: int = Field(
+        default=64,
+        description="WAL file size that marks readiness as degraded"
+    )
+    HEALTH_DISK_MIN_FREE_MB: int = Field(
+        default=500,
+        description="Free space below which readiness fails"
+    )
+    HEALTH_DISK_WARN_PERCENT: float = Field(
+        default=10.0,
+        description="Free space percentage below which readiness is degraded"
+    )
+    HEALTH_BACKUP_MAX_AGE_HOURS: int = Field(
+        default=36,
+        description="Age of the newest backup after which readiness is degraded"
+    )
+
+    # Knowledge base suggestions
+    KB_SUGGEST_LIMIT: int = Field(
+        default=5,
+        description="Articles suggested while a client writes a new ticket"
+    )
+    KB_RELATED_LIMIT: int = Field(
+        default=4,
+        description="Related articles shown below a knowledge base article"
+    )
+    KB_SUGGEST_MIN_SCORE: float = Field(
+        default=0.1,
+        description="Lowest cosine similarity (0-1) an article needs to be suggested"
+    )
+    KB_INDEX_REFRESH_SECONDS: int = Field(
+        default=30,
+        description="How often a worker picks up articles saved by another process"
+    )
+
+    # Service worker
+    SW_PRECACHE_ARTICLES: int = Field(
+        default=20,
+        description="Most viewed knowledge base articles the service worker caches for offline use"
+    )
+
+    # Images
+    MEDIA_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "media",
+        description="Directory for uploaded images and generated variants, served at /media"
+    )
+    IMAGE_WIDTHS: List[int] = Field(
+        default=[320, 640, 960, 1280],
+        description="Widths of the generated responsive image variants"
+    )
+    IMAGE_WORKERS: int = Field(
+        default=2,
+        description="Processes used for image conversion"
+    )
+    IMAGE_MAX_BYTES: int = Field(
+        default=10 * 1024 * 1024,
+        description="Largest source image accepted for upload or download"
+    )
+
+    # Ticket attachments
+    ATTACHMENT_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "attachments",
+        description="Directory for message attachments, stored by content hash (not publicly served)"
+    )
+    ATTACHMENT_MAX_BYTES: int = Field(
+        default=25 * 1024 * 1024,
+        description="Largest file accepted as an attachment"
+    )
+    ATTACHMENT_MAX_FILES: int = Field(
+        default=5,
+        description="Most attachments per message"
+    )
+
+    # Archival
+    ARCHIVE_AFTER_MONTHS: int = Field(
+        default=12,
+        description="Months after closing before a ticket is moved to the archive tables"
+    )
+    ARCHIVE_BATCH_SIZE: int = Field(
+        default=200,
+        description="Tickets moved per archive transaction"
+    )
+
+    # Backups
+    BACKUP_DIR: Path = Field(
+        default=Path("/var/backups/fixjeictv2"),
+        description="Directory for database backups and their manifests"
+    )
+    BACKUP_RETENTION_DAYS: int = Field(
+        default=30,
+        description="Days to keep backup chains"
+    )
+    BACKUP_FULL_INTERVAL_DAYS: int = Field(
+        default=7,
+        description="Days between full backups; incremental backups in between"
+    )
+    BACKUP_PAGES_PER_STEP: int = Field(
+        default=256,
+        description="Pages copied per online backup step before yielding to writers"
+    )
 
     # Paths
     BASE_DIR: Path = Field(default_factory=lambda: Path(__file__).parent.parent)
@@ -80,6 +388,35 @@ class Settings(BaseSettings):
             return Path(self.DATABASE_URL.replace("sqlite:////", ""))
         return None
 
+    @property
+    def worker_count(self) -> int:
+        """WORKERS, or 2 per available CPU plus one (up to WORKERS_MAX) when it is 0"""
+        if self.WORKERS > 0:
+            return self.WORKERS
+        try:
+            cpus = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cpus = os.cpu_count() or 1
+        return max(1, min(2 * cpus + 1, self.WORKERS_MAX))
+
+    @property
+    def is_sqlite(self) -> bool:
+        """Check if the configured database is SQLite"""
+        return self.DATABASE_URL.startswith("sqlite:")
+
+    @property
+    def sqlite_pragmas(self) -> List[Tuple[str, str]]:
+        """PRAGMA statements applied to every SQLite connection, in order"""
+        return [
+            ("journal_mode", "WAL"),
+            ("busy_timeout", str(self.SQLITE_BUSY_TIMEOUT_MS)),
+            ("synchronous", self.SQLITE_SYNCHRONOUS),
+            ("cache_size", str(-abs(self.SQLITE_CACHE_SIZE_KB))),
+            ("mmap_size", str(self.SQLITE_MMAP_SIZE)),
+            ("temp_store", self.SQLITE_TEMP_STORE),
+            ("foreign_keys", "ON" if self.SQLITE_FOREIGN_KEYS else "OFF"),
+        ]
+
     @property
     def is_production(self) -> bool:
         """Check if running in production mode"""
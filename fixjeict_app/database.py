@@ -1,27 +1,79 @@
+import logging
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Generator
 
-from sqlalchemy import create_engine, orm
+from sqlalchemy import Delete, Insert, Update, create_engine, event, orm
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session
 
 from .config import settings
 
-# Create SQLAlchemy engine
-# For SQLite, use check_same_thread=False and enable WAL mode
-if settings.DATABASE_URL.startswith("sqlite:///"):
+logger = logging.getLogger(__name__)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool = False) -> None:
+    """Apply the configured PRAGMA profile to a fresh SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in settings.sqlite_pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+# Create SQLAlchemy engines
+# For SQLite, every new connection gets the PRAGMA profile from settings. Write
+# transactions go through the writer engine, while reads use their own pool so
+# they never wait for it. SQLite only ever has one writer: a session holding a
+# writer connection across an await does not block the pool, but the other
+# writers wait on the database lock (SQLITE_BUSY_TIMEOUT_MS) until it commits.
+if settings.is_sqlite:
     # Ensure the directory exists
     db_path = settings.database_path
     if db_path:
         db_path.parent.mkdir(parents=True, exist_ok=True)
 
-    engine = create_engine(
-        settings.DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        echo=settings.DEBUG,
-        pool_pre_ping=True,
-    )
+    connect_args = {
+        "check_same_thread": False,
+        "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+
+    if settings.SQLITE_SPLIT_READ_WRITE:
+        engine = create_engine(
+            settings.DATABASE_URL,
+            connect_args=connect_args,
+            echo=settings.DEBUG,
+            pool_pre_ping=True,
+            pool_size=1,
+            max_overflow=settings.SQLITE_WRITE_POOL_OVERFLOW,
+        )
+        read_engine = create_engine(
+            settings.DATABASE_URL,
+            connect_args=connect_args,
+            echo=settings.DEBUG,
+            pool_pre_ping=True,
+            pool_size=settings.SQLITE_READ_POOL_SIZE,
+            max_overflow=settings.SQLITE_READ_POOL_SIZE,
+        )
+
+        @event.listens_for(read_engine, "connect")
+        def _on_read_connect(dbapi_connection, connection_record):
+            _apply_sqlite_pragmas(dbapi_connection, read_only=True)
+    else:
+        engine = create_engine(
+            settings.DATABASE_URL,
+            connect_args=connect_args,
+            echo=settings.DEBUG,
+            pool_pre_ping=True,
+        )
+        read_engine = engine
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection)
 else:
     engine = create_engine(
         settings.DATABASE_URL,
@@ -30,9 +82,43 @@ else:
         pool_size=10,
         max_overflow=20,
     )
+    read_engine = engine
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the reader pool until it starts writing.
+
+    The first flush or DML statement moves the session to the writer engine,
+    and every statement after that, reads included, stays there until the
+    transaction commits or rolls back, so the session sees its own
+    uncommitted writes.
+    """
+
+    writing = False
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            self.writing = True
+        super().flush(objects)
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if read_engine is engine:
+            return engine
+        if isinstance(clause, (Insert, Update, Delete)):
+            self.writing = True
+        return engine if self.writing else read_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _end_write(session, transaction):
+    if transaction.parent is None:
+        session.writing = False
+
 
 # Session factory
 SessionLocal = orm.sessionmaker(
+    class_=RoutingSession,
     autocommit=False,
     autoflush=False,
     bind=engine
@@ -72,15 +158,37 @@ def db_session() -> Generator[Session, None, None]:
 
 
 def init_db():
-    """Initialize database tables"""
-    # Import all models to ensure they're registered
-    from . import models  # noqa: F401
-
-    Base.metadata.create_all(bind=engine)
-
-    # Enable WAL mode for SQLite (better concurrency)
-    if settings.DATABASE_URL.startswith("sqlite:///"):
-        with engine.connect() as conn:
-            conn.execute(orm.text("PRAGMA journal_mode=WAL"))
-            conn.execute(orm.text("PRAGMA synchronous=NORMAL"))
-            conn.commit()
+    """Create or upgrade the database schema by applying pending migrations"""
+    from . import migrations
+
+    # SQLite PRAGMAs (WAL, synchronous, ...) are applied per connection by the
+    # connect hooks above
+    migrations.upgrade(engine)
+
+
+def check_db():
+    """
+    Startup check run by each worker.
+
+    Only reads the applied migration versions; the schema itself is changed
+    by `python -m fixjeict_app.migrations upgrade` (or AUTO_MIGRATE).
+    """
+    from . import migrations
+
+    if settings.AUTO_MIGRATE:
+        init_db()
+        return
+
+    pending = migrations.pending(engine)
+    if pending:
+        logger.warning(
+            f"Database schema is {len(pending)} migration(s) behind; "
+            "run: python -m fixjeict_app.migrations upgrade"
+        )
+
+
+def dispose_engines() -> None:
+    """Close pooled connections, e.g. before forking worker processes"""
+    engine.dispose()
+    if read_engine is not engine:
+        read_engine.dispose()
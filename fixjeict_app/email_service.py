@@ -2,11 +2,12 @@ import logging
 import os
 from typing import Optional
 
-import resend
 from sqlalchemy.orm import Session
 
 from .config import settings
+from .metrics import track_external
 from .models import Lead, Message, Ticket, User
+from .tracing import KIND_CLIENT, traced
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +16,22 @@ class EmailService:
     """Email service using Resend API"""
 
     def __init__(self):
-        resend.api_key = settings.RESEND_API_KEY
+        self._resend = None
+
+    def _client(self):
+        """The resend SDK, imported and configured on first use (it pulls in requests)"""
+        if self._resend is None:
+            import resend
+
+            resend.api_key = settings.RESEND_API_KEY
+            self._resend = resend
+        return self._resend
 
     def _is_configured(self) -> bool:
         """Check if email service is properly configured"""
         return bool(settings.RESEND_API_KEY)
 
+    @traced("resend.send", KIND_CLIENT)
     def _send_email(self, to_email: str, subject: str, html_content: str) -> Optional[str]:
         """Send an email and return the message ID"""
         if not self._is_configured():
@@ -37,7 +48,8 @@ class EmailService:
         }
 
         try:
-            result = resend.Emails.send(params)
+            with track_external("resend", "send"):
+                result = self._client().Emails.send(params)
             logger.info(f"Email sent to {to_email}: {result.get('id')}")
             return result.get("id")
         except Exception as e:
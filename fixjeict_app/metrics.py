@@ -0,0 +1,462 @@
+"""
+Prometheus metrics shared by all worker processes.
+
+Each process keeps its metrics in memory and writes a snapshot to
+METRICS_DIR/<pid>.json every METRICS_FLUSH_SECONDS. /metrics merges the
+snapshots of every process, so any worker can answer a scrape for the whole
+service (the main app and the admin portal included). When a worker starts it
+folds the counters and histograms of exited workers into
+METRICS_DIR/aggregate.json before deleting their snapshots, so recycled
+workers never make a counter go down (like prometheus_client's multiprocess
+mode). Gauges only count live processes; "max" gauges keep their highest
+value.
+"""
+
+import contextvars
+import fcntl
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import anyio
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Snapshot holding the totals of exited processes
+AGGREGATE_FILE = "aggregate.json"
+
+# Label used for requests that did not match any route, to keep cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Summed over live processes, or with aggregate="max" the highest value of any process"""
+
+    kind = "gauge"
+
+    def __init__(self, *args, aggregate: str = "sum", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.aggregate = aggregate
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            else:
+                entry[len(self.buckets)] += 1
+            entry[-1] += value
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [[list(key), list(entry)] for key, entry in self._values.items()]
+
+
+class MetricsRegistry:
+    """Process-local metrics plus the snapshot files that aggregate them"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), aggregate: str = "sum") -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, aggregate=aggregate))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    # Snapshot files
+
+    @property
+    def directory(self) -> Path:
+        return settings.METRICS_DIR
+
+    def flush(self) -> None:
+        """Write this process's metrics to its snapshot file"""
+        data = {name: metric.snapshot() for name, metric in self._metrics.items()}
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            _write_json(self.directory / f"{os.getpid()}.json", data)
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def prune(self) -> None:
+        """Fold snapshots of processes that no longer exist into the aggregate and remove them"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / "aggregate.lock", "w") as lock:
+                # Workers starting together must not fold the same snapshot twice
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                dead = [
+                    path for path in self.directory.glob("*.json")
+                    if path.stem.isdigit() and not _pid_alive(int(path.stem))
+                ]
+                if not dead:
+                    return
+                aggregate_path = self.directory / AGGREGATE_FILE
+                merged: Dict[str, Dict[LabelValues, list]] = {}
+                for path in [aggregate_path] + dead:
+                    self._merge(merged, _read_json(path), alive=False)
+                _write_json(
+                    aggregate_path,
+                    {
+                        name: [[list(key), value if self._metrics[name].kind == "histogram" else value[0]]
+                               for key, value in samples.items()]
+                        for name, samples in merged.items()
+                    },
+                )
+                for path in dead:
+                    path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not prune metrics snapshots: {e}")
+
+    def start(self) -> None:
+        """Prune stale snapshots and flush this process's metrics periodically"""
+        if self._flusher is not None:
+            return
+        self.prune()
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def stop(self) -> None:
+        if self._flusher is None:
+            return
+        self._stop.set()
+        self._flusher.join(timeout=5)
+        self._flusher = None
+        self.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(settings.METRICS_FLUSH_SECONDS):
+            self.flush()
+
+    def collect(self) -> Dict[str, Dict[LabelValues, list]]:
+        """Merge the snapshots of all processes"""
+        self.flush()
+        merged: Dict[str, Dict[LabelValues, list]] = {name: {} for name in self._metrics}
+        for path in self.directory.glob("*.json"):
+            alive = _pid_alive(int(path.stem)) if path.stem.isdigit() else False
+            self._merge(merged, _read_json(path), alive)
+        return merged
+
+    def _merge(self, merged: Dict[str, Dict[LabelValues, list]], data: Dict[str, list], alive: bool) -> None:
+        """Add one snapshot to merged; sum gauges are skipped for processes that are gone"""
+        for name, samples in data.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            max_gauge = metric.kind == "gauge" and metric.aggregate == "max"
+            if metric.kind == "gauge" and not alive and not max_gauge:
+                continue
+            target = merged.setdefault(name, {})
+            for key, value in samples:
+                key = tuple(key)
+                if metric.kind == "histogram":
+                    current = target.setdefault(key, [0.0] * len(value))
+                    if len(current) == len(value):
+                        target[key] = [a + b for a, b in zip(current, value)]
+                elif max_gauge:
+                    target[key] = [max(target[key][0], value) if key in target else value]
+                else:
+                    target[key] = [target.get(key, [0.0])[0] + value]
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines: List[str] = []
+        for name, samples in self.collect().items():
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(samples.items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind == "histogram":
+                    cumulative = 0.0
+                    for bound, count in zip(metric.buckets + (float("inf"),), value):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + [('le', le)])} {_number(cumulative)}")
+                    lines.append(f"{name}_count{_labels(labels)} {_number(cumulative)}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(value[-1])}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_number(value[0])}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_json(path: Path) -> Dict[str, list]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: Path, data: Dict[str, list]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+# Global metrics registry instance
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    "fixjeict_http_requests_total", "HTTP requests by route template and status", ("app", "method", "route", "status")
+)
+http_duration = metrics.histogram(
+    "fixjeict_http_request_duration_seconds", "HTTP request duration by route template", ("app", "method", "route")
+)
+http_in_flight = metrics.gauge("fixjeict_http_requests_in_flight", "HTTP requests currently being handled", ("app",))
+db_statements = metrics.counter(
+    "fixjeict_db_statements_total", "SQL statements executed, by the route that issued them", ("app", "route")
+)
+db_seconds = metrics.counter(
+    "fixjeict_db_statement_seconds_total", "Time spent executing SQL, by the route that issued it", ("app", "route")
+)
+external_last = metrics.gauge(
+    "fixjeict_external_last_timestamp_seconds",
+    "Unix time of the most recent external API call, by outcome",
+    ("service", "outcome"),
+    aggregate="max",
+)
+external_duration = metrics.histogram(
+    "fixjeict_external_request_duration_seconds",
+    "Latency of calls to external APIs (Resend, Cloudflare)",
+    ("service", "operation", "outcome"),
+)
+
+
+class _RequestStats:
+    __slots__ = ("statements", "seconds", "scope")
+
+    def __init__(self, scope: Scope):
+        self.statements = 0
+        self.seconds = 0.0
+        self.scope = scope
+
+
+# Set by MetricsMiddleware; copied into threadpool workers with the context
+_request_stats: contextvars.ContextVar[Optional[_RequestStats]] = contextvars.ContextVar(
+    "fixjeict_request_stats", default=None
+)
+
+
+def _route_template(scope: Scope) -> str:
+    # Mounted apps (static files, media) are reported by their mount point
+    return getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+def current_route() -> Optional[str]:
+    """'METHOD /route/{template}' of the request running in this context, None outside requests"""
+    stats = _request_stats.get()
+    if stats is None:
+        return None
+    return f"{stats.scope['method']} {_route_template(stats.scope)}"
+
+
+class MetricsMiddleware:
+    """
+    Records request duration, status and in-flight count per route template.
+
+    Plain ASGI middleware so streaming responses (SSE) pass straight through;
+    their duration is the lifetime of the stream.
+    """
+
+    def __init__(self, app: ASGIApp, app_name: str = "main"):
+        self.app = app
+        self.app_name = app_name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = _RequestStats(scope)
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+        http_in_flight.inc(app=self.app_name)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec(app=self.app_name)
+            _request_stats.reset(token)
+
+            route = _route_template(scope)
+            method = scope["method"]
+            http_requests.inc(app=self.app_name, method=method, route=route, status=str(status_code))
+            http_duration.observe(elapsed, app=self.app_name, method=method, route=route)
+            if stats.statements:
+                db_statements.inc(stats.statements, app=self.app_name, route=route)
+                db_seconds.inc(stats.seconds, app=self.app_name, route=route)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+    else:
+        db_statements.inc(app="background", route="")
+        db_seconds.inc(elapsed, app="background", route="")
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its timer from the pooled connection
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("metrics_started"):
+        conn.info["metrics_started"].pop()
+
+
+def instrument_sqlalchemy() -> None:
+    """Count statements and time on every engine (writer and reader pools alike)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_external(service: str, operation: str) -> Iterator[None]:
+    """Time a call to an external API, e.g. with track_external("resend", "send"):"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        external_duration.observe(time.perf_counter() - started, service=service, operation=operation, outcome=outcome)
+        external_last.set(time.time(), service=service, outcome=outcome)
+
+
+async def metrics_response(request: Request) -> Response:
+    """Body for the /metrics endpoints; requires METRICS_TOKEN as a bearer token when set"""
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, settings.METRICS_TOKEN):
+            return PlainTextResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    body = await anyio.to_thread.run_sync(metrics.render)
+    return Response(body, media_type=CONTENT_TYPE, headers={"Cache-Control": "no-store"})
@@ -0,0 +1,110 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module named ``vNNNN_<description>.py`` in this package
+that defines an ``upgrade(engine)`` function. Applied versions are recorded
+in the ``schema_migrations`` table. Migrations are run once per deploy with
+
+    python -m fixjeict_app.migrations upgrade
+
+instead of on every worker boot.
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from types import ModuleType
+from typing import List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+_MODULE_PATTERN = re.compile(r"^v(\d{4})_(\w+)$")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def description(self) -> str:
+        doc = (self.module.__doc__ or "").strip()
+        return doc.splitlines()[0] if doc else self.name.replace("_", " ")
+
+
+def discover() -> List[Migration]:
+    """All migrations in this package, ordered by version"""
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_PATTERN.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    migrations.sort(key=lambda m: m.version)
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def _ensure_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+                "version INTEGER PRIMARY KEY, "
+                "description VARCHAR(200), "
+                "applied_at TIMESTAMP NOT NULL)"
+            )
+        )
+
+
+def applied_versions(engine: Engine) -> List[int]:
+    """Versions already applied to the database"""
+    if not inspect(engine).has_table(MIGRATIONS_TABLE):
+        return []
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE} ORDER BY version"))
+        return [row[0] for row in rows]
+
+
+def pending(engine: Engine) -> List[Migration]:
+    """Migrations that still need to run"""
+    done = set(applied_versions(engine))
+    return [m for m in discover() if m.version not in done]
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to and including target (default: all)"""
+    _ensure_table(engine)
+    applied = []
+    for migration in pending(engine):
+        if target is not None and migration.version > target:
+            break
+        logger.info(f"Applying migration {migration.version:04d}: {migration.description}")
+        migration.module.upgrade(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"INSERT INTO {MIGRATIONS_TABLE} (version, description, applied_at) "
+                    "VALUES (:version, :description, :applied_at)"
+                ),
+                {
+                    "version": migration.version,
+                    "description": migration.description[:200],
+                    "applied_at": datetime.utcnow(),
+                },
+            )
+        applied.append(migration)
+    return applied
@@ -0,0 +1,40 @@
+"""
+Schema migration CLI.
+
+Usage:
+    python -m fixjeict_app.migrations status
+    python -m fixjeict_app.migrations upgrade [--to VERSION]
+"""
+
+import argparse
+import logging
+import sys
+
+from ..database import engine
+from . import applied_versions, discover, upgrade
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m fixjeict_app.migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Show applied and pending migrations")
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, help="Stop after this version")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.command == "status":
+        done = set(applied_versions(engine))
+        for migration in discover():
+            state = "applied" if migration.version in done else "pending"
+            print(f"{migration.version:04d}  {state:<8} {migration.description}")
+        return 0
+
+    applied = upgrade(engine, target=args.to)
+    print(f"Applied {len(applied)} migration(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
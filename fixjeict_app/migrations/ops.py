@@ -0,0 +1,206 @@
+"""
+Idempotent building blocks for migrations.
+
+Every helper checks the live schema first, so a migration can safely run
+against a database that was originally created with ``create_all``.
+"""
+
+import logging
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import MetaData, Table, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable
+
+logger = logging.getLogger(__name__)
+
+
+def create_table(engine: Engine, table: Table) -> None:
+    """Create a table (and its declared indexes) if it does not exist"""
+    with engine.begin() as conn:
+        table.create(conn, checkfirst=True)
+
+
+def _foreign_key_signature(columns, referred_table: str, ondelete: Optional[str]):
+    return tuple(columns), referred_table, (ondelete or "NO ACTION").upper()
+
+
+def replace_foreign_keys(engine: Engine, table: Table, fixups: Iterable[str] = ()) -> None:
+    """
+    Bring the foreign keys of an existing table in line with the model,
+    e.g. after adding ondelete="SET NULL". ``fixups`` are statements that
+    make the rows satisfy the new keys, with the table written as {table};
+    they run before the keys are enforced.
+
+    PostgreSQL drops and re-adds the constraints. SQLite cannot alter
+    constraints, so the table is rebuilt in one transaction: renamed,
+    created from the model, refilled and the old copy dropped.
+    """
+    live = inspect(engine).get_foreign_keys(table.name)
+    current = {
+        _foreign_key_signature(fk["constrained_columns"], fk["referred_table"], fk["options"].get("ondelete"))
+        for fk in live
+    }
+    wanted = {
+        _foreign_key_signature(fk.column_keys, fk.referred_table.name, fk.ondelete)
+        for fk in table.foreign_key_constraints
+    }
+    if current == wanted:
+        return
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for fk in live:
+                conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT "{fk["name"]}"'))
+            for statement in fixups:
+                conn.execute(text(statement.format(table=table.name)))
+            for fk in table.foreign_key_constraints:
+                conn.execute(AddConstraint(fk))
+    else:
+        rebuild_sqlite_table(engine, table, fixups)
+    logger.info(f"Replaced the foreign keys of {table.name}")
+
+
+def rebuild_sqlite_table(engine: Engine, table: Table, fixups: Iterable[str] = ()) -> None:
+    """
+    Recreate a SQLite table from its model, keeping the rows, for changes
+    ALTER TABLE cannot make (constraints, AUTOINCREMENT).
+
+    Follows the procedure from the SQLite docs: with foreign keys off, one
+    transaction creates the new table under a temporary name, copies the
+    rows, drops the old table and renames the new one, so references from
+    other tables keep pointing at it. ``fixups`` (see replace_foreign_keys)
+    run on the copied rows, then foreign_key_check must come back clean
+    before the commit.
+    """
+    columns = ", ".join(c["name"] for c in inspect(engine).get_columns(table.name) if c["name"] in table.c)
+    # A copy under a temporary name, in its own metadata along with the tables it references
+    metadata = MetaData()
+    for referred in {fk.column.table for fk in table.foreign_keys} - {table}:
+        referred.to_metadata(metadata)
+    new_table = table.to_metadata(metadata, name=f"{table.name}_new")
+
+    raw = engine.raw_connection()
+    dbapi_connection = raw.driver_connection
+    isolation_level = dbapi_connection.isolation_level
+    # Explicit BEGIN/COMMIT: the driver would otherwise run the DDL outside the transaction
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    try:
+        foreign_keys = cursor.execute("PRAGMA foreign_keys").fetchone()[0]
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(str(CreateTable(new_table).compile(dialect=engine.dialect)))
+            cursor.execute(f"INSERT INTO {new_table.name} ({columns}) SELECT {columns} FROM {table.name}")
+            for statement in fixups:
+                cursor.execute(statement.format(table=new_table.name))
+            cursor.execute(f"DROP TABLE {table.name}")
+            cursor.execute(f"ALTER TABLE {new_table.name} RENAME TO {table.name}")
+            for index in table.indexes:
+                cursor.execute(str(CreateIndex(index).compile(dialect=engine.dialect)))
+            problems = cursor.execute("PRAGMA foreign_key_check").fetchall()
+            if problems:
+                raise RuntimeError(f"Rebuilding {table.name} breaks foreign keys: {problems[:5]}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.execute(f"PRAGMA foreign_keys={foreign_keys}")
+    finally:
+        cursor.close()
+        dbapi_connection.isolation_level = isolation_level
+        raw.close()
+    logger.info(f"Rebuilt table {table.name}")
+
+
+def has_column(engine: Engine, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(engine).get_columns(table)}
+
+
+def add_column(engine: Engine, table: str, column: str, ddl: str) -> None:
+    """Add a column, e.g. add_column(engine, "tickets", "sla_due", "DATETIME")"""
+    if has_column(engine, table, column):
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index(
+    engine: Engine,
+    name: str,
+    table: str,
+    columns: Iterable[str],
+    unique: bool = False,
+    where: Optional[str] = None,
+    pause: float = 0.5,
+) -> None:
+    """
+    Build an index without blocking writers for longer than necessary.
+
+    On PostgreSQL this uses CREATE INDEX CONCURRENTLY. SQLite has no online
+    index build, so each index is built in its own short transaction and
+    the helper sleeps for ``pause`` seconds afterwards, letting queued
+    writers through before the next index starts.
+    """
+    existing = {ix["name"] for ix in inspect(engine).get_indexes(table)}
+    if name in existing:
+        return
+
+    unique_sql = "UNIQUE " if unique else ""
+    where_sql = f" WHERE {where}" if where else ""
+    column_sql = ", ".join(columns)
+
+    started = time.monotonic()
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(
+                text(
+                    f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                    f"ON {table} ({column_sql}){where_sql}"
+                )
+            )
+    else:
+        with engine.begin() as conn:
+            conn.execute(
+                text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column_sql}){where_sql}")
+            )
+    logger.info(f"Built index {name} in {time.monotonic() - started:.2f}s")
+
+    if pause:
+        time.sleep(pause)
+
+
+def backfill(
+    engine: Engine,
+    table: str,
+    assignments: str,
+    where: str,
+    batch_size: int = 1000,
+    pause: float = 0.05,
+) -> int:
+    """
+    Rewrite rows in small batches so the write lock is released in between.
+
+    ``where`` must stop matching a row once it has been updated, otherwise
+    the loop never ends, e.g. backfill(engine, "tickets", "sla = 0", "sla IS NULL").
+    """
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            result = conn.execute(
+                text(
+                    f"UPDATE {table} SET {assignments} WHERE id IN "
+                    f"(SELECT id FROM {table} WHERE {where} LIMIT :batch_size)"
+                ),
+                {"batch_size": batch_size},
+            )
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            break
+        time.sleep(pause)
+    if total:
+        logger.info(f"Backfilled {total} row(s) in {table}")
+    return total
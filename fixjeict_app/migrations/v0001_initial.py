@@ -0,0 +1,26 @@
+"""Initial schema"""
+
+from ..database import Base
+from .ops import create_table
+
+TABLES = [
+    "users",
+    "categories",
+    "tickets",
+    "messages",
+    "ticket_notes",
+    "time_logs",
+    "blog_posts",
+    "knowledge_base",
+    "leads",
+    "testimonials",
+    "auth_tokens",
+    "site_config",
+]
+
+
+def upgrade(engine):
+    from .. import models  # noqa: F401
+
+    for name in TABLES:
+        create_table(engine, Base.metadata.tables[name])
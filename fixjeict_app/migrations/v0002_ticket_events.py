@@ -0,0 +1,9 @@
+"""Ticket events table for real-time updates"""
+
+from .ops import create_table
+
+
+def upgrade(engine):
+    from ..models import TicketEvent
+
+    create_table(engine, TicketEvent.__table__)
@@ -0,0 +1,23 @@
+"""Indexes for dashboards, ticket detail and public listings"""
+
+from .ops import create_index
+
+INDEXES = [
+    ("ix_tickets_fixer_status", "tickets", ["fixer_id", "status"]),
+    ("ix_tickets_client_updated", "tickets", ["client_id", "updated_at"]),
+    ("ix_tickets_status_updated", "tickets", ["status", "updated_at"]),
+    ("ix_tickets_category", "tickets", ["category_id"]),
+    ("ix_messages_ticket_created", "messages", ["ticket_id", "created_at"]),
+    ("ix_ticket_notes_ticket_created", "ticket_notes", ["ticket_id", "created_at"]),
+    ("ix_time_logs_ticket", "time_logs", ["ticket_id"]),
+    ("ix_time_logs_user_created", "time_logs", ["user_id", "created_at"]),
+    ("ix_auth_tokens_user", "auth_tokens", ["user_id"]),
+    ("ix_blog_posts_published", "blog_posts", ["is_published", "published_at"]),
+    ("ix_knowledge_base_published_views", "knowledge_base", ["is_published", "views"]),
+    ("ix_leads_status_created", "leads", ["status", "created_at"]),
+]
+
+
+def upgrade(engine):
+    for name, table, columns in INDEXES:
+        create_index(engine, name, table, columns)
@@ -0,0 +1,10 @@
+"""Archive tables for closed tickets and their messages, notes and time logs"""
+
+from .ops import create_table
+
+
+def upgrade(engine):
+    from ..models import ArchivedMessage, ArchivedTicket, ArchivedTicketNote, ArchivedTimeLog
+
+    for model in (ArchivedTicket, ArchivedMessage, ArchivedTicketNote, ArchivedTimeLog):
+        create_table(engine, model.__table__)
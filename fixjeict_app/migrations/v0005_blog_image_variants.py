@@ -0,0 +1,7 @@
+"""Responsive image variants for blog cover images"""
+
+from .ops import add_column
+
+
+def upgrade(engine):
+    add_column(engine, "blog_posts", "image_variants", "TEXT")
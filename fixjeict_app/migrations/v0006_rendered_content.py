@@ -0,0 +1,14 @@
+"""Stored Markdown rendering for blog posts and knowledge base articles"""
+
+from .ops import add_column
+
+TABLES = ("blog_posts", "knowledge_base")
+
+
+def upgrade(engine):
+    # Rows are rendered on first view, or when saved in the admin
+    for table in TABLES:
+        add_column(engine, table, "content_html", "TEXT")
+        add_column(engine, table, "content_excerpt", "VARCHAR(300)")
+        add_column(engine, table, "content_toc", "TEXT")
+        add_column(engine, table, "content_hash", "VARCHAR(64)")
@@ -0,0 +1,9 @@
+"""Message attachments stored on disk by content hash"""
+
+from .ops import create_table
+
+
+def upgrade(engine):
+    from ..models import Attachment
+
+    create_table(engine, Attachment.__table__)
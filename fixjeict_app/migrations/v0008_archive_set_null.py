@@ -0,0 +1,9 @@
+"""Archived tickets keep their history when their category or fixer is deleted"""
+
+from .ops import replace_foreign_keys
+
+
+def upgrade(engine):
+    from ..models import ArchivedTicket
+
+    replace_foreign_keys(engine, ArchivedTicket.__table__)
@@ -0,0 +1,33 @@
+"""Ticket ids are never reused, so new tickets cannot take an archived ticket's id"""
+
+from sqlalchemy import text
+
+from .ops import rebuild_sqlite_table
+
+
+def upgrade(engine):
+    from ..models import Ticket
+
+    # PostgreSQL sequences never hand out an id twice
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tickets'")).scalar()
+    if "AUTOINCREMENT" not in (sql or "").upper():
+        rebuild_sqlite_table(engine, Ticket.__table__)
+
+    # Start above every id handed out so far, archived ones included
+    with engine.begin() as conn:
+        highest = conn.execute(
+            text(
+                "SELECT MAX(COALESCE((SELECT MAX(id) FROM tickets), 0), "
+                "COALESCE((SELECT MAX(id) FROM archived_tickets), 0))"
+            )
+        ).scalar()
+        updated = conn.execute(
+            text("UPDATE sqlite_sequence SET seq = MAX(seq, :highest) WHERE name = 'tickets'"),
+            {"highest": highest},
+        )
+        if not updated.rowcount:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('tickets', :highest)"), {"highest": highest})
@@ -0,0 +1,25 @@
+"""Attachments reference their hot or archived ticket with a foreign key"""
+
+from sqlalchemy import text
+
+from .ops import add_column, create_index, replace_foreign_keys
+
+FIXUPS = [
+    # Attachments of tickets archived so far only kept the plain ticket id
+    "UPDATE {table} SET archived_ticket_id = ticket_id, ticket_id = NULL "
+    "WHERE ticket_id NOT IN (SELECT id FROM tickets) AND ticket_id IN (SELECT id FROM archived_tickets)",
+    # Rows of deleted tickets; prune() removes their files
+    "DELETE FROM {table} WHERE ticket_id IS NOT NULL AND ticket_id NOT IN (SELECT id FROM tickets)",
+]
+
+
+def upgrade(engine):
+    from ..models import Attachment
+
+    add_column(engine, "attachments", "archived_ticket_id", "INTEGER")
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE attachments ALTER COLUMN ticket_id DROP NOT NULL"))
+    # SQLite rebuilds the table, which also makes ticket_id nullable
+    replace_foreign_keys(engine, Attachment.__table__, FIXUPS)
+    create_index(engine, "ix_attachments_archived_ticket", "attachments", ["archived_ticket_id"])
@@ -0,0 +1,8 @@
+"""Track testimonial edits, so cached home page fragments can be versioned"""
+
+from .ops import add_column, backfill
+
+
+def upgrade(engine):
+    add_column(engine, "testimonials", "updated_at", "TIMESTAMP")
+    backfill(engine, "testimonials", "updated_at = created_at", "updated_at IS NULL AND created_at IS NOT NULL")
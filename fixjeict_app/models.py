@@ -1,8 +1,9 @@
+import json
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text,
+    Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text,
     UniqueConstraint
 )
 from sqlalchemy.orm import relationship
@@ -54,6 +55,14 @@ class Category(Base):
 
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        Index("ix_tickets_fixer_status", "fixer_id", "status"),
+        Index("ix_tickets_client_updated", "client_id", "updated_at"),
+        Index("ix_tickets_status_updated", "status", "updated_at"),
+        Index("ix_tickets_category", "category_id"),
+        # Ids are never handed out again, so they cannot collide with archived tickets
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -83,6 +92,9 @@ class Ticket(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_ticket_created", "ticket_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False)
@@ -94,13 +106,58 @@ class Message(Base):
     # Relationships
     ticket = relationship("Ticket", back_populates="messages")
     user = relationship("User", back_populates="messages")
+    attachments = relationship("Attachment", back_populates="message", cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
         return f"<Message(id={self.id}, ticket_id={self.ticket_id})>"
 
 
+class Attachment(Base):
+    """
+    A file sent with a message. The content lives under ATTACHMENT_DIR,
+    named by its SHA-256, so identical files are stored once.
+    """
+
+    __tablename__ = "attachments"
+    __table_args__ = (
+        Index("ix_attachments_ticket", "ticket_id"),
+        Index("ix_attachments_archived_ticket", "archived_ticket_id"),
+        Index("ix_attachments_message", "message_id"),
+        Index("ix_attachments_sha256", "sha256"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # Archiving moves the message and the ticket: message_id becomes NULL and
+    # ticket_id moves to archived_ticket_id, so exactly one of the two is set
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="SET NULL"))
+    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"))
+    archived_ticket_id = Column(Integer, ForeignKey("archived_tickets.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    is_internal = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    message = relationship("Message", back_populates="attachments")
+    user = relationship("User")
+
+    @property
+    def owner_id(self) -> Optional[int]:
+        """Id of the hot or archived ticket the attachment belongs to"""
+        return self.ticket_id if self.ticket_id is not None else self.archived_ticket_id
+
+    def __repr__(self) -> str:
+        return f"<Attachment(id={self.id}, ticket_id={self.owner_id}, filename={self.filename})>"
+
+
 class TicketNote(Base):
     __tablename__ = "ticket_notes"
+    __table_args__ = (
+        Index("ix_ticket_notes_ticket_created", "ticket_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False)
@@ -118,6 +175,10 @@ class TicketNote(Base):
 
 class TimeLog(Base):
     __tablename__ = "time_logs"
+    __table_args__ = (
+        Index("ix_time_logs_ticket", "ticket_id"),
+        Index("ix_time_logs_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False)
@@ -140,8 +201,29 @@ class TimeLog(Base):
         return f"<TimeLog(id={self.id}, ticket_id={self.ticket_id}, hours={self.total_hours})>"
 
 
-class BlogPost(Base):
+class RenderedContentMixin:
+    """Columns filled by the content pipeline when an article is saved"""
+
+    content_html = Column(Text)
+    content_excerpt = Column(String(300))
+    content_toc = Column(Text)  # JSON list of {level, id, title}
+    content_hash = Column(String(64))
+
+    @property
+    def table_of_contents(self) -> List[Dict[str, Any]]:
+        if not self.content_toc:
+            return []
+        try:
+            return json.loads(self.content_toc)
+        except ValueError:
+            return []
+
+
+class BlogPost(RenderedContentMixin, Base):
     __tablename__ = "blog_posts"
+    __table_args__ = (
+        Index("ix_blog_posts_published", "is_published", "published_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False)
@@ -149,17 +231,37 @@ class BlogPost(Base):
     content = Column(Text, nullable=False)
     excerpt = Column(String(300))
     image_url = Column(String(500))
+    image_variants = Column(Text)  # JSON written by the image pipeline
     is_published = Column(Boolean, default=False)
     published_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    @property
+    def image_sources(self) -> Optional[Dict[str, Any]]:
+        """srcset strings per format plus intrinsic size, once variants exist"""
+        if not self.image_variants:
+            return None
+        try:
+            variants = json.loads(self.image_variants)
+        except ValueError:
+            return None
+        sources = {
+            fmt: ", ".join(f"{url} {width}w" for url, width in entries)
+            for fmt, entries in variants.get("formats", {}).items()
+            if entries
+        }
+        return {"width": variants.get("width"), "height": variants.get("height"), "srcset": sources}
+
     def __repr__(self) -> str:
         return f"<BlogPost(id={self.id}, title={self.title}, published={self.is_published})>"
 
 
-class KnowledgeBase(Base):
+class KnowledgeBase(RenderedContentMixin, Base):
     __tablename__ = "knowledge_base"
+    __table_args__ = (
+        Index("ix_knowledge_base_published_views", "is_published", "views"),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False)
@@ -177,6 +279,9 @@ class KnowledgeBase(Base):
 
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        Index("ix_leads_status_created", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)
@@ -201,6 +306,7 @@ class Testimonial(Base):
     rating = Column(Integer)
     is_published = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self) -> str:
         return f"<Testimonial(id={self.id}, name={self.name}, rating={self.rating})>"
@@ -208,6 +314,9 @@ class Testimonial(Base):
 
 class AuthToken(Base):
     __tablename__ = "auth_tokens"
+    __table_args__ = (
+        Index("ix_auth_tokens_user", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -234,3 +343,107 @@ class SiteConfig(Base):
 
     def __repr__(self) -> str:
         return f"<SiteConfig(key={self.key}, value={self.value})>"
+
+
+class TicketEvent(Base):
+    __tablename__ = "ticket_events"
+
+    id = Column(Integer, primary_key=True)
+    channel = Column(String(50), nullable=False, index=True)
+    event = Column(String(30), nullable=False)
+    payload = Column(Text, nullable=False)
+    is_internal = Column(Boolean, default=False)
+    origin = Column(String(40))
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self) -> str:
+        return f"<TicketEvent(id={self.id}, channel={self.channel}, event={self.event})>"
+
+
+class ArchivedTicket(Base):
+    __tablename__ = "archived_tickets"
+    __table_args__ = (
+        Index("ix_archived_tickets_client", "client_id"),
+        Index("ix_archived_tickets_fixer", "fixer_id"),
+    )
+
+    # Keeps the original ticket id so /tickets/{id} links keep working
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(200), nullable=False)
+    description = Column(Text, nullable=False)
+    status = Column(String(50))
+    priority = Column(String(20))
+    client_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # The ORM nulls these on hot tickets when a category or fixer is deleted; the database does it here
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"))
+    fixer_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    estimated_hours = Column(Float)
+    actual_hours = Column(Float)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    closed_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Relationships (read-only)
+    client = relationship("User", foreign_keys=[client_id], viewonly=True)
+    fixer = relationship("User", foreign_keys=[fixer_id], viewonly=True)
+    category = relationship("Category", viewonly=True)
+
+    def __repr__(self) -> str:
+        return f"<ArchivedTicket(id={self.id}, title={self.title}, status={self.status})>"
+
+
+class ArchivedMessage(Base):
+    __tablename__ = "archived_messages"
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    content = Column(Text, nullable=False)
+    is_internal = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+
+    # Relationships (read-only)
+    user = relationship("User", viewonly=True)
+
+    def __repr__(self) -> str:
+        return f"<ArchivedMessage(id={self.id}, ticket_id={self.ticket_id})>"
+
+
+class ArchivedTicketNote(Base):
+    __tablename__ = "archived_ticket_notes"
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime)
+
+    # Relationships (read-only)
+    user = relationship("User", viewonly=True)
+
+    def __repr__(self) -> str:
+        return f"<ArchivedTicketNote(id={self.id}, ticket_id={self.ticket_id})>"
+
+
+class ArchivedTimeLog(Base):
+    __tablename__ = "archived_time_logs"
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    hours = Column(Integer, default=0)
+    minutes = Column(Integer, default=0)
+    description = Column(Text)
+    created_at = Column(DateTime)
+
+    # Relationships (read-only)
+    user = relationship("User", viewonly=True)
+
+    @property
+    def total_hours(self) -> float:
+        """Calculate total hours including minutes"""
+        return self.hours + (self.minutes / 60)
+
+    def __repr__(self) -> str:
+        return f"<ArchivedTimeLog(id={self.id}, ticket_id={self.ticket_id}, hours={self.total_hours})>"
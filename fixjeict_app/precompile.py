@@ -0,0 +1,24 @@
+"""
+Compile all templates into the bytecode cache.
+
+Run at deploy time so no worker pays for template compilation on its
+first requests:
+    python -m fixjeict_app.precompile
+"""
+
+import logging
+import sys
+
+from .config import settings
+from .services.template_service import template_service
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    count = template_service.precompile()
+    print(f"Compiled {count} templates into {settings.TEMPLATE_CACHE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+One-time startup tasks, run once before the workers start.
+
+Applies pending migrations, fingerprints the static assets and compiles
+the templates into the bytecode cache in a single process, so each worker
+only checks the schema version and loads what is already built:
+    python -m fixjeict_app.prestart
+"""
+
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def run() -> None:
+    from . import assets, migrations
+    from .database import engine
+    from .services.template_service import template_service
+
+    started = time.perf_counter()
+    applied = migrations.upgrade(engine)
+    manifest = assets.build()
+    templates = template_service.precompile()
+    logger.info(
+        f"Pre-start done in {time.perf_counter() - started:.2f}s: {len(applied)} migration(s), "
+        f"{len(manifest)} assets, {templates} templates"
+    )
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Built-in sampling profiler for live workers.
+
+CPU profiles sample the Python stack of every thread from a background
+thread (sys._current_frames) every PROFILE_INTERVAL_MS and are returned in
+the collapsed-stack format that flamegraph.pl, speedscope and inferno read.
+Allocation profiles take two tracemalloc snapshots N seconds apart and
+report where memory grew in between.
+
+The admin portal runs in its own processes, so other workers are profiled
+through PROFILE_DIR: each worker announces itself there and polls for
+"<pid>.<token>.request" files addressed to it, and writes the profile to
+"<token>.result" for the admin endpoint to pick up. Only one profile runs
+per process at a time and its duration is capped at PROFILE_MAX_SECONDS.
+"""
+
+import asyncio
+import json
+import linecache
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .metrics import _pid_alive
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cpu", "alloc")
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+}
+
+ALLOCATION_REPORT_LIMIT = 50
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running in this process"""
+
+
+class Profiler:
+    """Samples this process on demand and serves profile requests for it"""
+
+    def __init__(self):
+        self._busy = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._paths: Dict[str, str] = {}
+
+    # Profiling this process
+
+    def run(self, mode: str, seconds: float, interval_ms: Optional[float] = None, include_idle: bool = False) -> str:
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already running in this worker")
+        try:
+            logger.info(f"Profiling pid {os.getpid()} ({mode}) for {seconds:g}s")
+            if mode == "alloc":
+                return self.allocation_diff(seconds)
+            interval = (interval_ms or settings.PROFILE_INTERVAL_MS) / 1000
+            stacks = self.sample_stacks(seconds, interval, include_idle)
+            return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        finally:
+            self._busy.release()
+
+    def sample_stacks(self, seconds: float, interval: float, include_idle: bool = False) -> Counter:
+        """Collapsed stacks ("thread;outer;...;inner") counted over the sampling window"""
+        me = threading.get_ident()
+        labels: Dict[Tuple[Any, int], str] = {}
+        stacks: Counter = Counter()
+        thread_names: Dict[int, str] = {}
+        names_refreshed = 0.0
+
+        started = time.monotonic()
+        next_sample = started
+        while next_sample - started < seconds and not self._stop.is_set():
+            now = time.monotonic()
+            if now - names_refreshed > 1:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                names_refreshed = now
+
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not include_idle and self._is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    key = (frame.f_code, frame.f_lineno)
+                    label = labels.get(key)
+                    if label is None:
+                        code = frame.f_code
+                        label = labels[key] = f"{code.co_name} ({self._short_path(code.co_filename)}:{frame.f_lineno})"
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, f"thread-{ident}").replace(";", ":").replace(" ", "_"))
+                stacks[";".join(reversed(stack))] += 1
+
+            next_sample += interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Sampling can't keep up (huge stacks); skip ticks instead of spinning
+                next_sample = time.monotonic()
+        return stacks
+
+    @staticmethod
+    def _is_idle(frame) -> bool:
+        return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+    def _short_path(self, filename: str) -> str:
+        short = self._paths.get(filename)
+        if short is None:
+            short = filename
+            for prefix in sorted((p for p in sys.path if p), key=len, reverse=True):
+                if filename.startswith(prefix.rstrip(os.sep) + os.sep):
+                    short = filename[len(prefix.rstrip(os.sep)) + 1:]
+                    break
+            self._paths[filename] = short = short.replace(";", ":").replace(" ", "_")
+        return short
+
+    def allocation_diff(self, seconds: float) -> str:
+        """Memory allocated and still alive after `seconds`, grouped by traceback"""
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot()
+            self._stop.wait(seconds)
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started_here:
+                tracemalloc.stop()
+
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "traceback")
+        growth = [stat for stat in stats if stat.size_diff > 0]
+
+        lines = [
+            f"# Allocation growth in pid {os.getpid()} over {seconds:g}s",
+            f"# {sum(stat.size_diff for stat in growth) / 1024:.1f} KiB in {len(growth)} allocation sites"
+            f" (top {ALLOCATION_REPORT_LIMIT})",
+            "",
+        ]
+        for stat in growth[:ALLOCATION_REPORT_LIMIT]:
+            lines.append(f"{stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocks (now {stat.size / 1024:.1f} KiB)")
+            for frame in reversed(stat.traceback):
+                lines.append(f"    {self._short_path(frame.filename)}:{frame.lineno}")
+            lines.append("")
+        return "\n".join(lines)
+
+    # Profiling other workers
+
+    @staticmethod
+    def _directory() -> Path:
+        return settings.PROFILE_DIR
+
+    def workers(self) -> List[Dict[str, Any]]:
+        """Live workers (of both apps) that accept profile requests"""
+        workers = []
+        for path in self._directory().glob("*.worker"):
+            try:
+                info = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if _pid_alive(info["pid"]):
+                workers.append(info)
+            else:
+                path.unlink(missing_ok=True)
+        return sorted(workers, key=lambda info: (info["app"], info["pid"]))
+
+    async def request(self, pid: int, mode: str, seconds: float, interval_ms: Optional[float], include_idle: bool) -> Tuple[int, str]:
+        """Have worker `pid` profile itself; returns (HTTP status, body)"""
+        directory = self._directory()
+        token = secrets.token_hex(8)
+        request_path = directory / f"{pid}.{token}.request"
+        result_path = directory / f"{token}.result"
+        _write_atomic(request_path, json.dumps({
+            "mode": mode,
+            "seconds": seconds,
+            "interval_ms": interval_ms,
+            "include_idle": include_idle,
+        }))
+
+        deadline = time.monotonic() + seconds + settings.PROFILE_POLL_SECONDS * 2 + 10
+        try:
+            while time.monotonic() < deadline:
+                if result_path.exists():
+                    result = json.loads(result_path.read_text())
+                    return result["status"], result["body"]
+                await asyncio.sleep(0.25)
+            return 504, f"worker {pid} did not answer within {seconds:g}s"
+        finally:
+            request_path.unlink(missing_ok=True)
+            result_path.unlink(missing_ok=True)
+
+    def start(self, app_name: str) -> None:
+        """Announce this worker in PROFILE_DIR and serve profile requests addressed to it"""
+        if not settings.PROFILER_ENABLED or self._watcher is not None:
+            return
+        directory = self._directory()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            _write_atomic(directory / f"{os.getpid()}.worker", json.dumps({
+                "pid": os.getpid(),
+                "app": app_name,
+                "started_at": int(time.time()),
+            }))
+        except OSError as e:
+            logger.warning(f"Profiler disabled for this worker: {e}")
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="profiler-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join(timeout=5)
+        self._watcher = None
+        (self._directory() / f"{os.getpid()}.worker").unlink(missing_ok=True)
+
+    def _watch(self) -> None:
+        pattern = f"{os.getpid()}.*.request"
+        while not self._stop.wait(settings.PROFILE_POLL_SECONDS):
+            for path in self._directory().glob(pattern):
+                self._serve(path)
+
+    def _serve(self, path: Path) -> None:
+        token = path.name.split(".")[1]
+        try:
+            options = json.loads(path.read_text())
+            path.unlink()
+        except (OSError, ValueError):
+            return
+        try:
+            body = self.run(options["mode"], options["seconds"], options.get("interval_ms"), options.get("include_idle", False))
+            result = {"status": 200, "body": body}
+        except ProfilerBusy as e:
+            result = {"status": 409, "body": str(e)}
+        except Exception as e:
+            logger.exception("Profile request failed")
+            result = {"status": 500, "body": f"profile failed: {e}"}
+        try:
+            _write_atomic(self._directory() / f"{token}.result", json.dumps(result))
+        except OSError as e:
+            logger.warning(f"Could not write profile result: {e}")
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(content)
+    os.replace(tmp, path)
+
+
+# Global profiler instance
+profiler = Profiler()
@@ -4,8 +4,10 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from ..auth import verify_admin
+from ..config import settings
 from ..database import get_db
 from ..models import (
     BlogPost,
@@ -17,7 +19,13 @@ from ..models import (
     Ticket,
     User,
 )
-from ..services.template_service import template_service
+from ..services.archive_service import archive_service
+from ..services.assignment_service import assignment_engine
+from ..services.content_service import content_service
+from ..services.kb_index import kb_index
+from ..services.image_service import image_service
+from ..services.template_service import fragment_cache, template_service
+from ..slow_query_log import slow_query_log
 
 router = APIRouter()
 security = HTTPBasic()
@@ -93,6 +101,61 @@ async def admin_tickets(
     )
 
 
+@router.post("/admin/tickets/rebalance", response_class=HTMLResponse)
+async def admin_tickets_rebalance(
+    request: Request,
+    credentials: HTTPBasicCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    """Assign the unclaimed backlog and even out fixer workload"""
+    verify_admin(credentials)
+
+    assignment_engine.rebalance(db)
+
+    return RedirectResponse(
+        url="/admin/tickets",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
+
+
+@router.get("/admin/archive", response_class=HTMLResponse)
+async def admin_archive(
+    request: Request,
+    credentials: HTTPBasicCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    """Hot and archive table sizes"""
+    verify_admin(credentials)
+
+    # Counts every table and (on SQLite) scans dbstat: seconds on a large database, so only on this page
+    table_sizes = await run_in_threadpool(archive_service.table_sizes, db)
+
+    return template_service.render_template(
+        "admin_archive.html",
+        {
+            "request": request,
+            "table_sizes": table_sizes,
+        },
+    )
+
+
+@router.post("/admin/tickets/archive", response_class=HTMLResponse)
+async def admin_tickets_archive(
+    request: Request,
+    credentials: HTTPBasicCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    """Move long-closed tickets to the archive tables"""
+    verify_admin(credentials)
+
+    archive_service.archive_closed_tickets(db)
+
+    return RedirectResponse(
+        url="/admin/archive",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
+
+
 @router.get("/admin/tickets/{ticket_id}", response_class=HTMLResponse)
 async def admin_ticket_detail(
     request: Request,
@@ -192,6 +255,7 @@ async def admin_ticket_edit_submit(
         ticket.closed_at = None
 
     db.commit()
+    assignment_engine.invalidate(db)
 
     return RedirectResponse(
         url=f"/admin/tickets/{ticket_id}",
@@ -212,6 +276,7 @@ async def admin_ticket_delete(
     ticket = db.query(Ticket).filter_by(id=ticket_id).first_or_404()
     db.delete(ticket)
     db.commit()
+    assignment_engine.invalidate(db)
 
     return RedirectResponse(
         url="/admin/tickets",
@@ -357,6 +422,7 @@ async def admin_user_edit_submit(
     user.role = form_data.get("role")
     user.is_active = form_data.get("is_active") == "on"
     db.commit()
+    assignment_engine.invalidate(db)
 
     return RedirectResponse(
         url="/admin/users",
@@ -553,6 +619,17 @@ async def admin_blog_new(
     )
 
 
+async def _blog_image_url(form_data) -> str:
+    """Cover image URL from the form; an uploaded file takes precedence over the URL field"""
+    upload = form_data.get("image_file")
+    if upload is not None and getattr(upload, "filename", None):
+        try:
+            return image_service.store_upload(upload.filename, await upload.read())
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return form_data.get("image_url") or None
+
+
 @router.post("/admin/blog/new", response_class=HTMLResponse)
 async def admin_blog_new_submit(
     request: Request,
@@ -571,12 +648,16 @@ async def admin_blog_new_submit(
         slug=slug,
         content=form_data.get("content"),
         excerpt=form_data.get("excerpt"),
-        image_url=form_data.get("image_url"),
+        image_url=await _blog_image_url(form_data),
         is_published=form_data.get("is_published") == "on",
         published_at=datetime.utcnow() if form_data.get("is_published") == "on" else None,
     )
+    content_service.apply(post)
     db.add(post)
     db.commit()
+    image_service.schedule_blog_image(post.id, post.image_url)
+    fragment_cache.invalidate("blog:")
+    fragment_cache.invalidate("index:posts")
 
     return RedirectResponse(
         url="/admin/blog",
@@ -621,7 +702,12 @@ async def admin_blog_edit_submit(
     post.title = form_data.get("title")
     post.content = form_data.get("content")
     post.excerpt = form_data.get("excerpt")
-    post.image_url = form_data.get("image_url")
+    image_url = await _blog_image_url(form_data)
+    image_changed = image_url != post.image_url
+    if image_changed:
+        # Old variants belong to the previous image; new ones are generated below
+        post.image_url = image_url
+        post.image_variants = None
     post.is_published = form_data.get("is_published") == "on"
 
     was_published = post.published_at is not None
@@ -630,7 +716,12 @@ async def admin_blog_edit_submit(
     if is_now_published and not was_published:
         post.published_at = datetime.utcnow()
 
+    content_service.apply(post)
     db.commit()
+    if image_changed:
+        image_service.schedule_blog_image(post.id, post.image_url)
+    fragment_cache.invalidate("blog:")
+    fragment_cache.invalidate("index:posts")
 
     return RedirectResponse(
         url="/admin/blog",
@@ -651,6 +742,8 @@ async def admin_blog_delete(
     post = db.query(BlogPost).filter_by(id=post_id).first_or_404()
     db.delete(post)
     db.commit()
+    fragment_cache.invalidate("blog:")
+    fragment_cache.invalidate("index:posts")
 
     return RedirectResponse(
         url="/admin/blog",
@@ -716,8 +809,10 @@ async def admin_kb_new_submit(
         category=form_data.get("category"),
         is_published=form_data.get("is_published") == "on",
     )
+    content_service.apply(post)
     db.add(post)
     db.commit()
+    kb_index.upsert(post)
 
     return RedirectResponse(
         url="/admin/kb",
@@ -763,7 +858,9 @@ async def admin_kb_edit_submit(
     post.content = form_data.get("content")
     post.category = form_data.get("category")
     post.is_published = form_data.get("is_published") == "on"
+    content_service.apply(post)
     db.commit()
+    kb_index.upsert(post)
 
     return RedirectResponse(
         url="/admin/kb",
@@ -784,6 +881,7 @@ async def admin_kb_delete(
     post = db.query(KnowledgeBase).filter_by(id=post_id).first_or_404()
     db.delete(post)
     db.commit()
+    kb_index.remove(post_id)
 
     return RedirectResponse(
         url="/admin/kb",
@@ -933,6 +1031,7 @@ async def admin_testimonial_new_submit(
     )
     db.add(testimonial)
     db.commit()
+    fragment_cache.invalidate("index:testimonials")
 
     return RedirectResponse(
         url="/admin/testimonials",
@@ -980,6 +1079,7 @@ async def admin_testimonial_edit_submit(
     testimonial.rating = int(form_data.get("rating", 5))
     testimonial.is_published = form_data.get("is_published") == "on"
     db.commit()
+    fragment_cache.invalidate("index:testimonials")
 
     return RedirectResponse(
         url="/admin/testimonials",
@@ -1000,6 +1100,7 @@ async def admin_testimonial_delete(
     testimonial = db.query(Testimonial).filter_by(id=testimonial_id).first_or_404()
     db.delete(testimonial)
     db.commit()
+    fragment_cache.invalidate("index:testimonials")
 
     return RedirectResponse(
         url="/admin/testimonials",
@@ -1065,3 +1166,42 @@ async def admin_setting_toggle(
         url="/admin/settings",
         status_code=status.HTTP_303_SEE_OTHER,
     )
+
+
+# Slow queries
+@router.get("/admin/slow-queries", response_class=HTMLResponse)
+async def admin_slow_queries(
+    request: Request,
+    limit: int = 25,
+    credentials: HTTPBasicCredentials = Depends(security),
+):
+    """Slowest query shapes across all workers, by total time"""
+    verify_admin(credentials)
+
+    # The log holds up to twice SLOW_QUERY_LOG_MAX_MB; parse it off the event loop
+    queries = await run_in_threadpool(slow_query_log.top, min(max(limit, 1), 200))
+
+    return template_service.render_template(
+        "admin_slow_queries.html",
+        {
+            "request": request,
+            "queries": queries,
+            "threshold_ms": settings.SLOW_QUERY_MS,
+        },
+    )
+
+
+@router.post("/admin/slow-queries/clear", response_class=HTMLResponse)
+async def admin_slow_queries_clear(
+    request: Request,
+    credentials: HTTPBasicCredentials = Depends(security),
+):
+    """Start a fresh slow-query log, e.g. after adding an index"""
+    verify_admin(credentials)
+
+    slow_query_log.clear()
+
+    return RedirectResponse(
+        url="/admin/slow-queries",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
@@ -1,33 +1,58 @@
-from fastapi import APIRouter, Depends, Request
-from fastapi.responses import HTMLResponse
+import hashlib
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 
+from ..assets import REVALIDATE_CACHE_CONTROL, SERVICE_WORKER_BUILD, SERVICE_WORKER_SOURCE
+from ..config import settings
 from ..database import get_db
-from ..models import BlogPost, Testimonial
+from ..models import BlogPost, KnowledgeBase, Testimonial
+from ..services.content_service import content_service
+from ..services.kb_index import kb_index
 from ..services.template_service import template_service
 
 router = APIRouter()
 
+# Sent by the service worker when it fills its offline cache
+PRECACHE_HEADER = "X-SW-Precache"
+
+
+def content_version(db: Session, model) -> str:
+    """
+    Fragment cache key part that changes whenever a row of model is added,
+    edited or deleted, in any process
+    """
+    count, latest = db.query(func.count(model.id), func.max(model.updated_at)).one()
+    return f"{count}:{latest}"
+
 
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request, db: Session = Depends(get_db)):
-    """Home page"""
-    featured_posts = (
-        db.query(BlogPost)
-        .filter_by(is_published=True)
-        .order_by(BlogPost.published_at.desc())
-        .limit(3)
-        .all()
-    )
+    """Home page; the lists are only queried when their cached fragment is stale"""
 
-    testimonials = db.query(Testimonial).filter_by(is_published=True).all()
+    def featured_posts():
+        return (
+            db.query(BlogPost)
+            .filter_by(is_published=True)
+            .order_by(BlogPost.published_at.desc())
+            .limit(3)
+            .all()
+        )
+
+    def testimonials():
+        return db.query(Testimonial).filter_by(is_published=True).all()
 
     return template_service.render_template(
         "index.html",
         {
             "request": request,
-            "featured_posts": featured_posts,
-            "testimonials": testimonials,
+            "posts_version": content_version(db, BlogPost),
+            "load_featured_posts": featured_posts,
+            "testimonials_version": content_version(db, Testimonial),
+            "load_testimonials": testimonials,
         },
     )
 
@@ -82,15 +107,20 @@ async def contact_submit(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/blog", response_class=HTMLResponse)
 async def blog(request: Request, db: Session = Depends(get_db)):
-    """Blog listing page"""
-    posts = (
-        db.query(BlogPost)
-        .filter_by(is_published=True)
-        .order_by(BlogPost.published_at.desc())
-        .all()
-    )
+    """Blog listing page; the posts are only queried when the cached list is stale"""
+
+    def posts():
+        return (
+            db.query(BlogPost)
+            .filter_by(is_published=True)
+            .order_by(BlogPost.published_at.desc())
+            .all()
+        )
 
-    return template_service.render_template("blog.html", {"request": request, "posts": posts})
+    return template_service.render_template(
+        "blog.html",
+        {"request": request, "posts_version": content_version(db, BlogPost), "load_posts": posts},
+    )
 
 
 @router.get("/blog/{slug}", response_class=HTMLResponse)
@@ -99,8 +129,11 @@ async def blog_post(request: Request, slug: str, db: Session = Depends(get_db)):
     post = (
         db.query(BlogPost)
         .filter_by(slug=slug, is_published=True)
-        .first_or_404()
+        .first()
     )
+    if post is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+    content_service.ensure_rendered(db, post)
 
     return template_service.render_template("blog_post.html", {"request": request, "post": post})
 
@@ -108,8 +141,6 @@ async def blog_post(request: Request, slug: str, db: Session = Depends(get_db)):
 @router.get("/knowledge-base", response_class=HTMLResponse)
 async def knowledge_base(request: Request, db: Session = Depends(get_db)):
     """Knowledge base listing page"""
-    from ..models import KnowledgeBase
-
     posts = (
         db.query(KnowledgeBase)
         .filter_by(is_published=True)
@@ -136,19 +167,90 @@ async def knowledge_base(request: Request, db: Session = Depends(get_db)):
     )
 
 
+@router.get("/knowledge-base/suggest")
+async def kb_suggest(q: str = "", limit: int = settings.KB_SUGGEST_LIMIT, db: Session = Depends(get_db)):
+    """Articles matching a ticket that is being written, from the in-memory index"""
+    suggestions = kb_index.suggest(db, q[:1000], max(1, min(limit, 20)))
+    return JSONResponse(
+        [
+            {
+                "title": suggestion.title,
+                "url": f"/knowledge-base/{suggestion.slug}",
+                "excerpt": suggestion.excerpt,
+                "score": suggestion.score,
+            }
+            for suggestion in suggestions
+        ],
+        headers={"Cache-Control": "private, max-age=60"},
+    )
+
+
 @router.get("/knowledge-base/{slug}", response_class=HTMLResponse)
 async def kb_post(request: Request, slug: str, db: Session = Depends(get_db)):
     """Single knowledge base article page"""
-    from ..models import KnowledgeBase
-
     post = (
         db.query(KnowledgeBase)
         .filter_by(slug=slug, is_published=True)
-        .first_or_404()
+        .first()
+    )
+    if post is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Article not found")
+    content_service.ensure_rendered(db, post)
+
+    # Increment view count (service worker precache fetches are not views).
+    # A view is not an edit, so updated_at is set to itself instead of bumped by onupdate.
+    if PRECACHE_HEADER not in request.headers:
+        db.execute(
+            update(KnowledgeBase)
+            .where(KnowledgeBase.id == post.id)
+            .values(views=KnowledgeBase.views + 1, updated_at=KnowledgeBase.updated_at)
+        )
+        db.commit()
+
+    related = kb_index.related(db, post.id, settings.KB_RELATED_LIMIT)
+
+    return template_service.render_template("kb_post.html", {"request": request, "post": post, "related": related})
+
+
+@router.get("/sw.js")
+async def service_worker():
+    """Service worker, served from the root so it can control every page"""
+    path = SERVICE_WORKER_BUILD if SERVICE_WORKER_BUILD.exists() else SERVICE_WORKER_SOURCE
+    return FileResponse(
+        path,
+        media_type="application/javascript",
+        headers={"Cache-Control": REVALIDATE_CACHE_CONTROL},
     )
 
-    # Increment view count
-    post.views += 1
-    db.commit()
 
-    return template_service.render_template("kb_post.html", {"request": request, "post": post})
+@router.get("/sw-precache.json")
+async def sw_precache(db: Session = Depends(get_db)):
+    """
+    Pages the service worker keeps available offline.
+
+    The most viewed knowledge base articles plus the listing pages. The
+    version changes whenever an article or blog post is edited, or another
+    article enters the most viewed set, so the service worker drops its
+    content cache and fetches fresh copies. Views alone do not change it:
+    the articles are fingerprinted by slug and content_hash, in slug order.
+    """
+    articles = sorted(
+        db.query(KnowledgeBase.slug, KnowledgeBase.content_hash)
+        .filter_by(is_published=True)
+        .order_by(KnowledgeBase.views.desc())
+        .limit(settings.SW_PRECACHE_ARTICLES)
+        .all()
+    )
+    latest = [
+        db.query(func.max(KnowledgeBase.updated_at)).scalar(),
+        db.query(func.max(BlogPost.updated_at)).scalar(),
+    ]
+
+    urls = ["/knowledge-base", "/blog"] + [f"/knowledge-base/{slug}" for slug, _ in articles]
+    fingerprint = json.dumps([urls, [content_hash for _, content_hash in articles], [str(t) for t in latest]])
+    version = hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
+
+    return JSONResponse(
+        {"version": version, "urls": urls},
+        headers={"Cache-Control": REVALIDATE_CACHE_CONTROL},
+    )
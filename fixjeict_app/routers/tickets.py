@@ -1,12 +1,24 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.orm import Session, selectinload
 
-from ..auth import check_ticket_access, require_fixer, require_login
+from ..auth import can_access_ticket, check_ticket_access, require_fixer, require_login
+from ..config import settings
 from ..database import get_db
 from ..email_service import email_service
-from ..models import Category, Message, Ticket, TicketNote, TimeLog
+from ..models import Attachment, Category, Message, Ticket, TicketNote, TimeLog
+from ..services import ticket_queue
+from ..services.archive_service import archive_service
+from ..services.attachment_service import INLINE_TYPES, UploadError, attachment_service
+from ..services.assignment_service import assignment_engine
+from ..services.event_service import (
+    FIXERS_CHANNEL,
+    SSE_HEADERS,
+    event_hub,
+    fixer_channel,
+    ticket_channel,
+)
 from ..services.template_service import template_service
 
 router = APIRouter()
@@ -63,6 +75,21 @@ async def dashboard(request: Request, user=Depends(require_login), db: Session =
     )
 
 
+@router.get("/dashboard/events")
+async def dashboard_events(request: Request, user=Depends(require_fixer), db: Session = Depends(get_db)):
+    """Server-Sent Events stream for the fixer dashboard"""
+    channels = [fixer_channel(user.id), FIXERS_CHANNEL]
+    # Release the DB connection before the long-lived stream starts
+    db.close()
+
+    subscriber = event_hub.subscribe(channels, include_internal=True)
+    return StreamingResponse(
+        event_hub.stream(request, subscriber, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.get("/tickets/new", response_class=HTMLResponse)
 async def new_ticket(request: Request, user=Depends(require_login), db: Session = Depends(get_db)):
     """Create new ticket page"""
@@ -97,6 +124,23 @@ async def new_ticket_submit(request: Request, user=Depends(require_login), db: S
     db.add(ticket)
     db.commit()
 
+    fixer_id = assignment_engine.assign(db, ticket) if settings.AUTO_ASSIGN_TICKETS else None
+    if fixer_id:
+        event_hub.publish(
+            db,
+            [ticket_channel(ticket.id), fixer_channel(fixer_id)],
+            "assigned",
+            {"ticket_id": ticket.id, "fixer_id": fixer_id, "title": ticket.title, "priority": ticket.priority},
+        )
+    else:
+        event_hub.publish(
+            db,
+            FIXERS_CHANNEL,
+            "ticket_created",
+            {"ticket_id": ticket.id, "title": ticket.title, "priority": ticket.priority},
+        )
+    db.commit()
+
     # Send email notification
     email_service.send_ticket_created(ticket, user.email)
 
@@ -116,10 +160,32 @@ async def ticket_detail(
     """Ticket detail page"""
     check_ticket_access(user, ticket_id, db)
 
-    ticket = db.query(Ticket).filter_by(id=ticket_id).first_or_404()
+    ticket = db.query(Ticket).filter_by(id=ticket_id).first()
+    if ticket is None:
+        # Long-closed tickets live in the archive tables, read-only
+        ticket = archive_service.get_ticket(db, ticket_id)
+        if ticket is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found")
+        include_internal = user.role in ["fixer", "admin"]
+        messages, notes, time_logs = archive_service.get_children(db, ticket_id, include_internal=include_internal)
+        return template_service.render_template(
+            "ticket_detail.html",
+            {
+                "request": request,
+                "user": user,
+                "ticket": ticket,
+                "messages": messages,
+                "notes": notes,
+                "time_logs": time_logs,
+                # Archived messages get new ids, so their files are listed per ticket
+                "attachments": attachment_service.for_ticket(db, ticket_id, include_internal),
+                "archived": True,
+            },
+        )
 
     messages = (
         db.query(Message)
+        .options(selectinload(Message.attachments))
         .filter_by(ticket_id=ticket_id, is_internal=False)
         .order_by(Message.created_at)
         .all()
@@ -154,6 +220,27 @@ async def ticket_detail(
     )
 
 
+@router.get("/tickets/{ticket_id}/events")
+async def ticket_events(
+    request: Request,
+    ticket_id: int,
+    user=Depends(require_login),
+    db: Session = Depends(get_db),
+):
+    """Server-Sent Events stream for a single ticket"""
+    check_ticket_access(user, ticket_id, db)
+    include_internal = user.role in ["fixer", "admin"]
+    # Release the DB connection before the long-lived stream starts
+    db.close()
+
+    subscriber = event_hub.subscribe([ticket_channel(ticket_id)], include_internal=include_internal)
+    return StreamingResponse(
+        event_hub.stream(request, subscriber, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.post("/tickets/{ticket_id}/message", response_class=HTMLResponse)
 async def add_message(
     request: Request,
@@ -163,20 +250,49 @@ async def add_message(
 ):
     """Add message to ticket"""
     check_ticket_access(user, ticket_id, db)
-
-    form_data = await request.form()
-    content = form_data.get("content")
+    # Archived tickets are read-only; refuse before any upload is written to disk
+    if db.query(Ticket.id).filter_by(id=ticket_id).first() is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Ticket is archived")
+
+    try:
+        form_data, files = await attachment_service.receive_form(request)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    content = (form_data.get("content") or "").strip()
     is_internal = form_data.get("is_internal") == "on" and user.role in ["fixer", "admin"]
+    if not content and not files:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Message is empty")
 
     message = Message(ticket_id=ticket_id, user_id=user.id, content=content, is_internal=is_internal)
+    attachments = attachment_service.attach(message, files)
     db.add(message)
+    db.flush()
+
+    ticket = db.query(Ticket).filter_by(id=ticket_id).first()
+
+    channels = [ticket_channel(ticket_id)]
+    if ticket and ticket.fixer_id and ticket.fixer_id != user.id:
+        channels.append(fixer_channel(ticket.fixer_id))
+    event_hub.publish(
+        db,
+        channels,
+        "message",
+        {
+            "id": message.id,
+            "ticket_id": ticket_id,
+            "user": user.name,
+            "content": message.content,
+            "is_internal": is_internal,
+            "created_at": message.created_at,
+            "attachments": [attachment_service.describe(attachment) for attachment in attachments],
+        },
+        is_internal=is_internal,
+    )
     db.commit()
 
     # Send notification to client if fixer responds
-    if user.role in ["fixer", "admin"] and not is_internal:
-        ticket = db.query(Ticket).filter_by(id=ticket_id).first()
-        if ticket:
-            email_service.send_message_notification(ticket, message, ticket.client.email)
+    if user.role in ["fixer", "admin"] and not is_internal and ticket:
+        email_service.send_message_notification(ticket, message, ticket.client.email)
 
     return RedirectResponse(
         url=f"/tickets/{ticket_id}",
@@ -184,6 +300,47 @@ async def add_message(
     )
 
 
+@router.get("/tickets/{ticket_id}/attachments/{attachment_id}")
+async def download_attachment(
+    ticket_id: int,
+    attachment_id: int,
+    user=Depends(require_login),
+    db: Session = Depends(get_db),
+):
+    """Serve an attachment straight from disk (Range requests included)"""
+    attachment = db.query(Attachment).filter_by(id=attachment_id).first()
+    if attachment is None or attachment.owner_id != ticket_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found")
+    # Access is checked on the ticket row the attachment points at, hot or archived
+    if attachment.ticket_id is not None:
+        owner = db.query(Ticket).filter_by(id=attachment.ticket_id).first()
+    else:
+        owner = archive_service.get_ticket(db, attachment.archived_ticket_id)
+    if owner is None or not can_access_ticket(user, owner):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied to this ticket")
+    if attachment.is_internal and user.role not in ["fixer", "admin"]:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found")
+    path = attachment_service.path(attachment.sha256)
+    if not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment file is missing")
+    inline = attachment.content_type in INLINE_TYPES
+    response = FileResponse(
+        path,
+        media_type=attachment.content_type,
+        filename=attachment.filename,
+        content_disposition_type="inline" if inline else "attachment",
+        headers={
+            # The file behind an id never changes
+            "Cache-Control": "private, max-age=86400",
+            "X-Content-Type-Options": "nosniff",
+            "Content-Security-Policy": "sandbox",
+        },
+    )
+    # Release the DB connection before a long download
+    db.close()
+    return response
+
+
 @router.post("/tickets/{ticket_id}/note", response_class=HTMLResponse)
 async def add_note(
     request: Request,
@@ -197,6 +354,21 @@ async def add_note(
 
     note = TicketNote(ticket_id=ticket_id, user_id=user.id, content=content)
     db.add(note)
+    db.flush()
+
+    event_hub.publish(
+        db,
+        ticket_channel(ticket_id),
+        "note",
+        {
+            "id": note.id,
+            "ticket_id": ticket_id,
+            "user": user.name,
+            "content": note.content,
+            "created_at": note.created_at,
+        },
+        is_internal=True,
+    )
     db.commit()
 
     return RedirectResponse(
@@ -231,6 +403,8 @@ async def log_time(
 
     db.commit()
 
+    assignment_engine.record_time(user.id, hours + minutes / 60)
+
     return RedirectResponse(
         url=f"/tickets/{ticket_id}",
         status_code=status.HTTP_303_SEE_OTHER,
@@ -245,12 +419,20 @@ async def claim_ticket(
     db: Session = Depends(get_db),
 ):
     """Claim a ticket (fixer only)"""
-    ticket = db.query(Ticket).filter_by(id=ticket_id).first_or_404()
-
-    if ticket.fixer_id:
+    if not ticket_queue.claim_ticket(db, ticket_id, user.id):
+        if not db.query(Ticket.id).filter_by(id=ticket_id).first():
+            raise HTTPException(status_code=404, detail="Ticket not found")
         raise HTTPException(status_code=400, detail="Ticket is already claimed")
 
-    ticket.fixer_id = user.id
+    category_id = db.query(Ticket.category_id).filter_by(id=ticket_id).scalar()
+    assignment_engine.record_assignment(user.id, category_id)
+
+    event_hub.publish(
+        db,
+        [ticket_channel(ticket_id), FIXERS_CHANNEL],
+        "claimed",
+        {"ticket_id": ticket_id, "fixer_id": user.id, "fixer": user.name},
+    )
     db.commit()
 
     return RedirectResponse(
@@ -259,6 +441,37 @@ async def claim_ticket(
     )
 
 
+@router.post("/tickets/next", response_class=HTMLResponse)
+async def claim_next_ticket(
+    request: Request,
+    user=Depends(require_fixer),
+    db: Session = Depends(get_db),
+):
+    """Claim the next ticket from the work queue (fixer only)"""
+    ticket = ticket_queue.claim_next_ticket(db, user.id)
+
+    if not ticket:
+        return RedirectResponse(
+            url="/dashboard",
+            status_code=status.HTTP_303_SEE_OTHER,
+        )
+
+    assignment_engine.record_assignment(user.id, ticket.category_id)
+
+    event_hub.publish(
+        db,
+        [ticket_channel(ticket.id), FIXERS_CHANNEL],
+        "claimed",
+        {"ticket_id": ticket.id, "fixer_id": user.id, "fixer": user.name},
+    )
+    db.commit()
+
+    return RedirectResponse(
+        url=f"/tickets/{ticket.id}",
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
+
+
 @router.post("/tickets/{ticket_id}/status", response_class=HTMLResponse)
 async def update_status(
     request: Request,
@@ -279,10 +492,21 @@ async def update_status(
     elif new_status == "Open" and ticket.closed_at:
         ticket.closed_at = None
 
+    if old_status != new_status:
+        channels = [ticket_channel(ticket_id)]
+        if ticket.fixer_id and ticket.fixer_id != user.id:
+            channels.append(fixer_channel(ticket.fixer_id))
+        event_hub.publish(
+            db,
+            channels,
+            "status",
+            {"ticket_id": ticket_id, "status": new_status, "old_status": old_status},
+        )
     db.commit()
 
-    # Send email notification to client
     if old_status != new_status:
+        assignment_engine.record_status_change(ticket.fixer_id, old_status, new_status)
+        # Send email notification to client
         email_service.send_ticket_updated(ticket, ticket.client.email, new_status)
 
     return RedirectResponse(
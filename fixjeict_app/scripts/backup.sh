@@ -1,42 +1,28 @@
 #!/bin/bash
 
 # FixJeICT v2 - Database Backup Script
-# Creates timestamped backups and keeps last 30 days
+# Takes an online backup (weekly full, incremental otherwise), verifies it
+# and prunes backup chains older than BACKUP_RETENTION_DAYS (default 30)
 
 # Configuration
 INSTALL_DIR="/opt/fixjeictv2"
-BACKUP_DIR="/var/backups/fixjeictv2"
-DB_NAME="fixjeict.db"
-RETENTION_DAYS=30
-
-# Create backup directory if it doesn't exist
-mkdir -p "$BACKUP_DIR"
-
-# Generate timestamp
-DATE=$(date +%Y%m%d_%H%M%S)
-
-# Backup file path
-BACKUP_FILE="$BACKUP_DIR/${DB_NAME%.*}_$DATE.db"
+PYTHON="$INSTALL_DIR/venv/bin/python"
+MODE="${1:-auto}"
 
 echo "FixJeICT v2 - Database Backup"
 echo "=============================="
 echo "Started at: $(date)"
 echo
 
-# Check if database exists
-if [ ! -f "$INSTALL_DIR/$DB_NAME" ]; then
-    echo "ERROR: Database not found at $INSTALL_DIR/$DB_NAME"
-    exit 1
-fi
+# Settings (DATABASE_URL, BACKUP_DIR, ...) are read from $INSTALL_DIR/.env
+cd "$INSTALL_DIR" || exit 1
 
-# Perform backup
-echo "Copying database..."
-cp "$INSTALL_DIR/$DB_NAME" "$BACKUP_FILE"
+# Perform backup; safe while the services are running
+echo "Creating $MODE backup..."
+MANIFEST=$("$PYTHON" -m fixjeict_app.backup "$MODE")
 
-if [ $? -eq 0 ]; then
-    # Get backup size
-    BACKUP_SIZE=$(du -h "$BACKUP_FILE" | cut -f1)
-    echo -e "✓ Backup created: $BACKUP_FILE ($BACKUP_SIZE)"
+if [ $? -eq 0 ] && [ -n "$MANIFEST" ]; then
+    echo -e "✓ Backup created: $MANIFEST"
 else
     echo "✗ Backup failed!"
     exit 1
@@ -44,23 +30,14 @@ fi
 
 echo
 
-# Clean old backups
-echo "Cleaning old backups (keeping last $RETENTION_DAYS days)..."
-REMOVED=$(ls -t "$BACKUP_DIR"/${DB_NAME%.*}_*.db 2>/dev/null | tail -n +$((RETENTION_DAYS + 1)) | wc -l)
-
-if [ "$REMOVED" -gt 0 ]; then
-    ls -t "$BACKUP_DIR"/${DB_NAME%.*}_*.db 2>/dev/null | tail -n +$((RETENTION_DAYS + 1)) | xargs rm -f
-    echo -e "✓ Removed $REMOVED old backup(s)"
+# Verify the new backup by restoring it to a scratch file
+echo "Verifying backup..."
+if "$PYTHON" -m fixjeict_app.backup verify "$(basename "$MANIFEST")"; then
+    echo -e "✓ Backup verified"
 else
-    echo "✓ No old backups to remove"
+    echo "✗ Backup verification failed!"
+    exit 1
 fi
 
-echo
-
-# List current backups
-echo "Current backups:"
-ls -lh "$BACKUP_DIR"/${DB_NAME%.*}_*.db 2>/dev/null | awk '{print "  " $9 " (" $5 ")"}' || echo "  No backups found"
-
 echo
 echo "Backup completed at: $(date)"
-echo "Total backups: $(ls -1 "$BACKUP_DIR"/${DB_NAME%.*}_*.db 2>/dev/null | wc -l)"
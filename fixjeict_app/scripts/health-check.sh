@@ -98,7 +98,7 @@ echo
 echo "Checking recent backups..."
 BACKUP_DIR="/var/backups/fixjeictv2"
 if [ -d "$BACKUP_DIR" ]; then
-    LATEST_BACKUP=$(ls -t "$BACKUP_DIR"/fixjeict_*.db 2>/dev/null | head -1)
+    LATEST_BACKUP=$(ls -t "$BACKUP_DIR"/fixjeict_*.json 2>/dev/null | head -1)
     if [ -n "$LATEST_BACKUP" ]; then
         BACKUP_AGE=$((($(date +%s) - $(stat -c %Y "$LATEST_BACKUP")) / 86400))
         BACKUP_SIZE=$(du -h "$LATEST_BACKUP" | cut -f1)
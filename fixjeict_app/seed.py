@@ -0,0 +1,400 @@
+"""
+Synthetic data generator for scale tests.
+
+Fills the configured database with users, tickets, messages, notes, time
+logs, auth tokens, articles and leads whose shapes follow production:
+message counts per ticket and tokens per user are heavy-tailed, a few
+clients file most tickets, recent tickets are open and old ones closed.
+Rows are generated from named random streams per table, so the same seed,
+shape and --until give the same data, and are written with batched
+executemany inserts. Rows are appended after the existing ids; run it
+against a scratch database.
+
+Usage:
+    python -m fixjeict_app.seed [--shape small|medium|large] [--seed 1]
+                                [--set tickets=500000 --set message_alpha=1.1 ...]
+    python -m fixjeict_app.seed --list-shapes
+"""
+
+import argparse
+import base64
+import json
+import logging
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, fields, replace
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from .models import (
+    AuthToken,
+    BlogPost,
+    Category,
+    KnowledgeBase,
+    Lead,
+    Message,
+    Ticket,
+    TicketNote,
+    TimeLog,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "printer netwerk wachtwoord router wifi laptop update back-up email outlook "
+    "account server licentie scherm toetsenbord installatie storing verbinding "
+    "beveiliging virus telefoon synchronisatie agenda bestand map rechten "
+    "kantoor werkplek koppeling instellingen foutmelding opstarten traag "
+    "de het een en van in is op niet met voor dat wordt bij na nog al"
+).split()
+
+CATEGORIES = ["Hardware", "Software", "Netwerk", "E-mail", "Printers", "Beveiliging", "Accounts"]
+PRIORITIES = ["laag", "normaal", "hoog", "spoed"]
+PRIORITY_WEIGHTS = [20, 60, 15, 5]
+OPEN_STATUSES = ["Open", "In behandeling", "Wacht op klant", "Wacht op leverancier (van klant)"]
+OPEN_STATUS_WEIGHTS = [30, 45, 20, 5]
+LEAD_STATUSES = ["new", "contacted", "in_progress", "closed"]
+CORPUS_WORDS = 200_000
+
+
+@dataclass
+class Shape:
+    """Row counts and distribution parameters of a generated dataset"""
+
+    users: int
+    tickets: int
+    articles: int
+    posts: int
+    leads: int
+    fixer_ratio: float = 0.05
+    # Pareto alpha of messages per ticket and tokens per user: lower is a heavier tail
+    message_alpha: float = 1.3
+    max_messages: int = 500
+    notes_per_ticket: float = 0.5
+    time_logs_per_ticket: float = 1.0
+    tokens_per_user: float = 8.0
+    token_alpha: float = 1.5
+    history_days: int = 3 * 365
+
+
+SHAPES: Dict[str, Shape] = {
+    "small": Shape(users=1_000, tickets=5_000, articles=200, posts=50, leads=500),
+    "medium": Shape(users=20_000, tickets=200_000, articles=2_000, posts=300, leads=10_000),
+    "large": Shape(users=200_000, tickets=2_000_000, articles=10_000, posts=1_000, leads=100_000),
+}
+
+
+class Seeder:
+    """Generates one dataset shape into a database"""
+
+    def __init__(
+        self,
+        engine: Engine,
+        shape: Shape,
+        seed: int = 1,
+        until: Optional[datetime] = None,
+        batch_size: int = 10_000,
+        render: bool = True,
+    ):
+        self.engine = engine
+        self.shape = shape
+        self.seed = seed
+        self.until = until or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.batch_size = batch_size
+        self.render = render
+        self.counts: Dict[str, int] = {}
+
+        # Texts are slices of one pre-generated word stream: a single random draw per text
+        words = self._rng("corpus").choices(WORDS, k=CORPUS_WORDS)
+        self._corpus = " ".join(words)
+        self._word_starts = list(accumulate((len(word) + 1 for word in words), initial=0))
+
+    def _rng(self, stream: str) -> random.Random:
+        """Independent stream per table, so growing one table leaves the others unchanged"""
+        return random.Random(f"{self.seed}:{stream}")
+
+    def _moment(self, rng: random.Random, recent_bias: bool = False) -> datetime:
+        """A point in the history window; with recent_bias the density grows linearly towards now"""
+        fraction = 1 - rng.random() ** 0.5 if recent_bias else rng.random()
+        return self.until - timedelta(seconds=fraction * self.shape.history_days * 86400)
+
+    def _text(self, rng: random.Random, words: int) -> str:
+        words = min(max(words, 1), CORPUS_WORDS // 2)
+        start = int(rng.random() * (CORPUS_WORDS - words))
+        return self._corpus[self._word_starts[start]:self._word_starts[start + words] - 1]
+
+    def _insert(self, conn, model, rows: List[dict]) -> None:
+        if rows:
+            conn.execute(model.__table__.insert(), rows)
+            self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(rows)
+
+    def _next_id(self, conn, model) -> int:
+        return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+    def run(self) -> Dict[str, int]:
+        """Generate every table; returns rows inserted per table"""
+        started = time.perf_counter()
+        with self.engine.begin() as conn:
+            category_ids = self._categories(conn)
+            client_ids, fixer_ids = self._users(conn)
+        self._tickets(category_ids, client_ids, fixer_ids)
+        self._auth_tokens(client_ids + fixer_ids)
+        with self.engine.begin() as conn:
+            self._articles(conn, KnowledgeBase, self.shape.articles)
+            self._articles(conn, BlogPost, self.shape.posts)
+            self._leads(conn)
+
+        elapsed = time.perf_counter() - started
+        total = sum(self.counts.values())
+        logger.info(f"Seeded {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)")
+        return dict(self.counts)
+
+    def _categories(self, conn) -> List[int]:
+        existing = {name: id for id, name in conn.execute(select(Category.id, Category.name))}
+        missing = [name for name in CATEGORIES if name not in existing]
+        self._insert(conn, Category, [
+            {"name": name, "order": index, "is_active": True, "created_at": self.until}
+            for index, name in enumerate(missing)
+        ])
+        return [id for id, in conn.execute(select(Category.id))]
+
+    def _users(self, conn):
+        rng = self._rng("users")
+        first_id = self._next_id(conn, User)
+        fixers = max(1, round(self.shape.users * self.shape.fixer_ratio))
+        rows = []
+        for id in range(first_id, first_id + self.shape.users):
+            role = "fixer" if id - first_id < fixers else "client"
+            created = self._moment(rng, recent_bias=True)
+            rows.append({
+                "id": id,
+                "email": f"{role}{id}@seed.test",
+                "name": f"{role.capitalize()} {id}",
+                "company": f"Bedrijf {rng.randint(1, max(self.shape.users // 10, 1))}" if rng.random() < 0.6 else None,
+                "role": role,
+                "is_active": rng.random() > 0.03,
+                "created_at": created,
+                "last_login": created + (self.until - created) * rng.random(),
+            })
+        for start in range(0, len(rows), self.batch_size):
+            self._insert(conn, User, rows[start:start + self.batch_size])
+        ids = [row["id"] for row in rows]
+        return ids[fixers:], ids[:fixers]
+
+    def _tickets(self, category_ids: List[int], client_ids: List[int], fixer_ids: List[int]) -> None:
+        """Tickets with their messages, notes and time logs, one transaction per batch"""
+        rng = self._rng("tickets")
+        children = self._rng("ticket_children")
+        shape = self.shape
+        # A few clients file most tickets
+        client_weights = list(accumulate(rng.paretovariate(1.2) for _ in client_ids))
+
+        with self.engine.connect() as conn:
+            next_id = self._next_id(conn, Ticket)
+        remaining = shape.tickets
+        while remaining > 0:
+            count = min(self.batch_size, remaining)
+            remaining -= count
+            tickets, messages, notes, time_logs = [], [], [], []
+            owners = rng.choices(client_ids, cum_weights=client_weights, k=count)
+            for client_id in owners:
+                created = self._moment(rng, recent_bias=True)
+                age_days = (self.until - created).days
+                if rng.random() < min(0.97, age_days / 30):
+                    status = "Gereed" if rng.random() < 0.92 else "Afgemeld"
+                    closed = created + timedelta(hours=rng.expovariate(1 / 72))
+                else:
+                    status = rng.choices(OPEN_STATUSES, OPEN_STATUS_WEIGHTS)[0]
+                    closed = None
+                fixer_id = rng.choice(fixer_ids) if status != "Open" or rng.random() < 0.2 else None
+                end = min(closed or self.until, self.until)
+                tickets.append({
+                    "id": next_id,
+                    "title": self._text(rng, rng.randint(3, 9)).capitalize(),
+                    "description": self._text(rng, 10 + int(rng.expovariate(1 / 60))),
+                    "status": status,
+                    "priority": rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+                    "client_id": client_id,
+                    "category_id": rng.choice(category_ids) if rng.random() < 0.8 else None,
+                    "fixer_id": fixer_id,
+                    "estimated_hours": round(rng.expovariate(1 / 3), 1) if fixer_id else None,
+                    "actual_hours": 0,
+                    "created_at": created,
+                    "updated_at": end,
+                    "closed_at": closed,
+                })
+
+                span = (end - created).total_seconds()
+                message_count = min(int(children.paretovariate(shape.message_alpha)) - 1, shape.max_messages)
+                for offset in sorted(children.random() for _ in range(message_count)):
+                    by_fixer = fixer_id is not None and children.random() < 0.45
+                    messages.append({
+                        "ticket_id": next_id,
+                        "user_id": fixer_id if by_fixer else client_id,
+                        "content": self._text(children, 3 + int(children.expovariate(1 / 30))),
+                        "is_internal": by_fixer and children.random() < 0.05,
+                        "created_at": created + timedelta(seconds=offset * span),
+                    })
+                if fixer_id is not None:
+                    for _ in range(int(children.expovariate(1 / shape.notes_per_ticket)) if shape.notes_per_ticket else 0):
+                        notes.append({
+                            "ticket_id": next_id,
+                            "user_id": fixer_id,
+                            "content": self._text(children, children.randint(4, 40)),
+                            "created_at": created + timedelta(seconds=children.random() * span),
+                        })
+                    for _ in range(int(children.expovariate(1 / shape.time_logs_per_ticket)) if shape.time_logs_per_ticket else 0):
+                        time_logs.append({
+                            "ticket_id": next_id,
+                            "user_id": fixer_id,
+                            "hours": children.choices([0, 1, 2, 3, 4], [40, 30, 15, 10, 5])[0],
+                            "minutes": children.choice([0, 15, 30, 45]),
+                            "description": self._text(children, children.randint(2, 12)),
+                            "created_at": created + timedelta(seconds=children.random() * span),
+                        })
+                next_id += 1
+
+            with self.engine.begin() as conn:
+                self._insert(conn, Ticket, tickets)
+                for model, rows in ((Message, messages), (TicketNote, notes), (TimeLog, time_logs)):
+                    for start in range(0, len(rows), self.batch_size):
+                        self._insert(conn, model, rows[start:start + self.batch_size])
+            logger.info(f"Tickets: {shape.tickets - remaining}/{shape.tickets}")
+
+    def _auth_tokens(self, user_ids: List[int]) -> None:
+        """Magic-link history: most tokens used and long expired, a heavy tail of frequent users"""
+        rng = self._rng("auth_tokens")
+        scale = self.shape.tokens_per_user * (self.shape.token_alpha - 1) / self.shape.token_alpha
+        rows: List[dict] = []
+        for user_id in user_ids:
+            for _ in range(min(int(scale * rng.paretovariate(self.shape.token_alpha)), 1000)):
+                created = self._moment(rng, recent_bias=True)
+                expires = created + timedelta(hours=24)
+                rows.append({
+                    "user_id": user_id,
+                    "token": base64.urlsafe_b64encode(rng.getrandbits(192).to_bytes(24, "big")).decode(),
+                    "expires_at": expires,
+                    "created_at": created,
+                    "used": expires < self.until or rng.random() < 0.5,
+                })
+            if len(rows) >= self.batch_size:
+                with self.engine.begin() as conn:
+                    self._insert(conn, AuthToken, rows)
+                rows = []
+        with self.engine.begin() as conn:
+            self._insert(conn, AuthToken, rows)
+
+    def _articles(self, conn, model, count: int) -> None:
+        from .services.content_service import content_service
+
+        rng = self._rng(model.__tablename__)
+        first_id = self._next_id(conn, model)
+        prefix = "kb" if model is KnowledgeBase else "post"
+        rows = []
+        for id in range(first_id, first_id + count):
+            sections = [
+                f"## {self._text(rng, rng.randint(2, 5))}\n\n"
+                + "\n\n".join(self._text(rng, rng.randint(20, 80)) + "." for _ in range(rng.randint(1, 4)))
+                for _ in range(1 + int(rng.expovariate(1 / 3)))
+            ]
+            content = "\n\n".join(sections)
+            created = self._moment(rng)
+            row = {
+                "id": id,
+                "title": self._text(rng, rng.randint(3, 8)).capitalize(),
+                "slug": f"{prefix}-{id}",
+                "content": content,
+                "is_published": rng.random() < 0.9,
+                "created_at": created,
+                # Long-lived articles keep being edited
+                "updated_at": min(created + timedelta(days=rng.expovariate(1 / 90)), self.until),
+                "content_html": None,
+                "content_excerpt": None,
+                "content_toc": None,
+                "content_hash": None,
+            }
+            if self.render:
+                rendered = content_service.render(content)
+                row.update(
+                    content_html=rendered.html,
+                    content_excerpt=rendered.excerpt,
+                    content_toc=json.dumps(rendered.toc),
+                    content_hash=rendered.digest,
+                )
+            if model is KnowledgeBase:
+                row.update(category=rng.choice(CATEGORIES), views=int(rng.paretovariate(1.1) * 10) - 10)
+            else:
+                row.update(excerpt=None, published_at=created if row["is_published"] else None)
+            rows.append(row)
+        for start in range(0, len(rows), self.batch_size):
+            self._insert(conn, model, rows[start:start + self.batch_size])
+
+    def _leads(self, conn) -> None:
+        rng = self._rng("leads")
+        rows = []
+        for i in range(self.shape.leads):
+            created = self._moment(rng, recent_bias=True)
+            age_days = (self.until - created).days
+            rows.append({
+                "name": f"Lead {i}",
+                "email": f"lead{i}@seed.test",
+                "company": f"Bedrijf {rng.randint(1, 5000)}" if rng.random() < 0.7 else None,
+                "phone": f"06{rng.randint(10000000, 99999999)}" if rng.random() < 0.5 else None,
+                "message": self._text(rng, rng.randint(5, 80)),
+                "status": "new" if age_days < 2 else rng.choices(LEAD_STATUSES, [5, 25, 20, 50])[0],
+                "created_at": created,
+            })
+            if len(rows) >= self.batch_size:
+                self._insert(conn, Lead, rows)
+                rows = []
+        self._insert(conn, Lead, rows)
+
+
+def _parse_override(value: str):
+    name, _, raw = value.partition("=")
+    types = {field.name: field.type for field in fields(Shape)}
+    if name not in types or not raw:
+        raise argparse.ArgumentTypeError(f"expected FIELD=VALUE with FIELD one of {', '.join(types)}")
+    cast = float if types[name] in (float, "float") else int
+    return name, cast(raw.replace("_", ""))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m fixjeict_app.seed")
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="small")
+    parser.add_argument("--set", dest="overrides", action="append", type=_parse_override, default=[],
+                        metavar="FIELD=VALUE", help="Override one shape field, e.g. tickets=500000")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--until", type=datetime.fromisoformat,
+                        help="Newest timestamp (default: today 00:00 UTC); fix it to reproduce a dataset later")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--no-render", action="store_true", help="Leave article HTML to be rendered on first view")
+    parser.add_argument("--list-shapes", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.list_shapes:
+        for name, shape in SHAPES.items():
+            print(f"{name}: {json.dumps(asdict(shape))}")
+        return 0
+
+    from . import migrations
+    from .database import engine
+
+    migrations.upgrade(engine)
+    shape = replace(SHAPES[args.shape], **dict(args.overrides))
+    seeder = Seeder(engine, shape, seed=args.seed, until=args.until, batch_size=args.batch_size, render=not args.no_render)
+    for table, rows in seeder.run().items():
+        print(f"{table:<24} {rows:>10} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Production launcher: gunicorn managing uvicorn workers.
+
+Usage:
+    python -m fixjeict_app.serve main     # public app on PORT, WORKERS processes
+    python -m fixjeict_app.serve admin    # admin portal on ADMIN_PORT, one process
+    python -m fixjeict_app.serve combined # both, on PORT and ADMIN_PORT, in WORKERS processes
+    python -m fixjeict_app.serve main --print-config
+
+The pre-start hook runs first (not for admin), before gunicorn starts;
+the manager then imports the app once (PRELOAD_APP) and forks the workers
+from it, so they share its memory copy-on-write and skip the import.
+Workers are replaced after WORKER_MAX_REQUESTS plus a random jitter,
+which caps memory growth without recycling them all at once. SIGTERM and
+SIGHUP give workers WORKER_GRACEFUL_TIMEOUT seconds to finish in-flight
+requests; SIGHUP keeps the preloaded code, so restart the service to
+deploy a new release.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import sys
+from typing import Any, Dict
+
+from .config import settings
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.util import import_app
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # gunicorn does not run on Windows; use python app.py there
+    BaseApplication = object
+    UvicornWorker = object
+
+logger = logging.getLogger(__name__)
+
+APPS = {"main": "app:app", "admin": "admin_app:admin_app", "combined": "combined_app:combined_app"}
+
+# Extra seconds gunicorn waits after uvicorn's own shutdown timeout, for the lifespan shutdown
+SHUTDOWN_HEADROOM = 5
+
+
+class Worker(UvicornWorker):
+    """Uvicorn worker that cancels open streams (SSE) once the graceful timeout has passed"""
+
+    CONFIG_KWARGS = {"timeout_graceful_shutdown": settings.WORKER_GRACEFUL_TIMEOUT}
+
+
+class Launcher(BaseApplication):
+    def __init__(self, target: str, options: Dict[str, Any]):
+        self.target = target
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return import_app(self.target)
+
+
+def _when_ready(server) -> None:
+    """Last step in the manager before the first fork"""
+    from .database import dispose_engines
+
+    # Connections opened by the pre-start hook and the app import must not be inherited by the workers
+    dispose_engines()
+    # Keep the preloaded objects out of the collector, so it never writes to the shared pages
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Forking workers from {gc.get_freeze_count()} preloaded objects")
+
+
+def options(app_name: str) -> Dict[str, Any]:
+    """gunicorn settings for one of the apps, from Settings"""
+    main = app_name != "admin"
+    ports = {"main": [settings.PORT], "admin": [settings.ADMIN_PORT], "combined": [settings.PORT, settings.ADMIN_PORT]}
+    config = {
+        "bind": [f"{settings.HOST}:{port}" for port in ports[app_name]],
+        "workers": settings.worker_count if main else 1,
+        "worker_class": "fixjeict_app.serve.Worker",
+        "preload_app": settings.PRELOAD_APP,
+        "max_requests": settings.WORKER_MAX_REQUESTS,
+        "max_requests_jitter": settings.WORKER_MAX_REQUESTS_JITTER,
+        "timeout": settings.WORKER_TIMEOUT,
+        "graceful_timeout": settings.WORKER_GRACEFUL_TIMEOUT + SHUTDOWN_HEADROOM,
+        "keepalive": settings.WORKER_KEEPALIVE,
+        "proc_name": f"fixjeict-{app_name}",
+        "when_ready": _when_ready,
+    }
+    return config
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m fixjeict_app.serve")
+    parser.add_argument("app", choices=sorted(APPS))
+    parser.add_argument("--print-config", action="store_true", help="Show the gunicorn settings and exit")
+    args = parser.parse_args()
+
+    config = options(args.app)
+    if args.print_config:
+        print(json.dumps({key: value for key, value in config.items() if not callable(value)}, indent=2))
+        return 0
+    if BaseApplication is object:
+        print("gunicorn is not installed: pip install gunicorn, or run python app.py", file=sys.stderr)
+        return 1
+
+    if args.app != "admin":
+        # Not an on_starting hook: with preload_app, gunicorn imports the app before that runs.
+        # The admin service shares the database and templates and leaves them to this one.
+        from .prestart import run as prestart
+
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        prestart()
+
+    Launcher(APPS[args.app], config).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
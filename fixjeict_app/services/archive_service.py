@@ -0,0 +1,201 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, literal, select, text, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import (
+    ArchivedMessage,
+    ArchivedTicket,
+    ArchivedTicketNote,
+    ArchivedTimeLog,
+    Attachment,
+    Message,
+    Ticket,
+    TicketNote,
+    TimeLog,
+)
+
+logger = logging.getLogger(__name__)
+
+# (hot model, archive model) for the rows hanging off a ticket
+CHILD_TABLES = [
+    (Message, ArchivedMessage),
+    (TicketNote, ArchivedTicketNote),
+    (TimeLog, ArchivedTimeLog),
+]
+
+# Tables reported by table_sizes, hot first
+SIZED_TABLES = [
+    Ticket, Message, TicketNote, TimeLog,
+    ArchivedTicket, ArchivedMessage, ArchivedTicketNote, ArchivedTimeLog,
+]
+
+
+class ArchiveService:
+    """
+    Moves long-closed tickets out of the hot tables.
+
+    Tickets closed ("Gereed") more than ARCHIVE_AFTER_MONTHS ago are copied,
+    together with their messages, notes and time logs, into the archived_*
+    tables and then deleted from the hot tables, one batch per transaction.
+    Archived tickets keep their id and stay readable on the ticket page.
+    """
+
+    def cutoff(self, months: Optional[int] = None) -> datetime:
+        months = settings.ARCHIVE_AFTER_MONTHS if months is None else months
+        return datetime.utcnow() - timedelta(days=30 * months)
+
+    def _candidate_ids(self, db: Session, cutoff: datetime, limit: int) -> List[int]:
+        # tickets uses AUTOINCREMENT (migration 0009), so archived ids are never reused
+        return [
+            row.id
+            for row in db.query(Ticket.id)
+            .filter(
+                Ticket.status == "Gereed",
+                Ticket.closed_at.isnot(None),
+                Ticket.closed_at < cutoff,
+            )
+            .order_by(Ticket.closed_at)
+            .limit(limit)
+        ]
+
+    def _move(self, db: Session, hot, archive, where, keep_id: bool, now: datetime) -> None:
+        self._copy(db, hot, archive, where, keep_id, now)
+        db.execute(hot.__table__.delete().where(where))
+
+    @staticmethod
+    def _copy(db: Session, hot, archive, where, keep_id: bool, now: datetime) -> None:
+        # Child rows get fresh archive ids; their hot ids can be reused by SQLite
+        columns = [c.name for c in hot.__table__.columns if keep_id or c.name != "id"]
+        selected = [hot.__table__.c[name] for name in columns]
+        if "archived_at" in archive.__table__.c:
+            columns.append("archived_at")
+            selected.append(literal(now))
+
+        db.execute(
+            insert(archive.__table__).from_select(
+                columns, select(*selected).where(where).order_by(hot.__table__.c.id)
+            )
+        )
+
+    def archive_closed_tickets(
+        self,
+        db: Session,
+        months: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        pause: float = 0.05,
+    ) -> int:
+        """Archive tickets closed before the cutoff; returns the number moved"""
+        cutoff = self.cutoff(months)
+        batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        total = 0
+        started = time.monotonic()
+
+        while True:
+            ticket_ids = self._candidate_ids(db, cutoff, batch_size)
+            db.rollback()
+            if not ticket_ids:
+                break
+
+            now = datetime.utcnow()
+            try:
+                for hot, archive in CHILD_TABLES:
+                    self._move(db, hot, archive, hot.ticket_id.in_(ticket_ids), False, now)
+                self._copy(db, Ticket, ArchivedTicket, Ticket.id.in_(ticket_ids), True, now)
+                # Attachments stay where they are and follow their ticket (deleting it would cascade to them)
+                db.execute(
+                    update(Attachment)
+                    .where(Attachment.ticket_id.in_(ticket_ids))
+                    .values(archived_ticket_id=Attachment.ticket_id, ticket_id=None)
+                )
+                db.execute(Ticket.__table__.delete().where(Ticket.id.in_(ticket_ids)))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+            total += len(ticket_ids)
+            if len(ticket_ids) < batch_size:
+                break
+            # Let queued writers in between batches
+            time.sleep(pause)
+
+        if total:
+            logger.info(
+                f"Archived {total} ticket(s) closed before {cutoff:%Y-%m-%d} "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        return total
+
+    def get_ticket(self, db: Session, ticket_id: int) -> Optional[ArchivedTicket]:
+        return db.query(ArchivedTicket).filter_by(id=ticket_id).first()
+
+    def get_children(
+        self, db: Session, ticket_id: int, include_internal: bool
+    ) -> Tuple[List[ArchivedMessage], List[ArchivedTicketNote], List[ArchivedTimeLog]]:
+        """Messages, notes and time logs of an archived ticket, ordered like the live page"""
+        messages = db.query(ArchivedMessage).filter_by(ticket_id=ticket_id)
+        if not include_internal:
+            messages = messages.filter_by(is_internal=False)
+        messages = messages.order_by(ArchivedMessage.created_at).all()
+
+        notes: List[ArchivedTicketNote] = []
+        time_logs: List[ArchivedTimeLog] = []
+        if include_internal:
+            notes = (
+                db.query(ArchivedTicketNote)
+                .filter_by(ticket_id=ticket_id)
+                .order_by(ArchivedTicketNote.created_at)
+                .all()
+            )
+            time_logs = (
+                db.query(ArchivedTimeLog)
+                .filter_by(ticket_id=ticket_id)
+                .order_by(ArchivedTimeLog.created_at.desc())
+                .all()
+            )
+        return messages, notes, time_logs
+
+    def table_sizes(self, db: Session) -> List[Dict]:
+        """Row counts (and on-disk bytes where the database reports them) per table"""
+        sizes = {
+            model.__tablename__: {
+                "table": model.__tablename__,
+                "rows": db.query(func.count(model.id)).scalar(),
+                "bytes": None,
+            }
+            for model in SIZED_TABLES
+        }
+
+        dialect = db.bind.dialect.name if db.bind is not None else ""
+        try:
+            if dialect == "sqlite":
+                # Requires SQLite built with SQLITE_ENABLE_DBSTAT_VTAB; indexes count towards their table
+                rows = db.execute(
+                    text(
+                        "SELECT COALESCE(m.tbl_name, s.name), SUM(s.pgsize) FROM dbstat s "
+                        "LEFT JOIN sqlite_master m ON m.name = s.name GROUP BY 1"
+                    )
+                )
+            elif dialect == "postgresql":
+                rows = db.execute(
+                    text("SELECT relname, pg_total_relation_size(relid) FROM pg_catalog.pg_statio_user_tables")
+                )
+            else:
+                rows = []
+            for name, size in rows:
+                if name in sizes:
+                    sizes[name]["bytes"] = size
+        except Exception as e:
+            logger.debug(f"Table byte sizes unavailable: {e}")
+            db.rollback()
+
+        return list(sizes.values())
+
+
+# Global archive service instance
+archive_service = ArchiveService()
@@ -0,0 +1,288 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import ArchivedTicket, SiteConfig, Ticket, TimeLog, User
+from .ticket_queue import CLOSED_STATUSES, claim_ticket, queue_query
+
+logger = logging.getLogger(__name__)
+
+# Score weights; the fixer with the lowest score gets the ticket
+LOAD_WEIGHT = 1.0
+AFFINITY_WEIGHT = 2.0
+HOURS_WEIGHT = 0.1
+
+# site_config key changed by invalidate() so every process reloads its stats
+STATS_VERSION_KEY = "assignment_stats_version"
+
+
+class FixerStats:
+    """Running workload figures for a single fixer"""
+
+    __slots__ = ("user_id", "open_load", "category_counts", "total_handled", "hours_log", "hours_total")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.open_load = 0
+        self.category_counts: Dict[int, int] = {}
+        self.total_handled = 0
+        self.hours_log: deque = deque()
+        self.hours_total = 0.0
+
+    def add_hours(self, logged_at: datetime, hours: float) -> None:
+        self.hours_log.append((logged_at, hours))
+        self.hours_total += hours
+
+    def recent_hours(self, cutoff: datetime) -> float:
+        """Hours logged since cutoff, expiring older entries as it goes"""
+        while self.hours_log and self.hours_log[0][0] < cutoff:
+            _, hours = self.hours_log.popleft()
+            self.hours_total -= hours
+        return max(self.hours_total, 0.0)
+
+    def affinity(self, category_id: Optional[int]) -> float:
+        """Share of this fixer's past tickets that were in the given category"""
+        if category_id is None or not self.total_handled:
+            return 0.0
+        return self.category_counts.get(category_id, 0) / self.total_handled
+
+
+class AssignmentEngine:
+    """
+    Automatic ticket routing for fixers.
+
+    Per-fixer open load, category affinity and recently logged hours are
+    loaded once and then kept up to date by the ticket handlers, so picking
+    a fixer for a new ticket never scans the ticket tables. The stats are
+    reloaded every ASSIGNMENT_REFRESH_SECONDS to pick up claims made by other
+    workers, and straight away when invalidate() changed the version stored
+    in site_config (e.g. from the admin app).
+    """
+
+    def __init__(self):
+        self._stats: Dict[int, FixerStats] = {}
+        self._loaded_at: Optional[float] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _hours_cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=settings.ASSIGNMENT_HOURS_WINDOW_DAYS)
+
+    def _db_version(self, db: Session) -> Optional[str]:
+        return db.query(SiteConfig.value).filter_by(key=STATS_VERSION_KEY).scalar()
+
+    def load(self, db: Session) -> None:
+        """(Re)build all fixer stats from the database"""
+        version = self._db_version(db)
+        fixer_ids = [
+            row.id
+            for row in db.query(User.id).filter(User.role == "fixer", User.is_active == True)  # noqa: E712
+        ]
+        stats = {fixer_id: FixerStats(fixer_id) for fixer_id in fixer_ids}
+
+        if fixer_ids:
+            open_counts = (
+                db.query(Ticket.fixer_id, func.count(Ticket.id))
+                .filter(Ticket.fixer_id.in_(fixer_ids), Ticket.status.notin_(CLOSED_STATUSES))
+                .group_by(Ticket.fixer_id)
+            )
+            for fixer_id, count in open_counts:
+                stats[fixer_id].open_load = count
+
+            # Archived tickets still count towards a fixer's category history
+            for model in (Ticket, ArchivedTicket):
+                category_counts = (
+                    db.query(model.fixer_id, model.category_id, func.count(model.id))
+                    .filter(model.fixer_id.in_(fixer_ids), model.category_id.isnot(None))
+                    .group_by(model.fixer_id, model.category_id)
+                )
+                for fixer_id, category_id, count in category_counts:
+                    counts = stats[fixer_id].category_counts
+                    counts[category_id] = counts.get(category_id, 0) + count
+                    stats[fixer_id].total_handled += count
+
+            time_logs = (
+                db.query(TimeLog.user_id, TimeLog.created_at, TimeLog.hours, TimeLog.minutes)
+                .filter(TimeLog.user_id.in_(fixer_ids), TimeLog.created_at >= self._hours_cutoff())
+                .order_by(TimeLog.created_at)
+            )
+            for user_id, created_at, hours, minutes in time_logs:
+                stats[user_id].add_hours(created_at, (hours or 0) + (minutes or 0) / 60)
+
+        with self._lock:
+            self._stats = stats
+            self._loaded_at = time.monotonic()
+            self._version = version
+        logger.debug(f"Loaded assignment stats for {len(stats)} fixers")
+
+    def invalidate(self, db: Session) -> None:
+        """Make every process reload its stats on next use; commits"""
+        self._loaded_at = None
+        config = db.query(SiteConfig).filter_by(key=STATS_VERSION_KEY).first()
+        if config is None:
+            config = SiteConfig(key=STATS_VERSION_KEY, description="Changed to reload fixer assignment stats")
+            db.add(config)
+        config.value = uuid.uuid4().hex
+        db.commit()
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > settings.ASSIGNMENT_REFRESH_SECONDS
+            or self._db_version(db) != self._version
+        ):
+            self.load(db)
+
+    # Scoring
+
+    def score(self, stats: FixerStats, category_id: Optional[int], cutoff: datetime) -> float:
+        """Lower is better"""
+        return (
+            LOAD_WEIGHT * stats.open_load
+            + HOURS_WEIGHT * stats.recent_hours(cutoff)
+            - AFFINITY_WEIGHT * stats.affinity(category_id)
+        )
+
+    def best_fixer(self, category_id: Optional[int], exclude: Tuple[int, ...] = ()) -> Optional[int]:
+        """Best-scoring fixer for a ticket in the given category"""
+        # A plain scan: there are tens of fixers, and scores depend on the
+        # category and on hours that expire over time, so a heap would have
+        # to be rebuilt per call anyway
+        cutoff = self._hours_cutoff()
+        best_id = None
+        best_key = None
+        with self._lock:
+            for fixer_id, stats in self._stats.items():
+                if fixer_id in exclude:
+                    continue
+                key = (self.score(stats, category_id, cutoff), stats.open_load, fixer_id)
+                if best_key is None or key < best_key:
+                    best_id, best_key = fixer_id, key
+        return best_id
+
+    def assign(self, db: Session, ticket: Ticket) -> Optional[int]:
+        """Assign an unclaimed ticket to the best fixer; returns the fixer id"""
+        self._ensure_loaded(db)
+        fixer_id = self.best_fixer(ticket.category_id)
+        if fixer_id is None:
+            return None
+
+        category_id = ticket.category_id
+        if not claim_ticket(db, ticket.id, fixer_id):
+            return None
+
+        self.record_assignment(fixer_id, category_id)
+        logger.info(f"Auto-assigned ticket {ticket.id} to fixer {fixer_id}")
+        return fixer_id
+
+    # Incremental updates
+
+    def record_assignment(self, fixer_id: int, category_id: Optional[int]) -> None:
+        with self._lock:
+            stats = self._stats.get(fixer_id)
+            if stats is None:
+                return
+            stats.open_load += 1
+            if category_id is not None:
+                stats.category_counts[category_id] = stats.category_counts.get(category_id, 0) + 1
+                stats.total_handled += 1
+
+    def record_unassignment(self, fixer_id: int) -> None:
+        with self._lock:
+            stats = self._stats.get(fixer_id)
+            if stats is not None:
+                stats.open_load = max(stats.open_load - 1, 0)
+
+    def record_status_change(self, fixer_id: Optional[int], old_status: str, new_status: str) -> None:
+        if fixer_id is None:
+            return
+        was_open = old_status not in CLOSED_STATUSES
+        is_open = new_status not in CLOSED_STATUSES
+        if was_open and not is_open:
+            self.record_unassignment(fixer_id)
+        elif is_open and not was_open:
+            with self._lock:
+                stats = self._stats.get(fixer_id)
+                if stats is not None:
+                    stats.open_load += 1
+
+    def record_time(self, user_id: int, hours: float) -> None:
+        with self._lock:
+            stats = self._stats.get(user_id)
+            if stats is not None:
+                stats.add_hours(datetime.utcnow(), hours)
+
+    # Batch mode
+
+    def rebalance(self, db: Session, move_open: bool = True) -> List[Tuple[int, Optional[int], int]]:
+        """
+        Assign the unclaimed backlog and, optionally, even out the load.
+
+        With move_open, tickets still in status "Open" are moved away from
+        fixers whose load is above the average. Returns a list of
+        (ticket_id, previous_fixer_id, new_fixer_id).
+        """
+        self.load(db)
+        moves: List[Tuple[int, Optional[int], int]] = []
+
+        backlog = queue_query(db).add_columns(Ticket.category_id).all()
+        db.rollback()
+        for ticket_id, category_id in backlog:
+            fixer_id = self.best_fixer(category_id)
+            if fixer_id is None:
+                break
+            if claim_ticket(db, ticket_id, fixer_id):
+                self.record_assignment(fixer_id, category_id)
+                moves.append((ticket_id, None, fixer_id))
+
+        if not move_open or len(self._stats) < 2:
+            return moves
+
+        average = sum(stats.open_load for stats in self._stats.values()) / len(self._stats)
+        for donor in sorted(self._stats.values(), key=lambda s: s.open_load, reverse=True):
+            if donor.open_load <= average + 1:
+                break
+            movable = (
+                db.query(Ticket.id, Ticket.category_id)
+                .filter(Ticket.fixer_id == donor.user_id, Ticket.status == "Open")
+                .order_by(Ticket.created_at.desc())
+                .all()
+            )
+            for ticket_id, category_id in movable:
+                if donor.open_load <= average + 1:
+                    break
+                target_id = self.best_fixer(category_id, exclude=(donor.user_id,))
+                if target_id is None or self._stats[target_id].open_load + 1 >= donor.open_load:
+                    break
+                moved = (
+                    db.query(Ticket)
+                    .filter(
+                        Ticket.id == ticket_id,
+                        Ticket.fixer_id == donor.user_id,
+                        Ticket.status == "Open",
+                    )
+                    .update(
+                        {Ticket.fixer_id: target_id, Ticket.updated_at: datetime.utcnow()},
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if moved:
+                    self.record_unassignment(donor.user_id)
+                    self.record_assignment(target_id, category_id)
+                    moves.append((ticket_id, donor.user_id, target_id))
+
+        logger.info(f"Rebalanced tickets: {len(moves)} assignment(s) changed")
+        return moves
+
+
+# Global assignment engine instance
+assignment_engine = AssignmentEngine()
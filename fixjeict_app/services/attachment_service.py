@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Tuple
+
+import anyio
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from ..config import settings
+from ..models import Attachment, Message
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Shown in the browser; every other type is served as a download
+INLINE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp", "application/pdf", "text/plain"}
+
+# Text fields sent along with the files (the message itself)
+MAX_FIELD_BYTES = 1024 * 1024
+
+# Download URLs, as built by describe()
+ATTACHMENT_PATH = re.compile(r"^/tickets/\d+/attachments/\d+$")
+
+
+class UploadError(ValueError):
+    """A rejected upload, with the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class StoredFile:
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+
+
+def _clean_filename(raw: bytes) -> str:
+    # Old browsers send the full client path
+    name = raw.decode("utf-8", errors="replace").replace("\\", "/").rsplit("/", 1)[-1]
+    name = "".join(c for c in name if c.isprintable() and c not in '"').strip()
+    return name[-255:] or "bijlage"
+
+
+class MultipartReceiver:
+    """
+    Incremental multipart/form-data parser.
+
+    Each chunk of the request body is fed to the parser as it arrives. File
+    parts are hashed and written to a temporary file chunk by chunk and then
+    moved to their content-addressed path, so a worker never holds more
+    than one chunk of an upload in memory.
+    """
+
+    def __init__(self, boundary: bytes, directory: Path, max_file_bytes: int, max_files: int):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.fields: Dict[str, str] = {}
+        self.files: List[StoredFile] = []
+
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name = ""
+        self._filename: Optional[str] = None
+        self._value = bytearray()
+        self._file: Optional[IO[bytes]] = None
+        self._hash = None
+        self._size = 0
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def feed(self, chunk: bytes) -> None:
+        self._parser.write(chunk)
+
+    def finish(self) -> None:
+        self._parser.finalize()
+
+    def abort(self) -> None:
+        """Remove the part being written; stored files are left to prune()"""
+        if self._file is not None:
+            self._file.close()
+            Path(self._file.name).unlink(missing_ok=True)
+            self._file = None
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._name = ""
+        self._filename = None
+        self._value = bytearray()
+        self._size = 0
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        filename = options.get(b"filename")
+        if filename is None:
+            return
+        # An empty file input still sends a part, with filename=""
+        if not filename:
+            self._filename = ""
+            return
+        if len(self.files) >= self.max_files:
+            raise UploadError(f"At most {self.max_files} attachments per message")
+        self._filename = _clean_filename(filename)
+        tmp_dir = self.directory / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=tmp_dir, prefix="upload-", delete=False)
+        self._hash = hashlib.sha256()
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        if self._filename is None:
+            if len(self._value) + len(chunk) > MAX_FIELD_BYTES:
+                raise UploadError(f"Form field {self._name} is too large", 413)
+            self._value += chunk
+        elif self._file is not None:
+            self._size += len(chunk)
+            if self._size > self.max_file_bytes:
+                raise UploadError(f"{self._filename} is larger than {self.max_file_bytes} bytes", 413)
+            self._hash.update(chunk)
+            self._file.write(chunk)
+
+    def _on_part_end(self) -> None:
+        if self._filename is None:
+            self.fields[self._name] = self._value.decode("utf-8", errors="replace")
+            return
+        if self._file is None:
+            return
+
+        self._file.close()
+        tmp = Path(self._file.name)
+        self._file = None
+        if not self._size:
+            tmp.unlink(missing_ok=True)
+            return
+
+        digest = self._hash.hexdigest()
+        target = attachment_service.path(digest)
+        if target.exists():
+            # Same content uploaded before: keep the stored copy, fresh enough that prune() leaves it
+            tmp.unlink(missing_ok=True)
+            os.utime(target)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, target)
+        content_type = mimetypes.guess_type(self._filename)[0] or "application/octet-stream"
+        self.files.append(StoredFile(self._filename, content_type, self._size, digest))
+
+
+class AttachmentService:
+    """Message attachments: streamed uploads, deduplicated storage and cleanup"""
+
+    @property
+    def directory(self) -> Path:
+        return settings.ATTACHMENT_DIR
+
+    def path(self, sha256: str) -> Path:
+        return self.directory / sha256[:2] / sha256
+
+    @property
+    def max_request_bytes(self) -> int:
+        return settings.ATTACHMENT_MAX_BYTES * settings.ATTACHMENT_MAX_FILES + MAX_FIELD_BYTES
+
+    async def receive_form(self, request: Request) -> Tuple[Dict[str, str], List[StoredFile]]:
+        """
+        Read a form that may carry attachments, streaming the files to disk.
+        URL-encoded forms (no files) are read the usual way.
+        """
+        content_type, options = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data":
+            form = await request.form()
+            return {key: value for key, value in form.items() if isinstance(value, str)}, []
+
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise UploadError("Missing multipart boundary")
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_request_bytes:
+            # Refuse before reading the body
+            raise UploadError("Upload is too large", 413)
+
+        receiver = MultipartReceiver(
+            boundary, self.directory, settings.ATTACHMENT_MAX_BYTES, settings.ATTACHMENT_MAX_FILES
+        )
+        received = 0
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > self.max_request_bytes:
+                    raise UploadError("Upload is too large", 413)
+                # Hashing and writing block; keep them off the event loop
+                await anyio.to_thread.run_sync(receiver.feed, chunk)
+            await anyio.to_thread.run_sync(receiver.finish)
+        except Exception:
+            receiver.abort()
+            raise
+        return receiver.fields, receiver.files
+
+    def attach(self, message: Message, files: List[StoredFile]) -> List[Attachment]:
+        """Attachment rows for a new message; committed together with it"""
+        attachments = [
+            Attachment(
+                ticket_id=message.ticket_id,
+                user_id=message.user_id,
+                filename=stored.filename,
+                content_type=stored.content_type,
+                size=stored.size,
+                sha256=stored.sha256,
+                is_internal=bool(message.is_internal),
+            )
+            for stored in files
+        ]
+        message.attachments.extend(attachments)
+        return attachments
+
+    def for_ticket(self, db: Session, ticket_id: int, include_internal: bool) -> List[Attachment]:
+        query = db.query(Attachment).filter(
+            or_(Attachment.ticket_id == ticket_id, Attachment.archived_ticket_id == ticket_id)
+        )
+        if not include_internal:
+            query = query.filter(Attachment.is_internal.is_(False))
+        return query.order_by(Attachment.id).all()
+
+    def describe(self, attachment: Attachment) -> Dict[str, object]:
+        """Attachment fields for real-time events"""
+        return {
+            "id": attachment.id,
+            "filename": attachment.filename,
+            "size": attachment.size,
+            "url": f"/tickets/{attachment.owner_id}/attachments/{attachment.id}",
+        }
+
+    def prune(self, db: Session, min_age: float = 3600) -> int:
+        """
+        Delete stored files no attachment refers to any more, and leftover
+        temporary uploads. Files younger than min_age seconds are kept, as
+        they may belong to an upload whose message is not committed yet.
+        """
+        if not self.directory.exists():
+            return 0
+        referenced = {row.sha256 for row in db.query(Attachment.sha256).distinct()}
+        cutoff = time.time() - min_age
+        removed = 0
+        for path in self.directory.glob("*/*"):
+            if not path.is_file() or path.stat().st_mtime > cutoff:
+                continue
+            if path.parent.name == "tmp" or path.name not in referenced:
+                path.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} unreferenced attachment file(s)")
+        return removed
+
+
+# Global attachment service instance
+attachment_service = AttachmentService()
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+from typing import Any, Dict, List, NamedTuple
+from urllib.parse import urlparse
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+
+try:
+    import markdown
+except ImportError:  # optional dependency, content is treated as HTML
+    markdown = None
+
+try:
+    import nh3
+except ImportError:  # optional dependency, the built-in sanitizer is used
+    nh3 = None
+
+logger = logging.getLogger(__name__)
+
+# Bump to re-render every article after changing the pipeline below
+RENDERER_VERSION = "1"
+
+EXCERPT_LENGTH = 200
+TOC_LEVELS = ("h2", "h3")
+
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "code", "dd", "del", "div", "dl", "dt", "em",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "kbd", "li", "ol", "p", "pre",
+    "s", "span", "strong", "sub", "sup", "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "abbr": {"title"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "td": {"colspan", "rowspan", "align"},
+    "th": {"colspan", "rowspan", "align"},
+    "code": {"class"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+ALLOWED_SCHEMES = {"", "http", "https", "mailto", "tel"}
+VOID_TAGS = {"br", "hr", "img"}
+# Dropped together with everything inside them
+DROPPED_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript"}
+
+HEADING_PATTERN = re.compile(r"<(h[1-6])>(.*?)</\1>", re.S)
+PARAGRAPH_PATTERN = re.compile(r"<p>(.*?)</p>", re.S)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+class RenderedContent(NamedTuple):
+    html: str
+    excerpt: str
+    toc: List[Dict[str, Any]]
+    digest: str
+
+
+class _Sanitizer(HTMLParser):
+    """Allowlist HTML cleaner used when nh3 is not installed"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.open_tags: List[str] = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _safe_url(value):
+                continue
+            rendered.append(f' {name}="{escape(value)}"')
+        if tag == "a":
+            rendered.append(' rel="noopener noreferrer"')
+        self.parts.append(f"<{tag}{''.join(rendered)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this element
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.parts.append(escape(data, quote=False))
+
+    def result(self) -> str:
+        self.close()
+        return "".join(self.parts) + "".join(f"</{tag}>" for tag in reversed(self.open_tags))
+
+
+def _safe_url(value: str) -> bool:
+    return urlparse(value.strip()).scheme.lower() in ALLOWED_SCHEMES
+
+
+def _slugify(text: str) -> str:
+    return re.sub(r"[^\w]+", "-", text.lower()).strip("-") or "sectie"
+
+
+def _plain_text(html: str) -> str:
+    return " ".join(unescape(TAG_PATTERN.sub(" ", html)).split())
+
+
+class ContentService:
+    """
+    Markdown to sanitized HTML, done once when an article is saved.
+
+    The rendered HTML, an excerpt and the table of contents are stored next
+    to the source together with a hash of the source, so public pages only
+    output stored HTML. Raw HTML in existing articles passes through the
+    Markdown renderer and is sanitized like everything else.
+    """
+
+    @staticmethod
+    def digest(source: str) -> str:
+        # Installing markdown or nh3 later changes the output, so it changes the hash too
+        renderer = f"{RENDERER_VERSION}:{markdown is not None:d}{nh3 is not None:d}"
+        return hashlib.sha256(f"{renderer}:{source}".encode()).hexdigest()
+
+    def render(self, source: str) -> RenderedContent:
+        source = source or ""
+        if markdown is not None:
+            html = markdown.markdown(source, extensions=["extra", "sane_lists"], output_format="html")
+        else:
+            html = source
+        html = self.sanitize(html)
+        html, toc = self._number_headings(html)
+        return RenderedContent(html=html, excerpt=self._excerpt(html), toc=toc, digest=self.digest(source))
+
+    def sanitize(self, html: str) -> str:
+        if nh3 is not None:
+            return nh3.clean(
+                html,
+                tags=ALLOWED_TAGS,
+                attributes=ALLOWED_ATTRIBUTES,
+                url_schemes=ALLOWED_SCHEMES - {""},
+                link_rel="noopener noreferrer",
+            )
+        sanitizer = _Sanitizer()
+        sanitizer.feed(html)
+        return sanitizer.result()
+
+    def _number_headings(self, html: str):
+        """Give h2/h3 headings unique ids and collect them as the table of contents"""
+        toc: List[Dict[str, Any]] = []
+        used: Dict[str, int] = {}
+
+        def anchor(match):
+            tag, inner = match.group(1), match.group(2)
+            if tag not in TOC_LEVELS:
+                return match.group(0)
+            title = _plain_text(inner)
+            slug = _slugify(title)
+            used[slug] = used.get(slug, 0) + 1
+            if used[slug] > 1:
+                slug = f"{slug}-{used[slug]}"
+            toc.append({"level": int(tag[1]), "id": slug, "title": title})
+            return f'<{tag} id="{slug}">{inner}</{tag}>'
+
+        return HEADING_PATTERN.sub(anchor, html), toc
+
+    def _excerpt(self, html: str) -> str:
+        match = PARAGRAPH_PATTERN.search(html)
+        text = _plain_text(match.group(1) if match else html)
+        if len(text) <= EXCERPT_LENGTH:
+            return text
+        return text[:EXCERPT_LENGTH].rsplit(" ", 1)[0] + "…"
+
+    def apply(self, post) -> bool:
+        """Store rendered content on a BlogPost/KnowledgeBase row; False if already current"""
+        if post.content_hash == self.digest(post.content or "") and post.content_html is not None:
+            return False
+        rendered = self.render(post.content)
+        post.content_html = rendered.html
+        post.content_excerpt = rendered.excerpt
+        post.content_toc = json.dumps(rendered.toc)
+        post.content_hash = rendered.digest
+        return True
+
+    def ensure_rendered(self, db: Session, post) -> None:
+        """Render rows saved before the pipeline existed (or edited outside the admin)"""
+        if self.apply(post):
+            # Rendering is not an edit: write updated_at back unchanged instead of letting onupdate bump it
+            flag_modified(post, "updated_at")
+            db.commit()
+            logger.info(f"Rendered content for {post!r}")
+
+
+# Global content service instance
+content_service = ContentService()
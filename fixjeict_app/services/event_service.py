@@ -0,0 +1,361 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from fastapi import Request
+from sqlalchemy import event as orm_event
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import TicketEvent
+
+logger = logging.getLogger(__name__)
+
+# (event id, event name, JSON payload, is_internal)
+EventItem = Tuple[Optional[int], str, str, bool]
+
+FIXERS_CHANNEL = "fixers"
+
+# Session.info key for events waiting for their transaction to commit
+PENDING_EVENTS = "pending_events"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def ticket_channel(ticket_id: int) -> str:
+    """Channel carrying updates for a single ticket"""
+    return f"ticket:{ticket_id}"
+
+
+def fixer_channel(user_id: int) -> str:
+    """Channel carrying updates for a single fixer's dashboard"""
+    return f"fixer:{user_id}"
+
+
+def _json_default(value: Any) -> str:
+    # Naive datetimes in this app are UTC; send them so browsers parse them as such
+    if isinstance(value, datetime):
+        return value.isoformat() + "Z" if value.tzinfo is None else value.isoformat()
+    return str(value)
+
+
+class Subscriber:
+    """Buffered view of one or more channels for a single SSE connection"""
+
+    __slots__ = ("channels", "include_internal", "buffer", "wakeup", "overflowed")
+
+    def __init__(self, channels: Iterable[str], include_internal: bool, maxlen: int):
+        self.channels = tuple(channels)
+        self.include_internal = include_internal
+        self.buffer: deque = deque(maxlen=maxlen)
+        self.wakeup = asyncio.Event()
+        self.overflowed = False
+
+    def push(self, item: EventItem) -> None:
+        """Queue an event, dropping the oldest one if the client is too slow"""
+        if len(self.buffer) == self.buffer.maxlen:
+            self.overflowed = True
+        self.buffer.append(item)
+        self.wakeup.set()
+
+
+class EventHub:
+    """
+    In-process pub/sub hub feeding the SSE endpoints.
+
+    Every published event is stored in the ticket_events table and handed to
+    local subscribers straight away. A single poller per worker picks up rows
+    written by other workers, so fan-out works across uvicorn processes
+    without an external broker.
+    """
+
+    def __init__(self):
+        self.origin = self._new_origin()
+        self._channels: Dict[str, Set[Subscriber]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._poller_ready: Optional[asyncio.Event] = None
+        self._last_id = 0
+        self._last_poll: Optional[float] = None
+        self._last_prune = 0.0
+        self._closed = False
+
+    @staticmethod
+    def _new_origin() -> str:
+        return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def _after_fork(self) -> None:
+        # Workers forked from a preloading manager would otherwise share one origin
+        # and drop each other's events as their own
+        self.origin = self._new_origin()
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of open subscriptions in this worker"""
+        return len({sub for subs in self._channels.values() for sub in subs})
+
+    # Publishing
+
+    def publish(
+        self,
+        db: Session,
+        channels: Union[str, List[str]],
+        event: str,
+        data: Dict[str, Any],
+        is_internal: bool = False,
+    ) -> None:
+        """
+        Add an event to the caller's transaction.
+
+        The rows are only flushed: the caller commits them together with the
+        change they describe, and subscribers in this worker get the event on
+        that commit (nothing is sent if it rolls back). Other workers pick it
+        up from the table.
+        """
+        if isinstance(channels, str):
+            channels = [channels]
+        payload = json.dumps(data, default=_json_default)
+
+        rows = [
+            TicketEvent(
+                channel=channel,
+                event=event,
+                payload=payload,
+                is_internal=is_internal,
+                origin=self.origin,
+            )
+            for channel in channels
+        ]
+        db.add_all(rows)
+        db.flush()
+        db.info.setdefault(PENDING_EVENTS, []).extend(
+            (channel, (row.id, event, payload, is_internal)) for channel, row in zip(channels, rows)
+        )
+
+    def _deliver(self, channel: str, item: EventItem) -> None:
+        """Hand an event to the event loop that owns the subscribers"""
+        if self._loop is None or channel not in self._channels:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, channel, item)
+        except RuntimeError:
+            # Event loop already closed (shutdown in progress)
+            pass
+
+    def _dispatch(self, channel: str, item: EventItem) -> None:
+        for subscriber in tuple(self._channels.get(channel, ())):
+            if item[3] and not subscriber.include_internal:
+                continue
+            subscriber.push(item)
+
+    # Subscribing
+
+    def subscribe(self, channels: Iterable[str], include_internal: bool = False) -> Subscriber:
+        """Register a new subscriber; must be called from the event loop"""
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(channels, include_internal, settings.EVENTS_QUEUE_SIZE)
+        for channel in subscriber.channels:
+            self._channels.setdefault(channel, set()).add(subscriber)
+
+        if self._poller is None or self._poller.done():
+            self._poller_ready = asyncio.Event()
+            self._poller = self._loop.create_task(self._poll(self._poller_ready))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Remove a subscriber from all of its channels"""
+        for channel in subscriber.channels:
+            subs = self._channels.get(channel)
+            if subs is None:
+                continue
+            subs.discard(subscriber)
+            if not subs:
+                del self._channels[channel]
+
+    async def stream(
+        self,
+        request: Request,
+        subscriber: Subscriber,
+        last_event_id: Optional[str] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Yield SSE frames for a subscriber until the client disconnects"""
+        heartbeat = settings.EVENTS_HEARTBEAT_SECONDS
+        try:
+            yield "retry: 5000\n\n"
+
+            # Don't miss events from other workers published before the poller starts
+            if self._poller_ready is not None:
+                await self._poller_ready.wait()
+
+            if last_event_id and last_event_id.isdigit():
+                missed = await asyncio.to_thread(
+                    self.replay, subscriber.channels, int(last_event_id), subscriber.include_internal
+                )
+                for item in missed:
+                    yield self._format(item)
+
+            while not self._closed:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+
+                subscriber.wakeup.clear()
+                if subscriber.overflowed:
+                    # The client fell too far behind; let it reload instead
+                    subscriber.overflowed = False
+                    subscriber.buffer.clear()
+                    yield self._format((None, "resync", "{}", False))
+                    continue
+
+                while subscriber.buffer:
+                    yield self._format(subscriber.buffer.popleft())
+        finally:
+            self.unsubscribe(subscriber)
+
+    @staticmethod
+    def _format(item: EventItem) -> str:
+        event_id, event, payload, _ = item
+        frame = f"event: {event}\ndata: {payload}\n\n"
+        if event_id is not None:
+            frame = f"id: {event_id}\n" + frame
+        return frame
+
+    def replay(self, channels: Iterable[str], after_id: int, include_internal: bool) -> List[EventItem]:
+        """Load events a reconnecting client missed"""
+        db = SessionLocal()
+        try:
+            query = (
+                db.query(TicketEvent)
+                .filter(TicketEvent.channel.in_(list(channels)), TicketEvent.id > after_id)
+            )
+            if not include_internal:
+                query = query.filter(TicketEvent.is_internal == False)  # noqa: E712
+            rows = query.order_by(TicketEvent.id).limit(settings.EVENTS_QUEUE_SIZE).all()
+            return [(row.id, row.event, row.payload, bool(row.is_internal)) for row in rows]
+        finally:
+            db.close()
+
+    # Cross-worker fan-out
+
+    async def _poll(self, ready: asyncio.Event) -> None:
+        """Relay events written by other workers while anyone is listening"""
+        try:
+            self._last_id = await asyncio.to_thread(self._max_event_id)
+        except Exception as e:
+            logger.error(f"Event poller could not start: {e}")
+            return
+        finally:
+            ready.set()
+
+        while self._channels and not self._closed:
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+            try:
+                rows = await asyncio.to_thread(self._fetch_since, self._last_id)
+            except Exception as e:
+                logger.warning(f"Event poll failed: {e}")
+                continue
+
+            self._last_poll = time.time()
+            for event_id, channel, event, payload, is_internal, origin in rows:
+                self._last_id = max(self._last_id, event_id)
+                if origin != self.origin:
+                    self._dispatch(channel, (event_id, event, payload, bool(is_internal)))
+
+            if time.monotonic() - self._last_prune > 3600:
+                self._last_prune = time.monotonic()
+                await asyncio.to_thread(self.prune)
+
+    def poller_status(self) -> Optional[Dict[str, float]]:
+        """Relay lag for health checks; None when nobody in this worker is listening"""
+        if not self._channels or self._closed:
+            return None
+        backlog = max(self._max_event_id() - self._last_id, 0)
+        age = time.time() - self._last_poll if self._last_poll else 0.0
+        return {"subscribers": self.subscriber_count, "backlog": backlog, "seconds_since_poll": round(age, 1)}
+
+    def _max_event_id(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(func.max(TicketEvent.id)).scalar() or 0
+        finally:
+            db.close()
+
+    def _fetch_since(self, last_id: int) -> List[tuple]:
+        db = SessionLocal()
+        try:
+            return (
+                db.query(
+                    TicketEvent.id,
+                    TicketEvent.channel,
+                    TicketEvent.event,
+                    TicketEvent.payload,
+                    TicketEvent.is_internal,
+                    TicketEvent.origin,
+                )
+                .filter(TicketEvent.id > last_id)
+                .order_by(TicketEvent.id)
+                .limit(1000)
+                .all()
+            )
+        finally:
+            db.close()
+
+    def prune(self) -> int:
+        """Delete events older than the replay retention window"""
+        cutoff = datetime.utcnow() - timedelta(hours=settings.EVENTS_RETENTION_HOURS)
+        db = SessionLocal()
+        try:
+            deleted = (
+                db.query(TicketEvent)
+                .filter(TicketEvent.created_at < cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to prune ticket events: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def close(self) -> None:
+        """Wake all open streams so they can finish during shutdown"""
+        self._closed = True
+        for subs in self._channels.values():
+            for subscriber in subs:
+                subscriber.wakeup.set()
+        if self._poller is not None:
+            self._poller.cancel()
+
+
+# Global event hub instance
+event_hub = EventHub()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=event_hub._after_fork)
+
+
+@orm_event.listens_for(Session, "after_commit")
+def _deliver_pending(session: Session) -> None:
+    for channel, item in session.info.pop(PENDING_EVENTS, ()):
+        event_hub._deliver(channel, item)
+
+
+@orm_event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(PENDING_EVENTS, None)
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..database import engine, read_engine
+from ..metrics import external_last, metrics
+from .event_service import event_hub
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+WARN = "warn"
+FAIL = "fail"
+
+# The overall status is the worst check result
+SEVERITY = {OK: 0, WARN: 1, FAIL: 2}
+
+Check = Dict[str, Any]
+
+
+def _result(status: str, **details: Any) -> Check:
+    return {"status": status, **details}
+
+
+class HealthService:
+    """
+    Readiness checks behind /health/ready.
+
+    Checks run in a thread (they do blocking I/O) and the combined result is
+    cached for HEALTH_CACHE_SECONDS, so a load balancer probing every second
+    costs at most one DB round trip per interval. The DB ping runs on its
+    own single thread with a deadline: a locked or stuck database makes the
+    probe fail fast instead of hanging.
+    """
+
+    def __init__(self):
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="health-db")
+        self._db_future: Optional[Future] = None
+        self._db_lock = threading.Lock()
+
+    async def readiness(self) -> Dict[str, Any]:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._cached is None or time.monotonic() - self._cached_at >= settings.HEALTH_CACHE_SECONDS:
+                self._cached = await asyncio.to_thread(self.run_checks)
+                self._cached_at = time.monotonic()
+            return self._cached
+
+    def run_checks(self) -> Dict[str, Any]:
+        checks: Dict[str, Callable[[], Check]] = {
+            "database": self.check_database,
+            "wal": self.check_wal,
+            "disk": self.check_disk,
+            "events": self.check_events,
+            "email": lambda: self.check_external("resend", bool(settings.RESEND_API_KEY)),
+            "cloudflare": lambda: self.check_external("cloudflare", bool(settings.CLOUDFLARE_API_KEY)),
+            "backups": self.check_backups,
+        }
+        results: Dict[str, Check] = {}
+        for name, check in checks.items():
+            try:
+                results[name] = check()
+            except Exception as e:
+                logger.warning(f"Health check {name} failed: {e}")
+                results[name] = _result(FAIL, error=str(e))
+
+        overall = max((r["status"] for r in results.values()), key=SEVERITY.__getitem__, default=OK)
+        return {
+            "status": overall,
+            "checked_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "checks": results,
+        }
+
+    # Individual checks
+
+    def check_database(self) -> Check:
+        """SELECT 1 through the writer and the reader pool, within HEALTH_DB_TIMEOUT_SECONDS"""
+        with self._db_lock:
+            if self._db_future is not None and not self._db_future.done():
+                return _result(FAIL, error="previous database ping is still running")
+            self._db_future = self._db_executor.submit(self._ping_database)
+            future = self._db_future
+
+        try:
+            timings = future.result(timeout=settings.HEALTH_DB_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            return _result(FAIL, error=f"no response within {settings.HEALTH_DB_TIMEOUT_SECONDS}s")
+        except Exception as e:
+            return _result(FAIL, error=str(e))
+        return _result(OK, **timings)
+
+    @staticmethod
+    def _ping_database() -> Dict[str, float]:
+        timings = {}
+        engines = {"writer": engine} if read_engine is engine else {"writer": engine, "reader": read_engine}
+        for name, bind in engines.items():
+            started = time.perf_counter()
+            with bind.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            timings[f"{name}_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return timings
+
+    def check_wal(self) -> Check:
+        """A WAL that keeps growing means checkpoints are being starved by long readers"""
+        if not settings.is_sqlite or settings.database_path is None:
+            return _result(OK, skipped="not SQLite")
+        wal = Path(f"{settings.database_path}-wal")
+        size_mb = wal.stat().st_size / (1024 * 1024) if wal.exists() else 0.0
+        status = WARN if size_mb > settings.HEALTH_WAL_WARN_MB else OK
+        return _result(status, size_mb=round(size_mb, 1), warn_mb=settings.HEALTH_WAL_WARN_MB)
+
+    def check_disk(self) -> Check:
+        """Free space on every filesystem we write to (database, media, backups)"""
+        paths: List[Path] = [settings.MEDIA_DIR, settings.BACKUP_DIR]
+        if settings.database_path is not None:
+            paths.insert(0, settings.database_path.parent)
+
+        volumes: Dict[str, Dict[str, Any]] = {}
+        seen_devices = set()
+        status = OK
+        for path in paths:
+            path = Path(path).resolve()
+            # Nearest existing parent; e.g. the backup dir before the first backup
+            while not path.exists() and path != path.parent:
+                path = path.parent
+            device = os.stat(path).st_dev
+            if device in seen_devices:
+                continue
+            seen_devices.add(device)
+
+            usage = shutil.disk_usage(path)
+            free_mb = usage.free / (1024 * 1024)
+            free_percent = usage.free / usage.total * 100 if usage.total else 0.0
+            if free_mb < settings.HEALTH_DISK_MIN_FREE_MB:
+                volume_status = FAIL
+            elif free_percent < settings.HEALTH_DISK_WARN_PERCENT:
+                volume_status = WARN
+            else:
+                volume_status = OK
+            status = max(status, volume_status, key=SEVERITY.__getitem__)
+            volumes[str(path)] = {
+                "status": volume_status,
+                "free_mb": round(free_mb),
+                "free_percent": round(free_percent, 1),
+            }
+        return _result(status, volumes=volumes)
+
+    def check_events(self) -> Check:
+        """Cross-worker SSE relay: events written to the table but not yet picked up"""
+        relay = event_hub.poller_status()
+        if relay is None:
+            return _result(OK, subscribers=0)
+        stalled = relay["seconds_since_poll"] > max(settings.EVENTS_POLL_INTERVAL * 10, 30)
+        return _result(WARN if stalled else OK, **relay)
+
+    def check_external(self, service: str, configured: bool) -> Check:
+        """Last successful and failed call to an external API, across all workers"""
+        if not configured:
+            return _result(OK, skipped="not configured")
+        samples = metrics.collect().get(external_last.name, {})
+        last = {outcome: value[0] for (name, outcome), value in samples.items() if name == service}
+        last_ok, last_error = last.get("ok"), last.get("error")
+        # Only the latest outcome matters: one failure after a success is already a warning
+        status = WARN if last_error and (not last_ok or last_error > last_ok) else OK
+        return _result(status, last_success=_iso(last_ok), last_failure=_iso(last_error))
+
+    def check_backups(self) -> Check:
+        if not settings.BACKUP_DIR.exists():
+            return _result(WARN, error=f"{settings.BACKUP_DIR} does not exist")
+        manifests = list(settings.BACKUP_DIR.glob("*.json"))
+        if not manifests:
+            return _result(WARN, error="no backups yet")
+        latest = max(path.stat().st_mtime for path in manifests)
+        age_hours = (time.time() - latest) / 3600
+        status = WARN if age_hours > settings.HEALTH_BACKUP_MAX_AGE_HOURS else OK
+        return _result(status, last_backup=_iso(latest), age_hours=round(age_hours, 1))
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if not timestamp:
+        return None
+    return datetime.utcfromtimestamp(timestamp).isoformat(timespec="seconds") + "Z"
+
+
+# Global health service instance
+health_service = HealthService()
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import BlogPost
+from .template_service import fragment_cache
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional dependency, posts keep their plain image
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+MEDIA_URL = "/media"
+STATIC_URL = "/static"
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif"}
+
+# Encoder settings per output format
+FORMAT_OPTIONS = {
+    "avif": {"quality": 50},
+    "webp": {"quality": 80, "method": 6},
+}
+
+
+def _read_source(source: str, media_dir: Path, max_bytes: int) -> bytes:
+    """Load an image from /media, /static or an http(s) URL"""
+    if source.startswith(f"{MEDIA_URL}/"):
+        path = media_dir / source[len(MEDIA_URL) + 1:]
+    elif source.startswith(f"{STATIC_URL}/"):
+        path = settings.BASE_DIR / "fixjeict_app" / "static" / source[len(STATIC_URL) + 1:]
+    elif source.startswith(("http://", "https://")):
+        import httpx
+
+        with httpx.stream("GET", source, timeout=10, follow_redirects=True) as response:
+            response.raise_for_status()
+            chunks, size = [], 0
+            for chunk in response.iter_bytes():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"{source} is larger than {max_bytes} bytes")
+                chunks.append(chunk)
+            return b"".join(chunks)
+    else:
+        raise ValueError(f"Unsupported image source: {source}")
+
+    path = path.resolve()
+    if media_dir.resolve() not in path.parents and settings.BASE_DIR.resolve() not in path.parents:
+        raise ValueError(f"Image path escapes the media directories: {source}")
+    if path.stat().st_size > max_bytes:
+        raise ValueError(f"{source} is larger than {max_bytes} bytes")
+    return path.read_bytes()
+
+
+def output_formats() -> List[str]:
+    """Formats this Pillow build can encode, best compression first"""
+    formats = []
+    for fmt in ("avif", "webp"):
+        try:
+            if features.check(fmt):
+                formats.append(fmt)
+        except ValueError:
+            # Unknown feature name on older Pillow releases
+            continue
+    return formats
+
+
+def generate_variants(source: str, media_dir: str, widths: List[int], max_bytes: int) -> Dict[str, Any]:
+    """
+    Resize an image to each width in every supported format.
+
+    Runs in a worker process. Files are named after the source content
+    hash, so identical images are only converted once and the results can
+    be cached forever.
+    """
+    media_path = Path(media_dir)
+    data = _read_source(source, media_path, max_bytes)
+    digest = hashlib.sha256(data).hexdigest()[:16]
+
+    with Image.open(BytesIO(data)) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    targets = sorted({w for w in widths if w <= image.width}) or [image.width]
+    output_dir = media_path / "images"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    result: Dict[str, Any] = {"width": image.width, "height": image.height, "formats": {}}
+    for fmt in output_formats():
+        entries = []
+        for width in targets:
+            name = f"{digest}-{width}.{fmt}"
+            target = output_dir / name
+            if not target.exists():
+                height = max(round(image.height * width / image.width), 1)
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                tmp = target.with_name(name + ".tmp")
+                resized.save(tmp, format=fmt.upper(), **FORMAT_OPTIONS[fmt])
+                tmp.replace(target)
+            entries.append([f"{MEDIA_URL}/images/{name}", width])
+        result["formats"][fmt] = entries
+    return result
+
+
+def render_icon(source: Path, size: int, dest: Path) -> None:
+    """Write a square PNG icon, padding non-square sources"""
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened).convert("RGBA")
+    image = ImageOps.pad(image, (size, size), method=Image.LANCZOS, color=(0, 0, 0, 0))
+    image.save(dest, format="PNG", optimize=True)
+
+
+class ImageService:
+    """
+    Responsive variants for blog cover images.
+
+    Conversion is CPU-heavy, so it runs in a small process pool; the admin
+    request only submits the job. When a job finishes its srcset data is
+    stored on the post and the cached blog fragments are dropped.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: don't fork a process that holds DB connections and threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def store_upload(self, filename: str, data: bytes) -> str:
+        """Save an uploaded original under /media/originals and return its URL"""
+        suffix = Path(filename).suffix.lower()
+        if suffix not in ALLOWED_EXTENSIONS:
+            raise ValueError(f"Unsupported image type: {suffix or filename}")
+        if len(data) > settings.IMAGE_MAX_BYTES:
+            raise ValueError(f"Image is larger than {settings.IMAGE_MAX_BYTES} bytes")
+
+        name = f"{hashlib.sha256(data).hexdigest()[:16]}{suffix}"
+        target = settings.MEDIA_DIR / "originals" / name
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+        return f"{MEDIA_URL}/originals/{name}"
+
+    def schedule_blog_image(self, post_id: int, image_url: Optional[str]) -> None:
+        """Generate variants for a post's cover image in the background"""
+        if not image_url:
+            return
+        if not self.available:
+            logger.info("Pillow is not installed; serving blog images without variants")
+            return
+
+        future = self._executor().submit(
+            generate_variants,
+            image_url,
+            str(settings.MEDIA_DIR),
+            list(settings.IMAGE_WIDTHS),
+            settings.IMAGE_MAX_BYTES,
+        )
+        future.add_done_callback(partial(self._store_blog_variants, post_id, image_url))
+
+    def _store_blog_variants(self, post_id: int, image_url: str, future: Future) -> None:
+        try:
+            variants = future.result()
+        except Exception as e:
+            logger.warning(f"Image variants for blog post {post_id} failed: {e}")
+            return
+
+        db = SessionLocal()
+        try:
+            # Skip if the image was changed again while this job ran
+            updated = (
+                db.query(BlogPost)
+                .filter(BlogPost.id == post_id, BlogPost.image_url == image_url)
+                .update({BlogPost.image_variants: json.dumps(variants)}, synchronize_session=False)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to store image variants for blog post {post_id}: {e}")
+            return
+        finally:
+            db.close()
+
+        if updated:
+            fragment_cache.invalidate("blog:")
+            fragment_cache.invalidate("index:posts")
+            logger.info(f"Stored image variants for blog post {post_id}")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# Global image service instance
+image_service = ImageService()
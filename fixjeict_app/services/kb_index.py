@@ -0,0 +1,359 @@
+"""
+Similarity index over the published knowledge base articles.
+
+Every article is a TF-IDF vector over the words of its title (weighted
+up) and content. Articles are numbered with dense slots and the vectors
+live in per-term posting arrays (slots and L2-normalised weights as
+array('I') / array('f')), so a query only adds up the postings of its own
+words into one list of scores and needs no database access. Articles are
+added, replaced or removed one at a time when they are saved; other
+workers pick up changes with a cheap check every KB_INDEX_REFRESH_SECONDS.
+"""
+
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import KnowledgeBase
+from .content_service import content_service
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[^\W_]{2,}")
+# HTML tags, Markdown link targets and code fences carry no meaning for matching
+MARKUP_PATTERN = re.compile(r"<[^>]+>|\]\([^)]*\)|```")
+
+STOPWORDS = frozenset("""
+    aan al alle als bij dan dat de deze die dit doe doen door dus een en er ga gaat geen had heb hebben
+    heeft het hier hij hoe hun ik in is je jij kan kun kunt maar me met mij mijn na naar niet nog nu of om
+    omdat ons onze ook op over te tot u uit uw van veel voor waar wat wel werd wie wij wil wordt zal ze zelf
+    zich zij zijn zo zoals zou
+    an and are as at be but by can do for from has have how if in into is it its my no not of on or so
+    that the their then there these they this to was what when which will with you your
+""".split())
+
+# A word in the title counts as often as this many in the content
+TITLE_WEIGHT = 3
+# Vocabulary words an unfinished last word ("wach" -> "wachtwoord") expands to
+MAX_PREFIX_TERMS = 8
+EXCERPT_LENGTH = 160
+
+
+def _words(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(MARKUP_PATTERN.sub(" ", text.lower()))
+
+
+def term_counts(title: str, content: str) -> Counter:
+    """Word counts of an article, stop words dropped once per distinct word"""
+    counts = Counter(_words(content))
+    for word in _words(title):
+        counts[word] += TITLE_WEIGHT
+    for word in STOPWORDS.intersection(counts):
+        del counts[word]
+    return counts
+
+
+class Suggestion(NamedTuple):
+    id: int
+    title: str
+    slug: str
+    excerpt: str
+    score: float
+
+
+class _Article:
+    __slots__ = ("id", "slot", "title", "slug", "excerpt", "digest", "terms", "tf")
+
+    def __init__(self, id: int, slot: int, title: str, slug: str, excerpt: str, digest: int, terms: array, tf: array):
+        self.id = id
+        self.slot = slot
+        self.title = title
+        self.slug = slug
+        self.excerpt = excerpt
+        self.digest = digest
+        self.terms = terms
+        self.tf = tf
+
+
+class KnowledgeIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._term_ids: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._postings: List[array] = []  # term id -> article slots
+        self._weights: List[array] = []  # term id -> sublinear tf, aligned with _postings
+        self._normalized: List[array] = []  # term id -> tf * idf / article norm, aligned with _postings
+        self._idf: List[float] = []
+        self._articles: Dict[int, _Article] = {}
+        self._slots: List[Optional[_Article]] = []
+        self._free_slots: List[int] = []
+        self._sorted_terms: Optional[List[str]] = None
+        self._weights_stale = True
+        self._related: Dict[Tuple[int, int], List[Suggestion]] = {}
+        self._loaded = False
+        self._checked_at: Optional[float] = None
+        self._state: Tuple[int, Optional[datetime]] = (0, None)
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+    # Building
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._term_ids[term] = term_id
+            self._terms.append(term)
+            self._postings.append(array("I"))
+            self._weights.append(array("f"))
+            self._normalized.append(array("f"))
+            self._sorted_terms = None
+        return term_id
+
+    def _changed(self) -> None:
+        self._weights_stale = True
+        self._related.clear()
+
+    def upsert(self, post: KnowledgeBase) -> None:
+        """Add or replace an article after it was saved; unpublished articles are removed"""
+        if self._loaded:
+            self._upsert(post)
+
+    def _upsert(self, post: KnowledgeBase) -> None:
+        if not post.is_published:
+            self.remove(post.id)
+            return
+        digest = hash((post.title, post.slug, post.content))
+        with self._lock:
+            current = self._articles.get(post.id)
+            if current is not None and current.digest == digest:
+                # Only the view counter changed
+                return
+            if current is not None:
+                self._remove(current)
+
+            counts = term_counts(post.title or "", post.content or "")
+
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = len(self._slots)
+                self._slots.append(None)
+            terms, tf = array("I"), array("f")
+            for word, count in counts.items():
+                term_id = self._term_id(word)
+                weight = 1 + math.log(count)
+                terms.append(term_id)
+                tf.append(weight)
+                self._postings[term_id].append(slot)
+                self._weights[term_id].append(weight)
+
+            excerpt = post.content_excerpt
+            if excerpt is None or post.content_hash != content_service.digest(post.content or ""):
+                # Not rendered yet (or edited outside the admin): the same excerpt the page will show
+                excerpt = content_service.render(post.content).excerpt
+            if len(excerpt) > EXCERPT_LENGTH:
+                excerpt = excerpt[:EXCERPT_LENGTH].rsplit(" ", 1)[0] + "…"
+            article = _Article(post.id, slot, post.title, post.slug, excerpt, digest, terms, tf)
+            self._articles[post.id] = self._slots[slot] = article
+            self._changed()
+
+    def remove(self, article_id: int) -> None:
+        with self._lock:
+            article = self._articles.get(article_id)
+            if article is not None:
+                self._remove(article)
+                self._changed()
+
+    def _remove(self, article: _Article) -> None:
+        for term_id in article.terms:
+            postings = self._postings[term_id]
+            position = postings.index(article.slot)
+            del postings[position]
+            del self._weights[term_id][position]
+        del self._articles[article.id]
+        self._slots[article.slot] = None
+        self._free_slots.append(article.slot)
+
+    def load(self, db: Session) -> None:
+        """Build the index from all published articles"""
+        started = time.perf_counter()
+        with self._lock:
+            self._reset()
+            self._state = self._db_state(db)
+            for post in db.query(KnowledgeBase).filter(KnowledgeBase.is_published.is_(True)).yield_per(500):
+                self._upsert(post)
+            self._loaded = True
+            self._checked_at = time.monotonic()
+            self._refresh_weights()
+        logger.info(
+            f"Indexed {len(self._articles)} knowledge base articles, {len(self._terms)} terms, "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    @staticmethod
+    def _db_state(db: Session) -> Tuple[int, Optional[datetime]]:
+        count, latest = (
+            db.query(func.count(KnowledgeBase.id), func.max(KnowledgeBase.updated_at))
+            .filter(KnowledgeBase.is_published.is_(True))
+            .one()
+        )
+        return count, latest
+
+    def start(self) -> None:
+        """Build the index in the background, so the first suggestion does not wait for it"""
+        if not self._loaded:
+            threading.Thread(target=self._load_in_background, name="kb-index", daemon=True).start()
+
+    def _load_in_background(self) -> None:
+        db = SessionLocal()
+        try:
+            self.ensure_fresh(db)
+        except Exception as e:
+            logger.warning(f"Knowledge base index not built at startup: {e}")
+        finally:
+            db.close()
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Load on first use, then apply articles changed by other processes"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load(db)
+            return
+        now = time.monotonic()
+        if now - self._checked_at < settings.KB_INDEX_REFRESH_SECONDS:
+            return
+        self._checked_at = now
+        state = self._db_state(db)
+        if state == self._state:
+            return
+
+        with self._lock:
+            since = self._state[1]
+            changed = db.query(KnowledgeBase)
+            if since is not None:
+                changed = changed.filter(KnowledgeBase.updated_at >= since)
+            for post in changed:
+                self._upsert(post)
+            if len(self._articles) != state[0]:
+                # Deleted articles leave no updated_at behind
+                published = {
+                    row.id for row in db.query(KnowledgeBase.id).filter(KnowledgeBase.is_published.is_(True))
+                }
+                for article_id in [id for id in self._articles if id not in published]:
+                    self.remove(article_id)
+            self._state = state
+
+    # Querying
+
+    def _refresh_weights(self) -> None:
+        """Recompute idf and the normalised weights after articles changed (linear in the postings)"""
+        if not self._weights_stale:
+            return
+        articles = len(self._articles)
+        self._idf = [math.log((1 + articles) / (1 + len(postings))) + 1 for postings in self._postings]
+        squares = [0.0] * len(self._slots)
+        for postings, weights, idf in zip(self._postings, self._weights, self._idf):
+            for slot, tf in zip(postings, weights):
+                squares[slot] += (tf * idf) ** 2
+        norms = [math.sqrt(value) or 1.0 for value in squares]
+        self._normalized = [
+            array("f", [tf * idf / norms[slot] for slot, tf in zip(postings, weights)])
+            for postings, weights, idf in zip(self._postings, self._weights, self._idf)
+        ]
+        self._weights_stale = False
+
+    def _expand_prefix(self, prefix: str) -> List[int]:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._terms)
+        terms = self._sorted_terms
+        matches = []
+        position = bisect_left(terms, prefix)
+        while position < len(terms) and terms[position].startswith(prefix) and len(matches) < MAX_PREFIX_TERMS:
+            matches.append(self._term_ids[terms[position]])
+            position += 1
+        return matches
+
+    def _top(self, query: Dict[int, float], limit: int, exclude: Optional[_Article] = None) -> List[Suggestion]:
+        """Articles with the highest cosine similarity to a {term id: tf} query"""
+        self._refresh_weights()
+        query = {term_id: tf * self._idf[term_id] for term_id, tf in query.items()}
+        query_norm = math.sqrt(sum(weight * weight for weight in query.values()))
+        if not query_norm:
+            return []
+        scores = [0.0] * len(self._slots)
+        for term_id, weight in query.items():
+            for slot, normalized in zip(self._postings[term_id], self._normalized[term_id]):
+                scores[slot] += weight * normalized
+        if exclude is not None:
+            scores[exclude.slot] = 0.0
+
+        results = []
+        for slot in heapq.nlargest(limit, range(len(scores)), key=scores.__getitem__):
+            similarity = scores[slot] / query_norm
+            if similarity < settings.KB_SUGGEST_MIN_SCORE or similarity <= 0:
+                break
+            article = self._slots[slot]
+            results.append(Suggestion(article.id, article.title, article.slug, article.excerpt, round(similarity, 3)))
+        return results
+
+    def suggest(self, db: Session, text: str, limit: int) -> List[Suggestion]:
+        """Articles matching a draft ticket; the last word may be unfinished"""
+        self.ensure_fresh(db)
+        words = _words(text)
+        # Only the word being typed is unfinished; decided before stop words are dropped,
+        # so "outlook doet het niet de" does not treat "outlook" as a prefix
+        partial = words.pop() if words and text[-1:].isalnum() else None
+        words = [word for word in words if word not in STOPWORDS]
+        if not words and not partial:
+            return []
+
+        with self._lock:
+            query: Dict[int, float] = {}
+            for word in words:
+                term_id = self._term_ids.get(word)
+                if term_id is not None:
+                    query[term_id] = query.get(term_id, 0.0) + 1
+            if partial:
+                expanded = self._expand_prefix(partial)
+                for term_id in expanded:
+                    query[term_id] = query.get(term_id, 0.0) + 1 / len(expanded)
+            for term_id, count in query.items():
+                query[term_id] = 1 + math.log(count) if count >= 1 else count
+            return self._top(query, limit)
+
+    def related(self, db: Session, article_id: int, limit: int) -> List[Suggestion]:
+        """Articles most similar to an article, kept until the index changes"""
+        self.ensure_fresh(db)
+        with self._lock:
+            key = (article_id, limit)
+            related = self._related.get(key)
+            if related is None:
+                article = self._articles.get(article_id)
+                if article is None:
+                    return []
+                related = self._top(dict(zip(article.terms, article.tf)), limit, exclude=article)
+                self._related[key] = related
+            return related
+
+
+# Global knowledge base index instance
+kb_index = KnowledgeIndex()
@@ -1,47 +1,210 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlencode
 
 from fastapi import Request
+from fastapi.routing import APIRoute
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, nodes, select_autoescape
+from jinja2.ext import Extension
+from starlette.routing import BaseRoute, Mount, NoMatchFound, Route
 
+from ..assets import asset_manifest
 from ..config import settings
+from ..tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 
 def url_for_static(filename: str) -> str:
-    """Generate URL for static files (Flask compatibility)"""
-    return f"/static/{filename}"
+    """Generate URL for static files (Flask compatibility), fingerprinted when built"""
+    return f"/static/{asset_manifest.resolve(filename)}"
+
+
+class CompiledRoute:
+    """A route path split into literal text and parameters, ready to fill in"""
+
+    __slots__ = ("name", "segments", "params", "alias")
+
+    # Matches {name} and {name:convertor}
+    PARAM_PATTERN = re.compile(r"{([a-zA-Z_][a-zA-Z0-9_]*)(?::[a-zA-Z_]+)?}")
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.segments: List[Tuple[str, Optional[str]]] = []
+        position = 0
+        for match in self.PARAM_PATTERN.finditer(path):
+            self.segments.append((path[position:match.start()], match.group(1)))
+            position = match.end()
+        self.segments.append((path[position:], None))
+        self.params = frozenset(param for _, param in self.segments if param)
+        # Flask-style templates pass id=... for the single parameter of a route
+        self.alias = next(iter(self.params)) if len(self.params) == 1 else None
+
+    def build(self, params: Dict[str, Any]) -> str:
+        if self.alias and self.alias not in params and "id" in params:
+            params = dict(params)
+            params[self.alias] = params.pop("id")
+
+        missing = self.params.difference(params)
+        if missing:
+            raise NoMatchFound(self.name, params)
+
+        parts = []
+        for literal, param in self.segments:
+            parts.append(literal)
+            if param:
+                parts.append(quote(str(params[param]), safe="/" if param == "path" else ""))
+        url = "".join(parts)
+
+        # Anything that isn't a path parameter becomes the query string, as in Flask
+        query = {key: value for key, value in params.items() if key not in self.params}
+        if query:
+            url = f"{url}?{urlencode(query)}"
+        return url
+
+
+class RouteIndex:
+    """
+    Reverse routing for templates, built from the application route table.
+
+    Each named route is compiled once when the app registers its routes, so
+    url_for() is a dictionary lookup plus string joins. Results for
+    repeated (name, params) combinations are memoized. Unknown names and
+    missing parameters raise NoMatchFound instead of producing a wrong link.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, CompiledRoute] = {}
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def register(self, routes: Iterable[BaseRoute], prefix: str = "") -> None:
+        """Add the named routes of an app or router; the first route with a name wins"""
+        for route in routes:
+            included = getattr(route, "original_router", None)
+            if included is not None:
+                # Newer FastAPI keeps included routers as a single lazy route
+                context = getattr(route, "include_context", None)
+                self.register(included.routes, prefix + getattr(context, "prefix", ""))
+                continue
+
+            name = getattr(route, "name", None)
+            if not name or name in self._routes:
+                continue
+            if isinstance(route, Mount):
+                self._routes[name] = CompiledRoute(name, prefix + route.path + "/{path:path}")
+            elif isinstance(route, (APIRoute, Route)):
+                self._routes[name] = CompiledRoute(name, prefix + route.path)
+        self._build_cached.cache_clear()
+
+    def url_for(self, name: str, **params: Any) -> str:
+        if name == "static" and "filename" in params:
+            params["path"] = asset_manifest.resolve(params.pop("filename"))
+        try:
+            return self._build_cached(name, tuple(sorted(params.items())))
+        except TypeError:
+            # Unhashable parameter value; build without the memo
+            return self._build(name, params)
+
+    @lru_cache(maxsize=4096)
+    def _build_cached(self, name: str, params: Tuple[Tuple[str, Any], ...]) -> str:
+        return self._build(name, dict(params))
+
+    def _build(self, name: str, params: Dict[str, Any]) -> str:
+        route = self._routes.get(name)
+        if route is None:
+            raise NoMatchFound(name, params)
+        return route.build(params)
+
+
+# Global route index instance, filled by register_routes() at app startup
+route_index = RouteIndex()
 
 
 def url_for(route_name: str, **params: Any) -> str:
     """Generate URL for named routes (Flask compatibility)"""
-    # Map Flask route names to FastAPI URLs
-    route_map = {
-        'index': '/',
-        'services': '/services',
-        'about': '/about',
-        'contact': '/contact',
-        'blog': '/blog',
-        'knowledge_base': '/knowledge-base',
-        'login': '/login',
-        'dashboard': '/dashboard',
-        'profile': '/profile',
-        'logout': '/logout',
-    }
-
-    # Handle dynamic routes
-    if route_name == 'blog_post':
-        slug = params.get('slug', '')
-        return f"/blog/{slug}"
-    elif route_name == 'kb_post':
-        slug = params.get('slug', '')
-        return f"/knowledge-base/{slug}"
-    elif route_name == 'ticket_detail':
-        ticket_id = params.get('id', '')
-        return f"/tickets/{ticket_id}"
-    elif route_name == 'new_ticket':
-        return '/tickets/new'
-
-    return route_map.get(route_name, f"/{route_name}")
+    return route_index.url_for(route_name, **params)
+
+
+class FragmentCache:
+    """Small in-process TTL cache for rendered template fragments"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, timeout: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, prefix: str = "") -> None:
+        """Drop cached fragments whose key starts with prefix (all by default)"""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache "key" %}...{% endcache %} or {% cache "key", seconds %}...{% endcache %}
+
+    Renders the block once and serves the result from fragment_cache until
+    it expires (TEMPLATE_FRAGMENT_CACHE_SECONDS by default). The cache is
+    per worker, so keys that must follow edits made elsewhere end in a
+    version read from the database (see public.content_version). Load the
+    block's data inside it, through a callable from the context, so the
+    queries only run on a miss.
+    """
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_cache_support", args), [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, key: str, timeout: Optional[int], caller: Callable[[], str]) -> str:
+        timeout = settings.TEMPLATE_FRAGMENT_CACHE_SECONDS if timeout is None else timeout
+        if not timeout:
+            return caller()
+        value = fragment_cache.get(key)
+        if value is None:
+            value = caller()
+            fragment_cache.set(key, value, timeout)
+        return value
+
+
+# Global fragment cache instance
+fragment_cache = FragmentCache()
 
 
 class TemplateService:
@@ -55,18 +218,49 @@ class TemplateService:
         if not template_dir.exists():
             template_dir = Path(__file__).parent.parent.parent / "fixjeict_app" / "templates"
 
-        self.templates = Jinja2Templates(directory=str(template_dir))
+        # Compiled templates are shared between workers and restarts via the bytecode cache
+        bytecode_cache = None
+        try:
+            settings.TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(settings.TEMPLATE_CACHE_DIR))
+        except OSError as e:
+            logger.warning(f"Template bytecode cache disabled: {e}")
+
+        env = Environment(
+            loader=FileSystemLoader(str(template_dir)),
+            autoescape=select_autoescape(),
+            auto_reload=settings.DEBUG,
+            bytecode_cache=bytecode_cache,
+            cache_size=-1,
+            extensions=[FragmentCacheExtension],
+        )
+        self.templates = Jinja2Templates(env=env)
 
         # Add Flask-compatible functions to global context
         self.templates.env.globals['url_for'] = url_for
         self.templates.env.globals['url_for_static'] = url_for_static
 
+    def precompile(self) -> int:
+        """Compile every template up front; returns the number compiled"""
+        started = time.monotonic()
+        names = self.templates.env.list_templates(extensions=["html"])
+        for name in names:
+            self.templates.env.get_template(name)
+        logger.info(f"Precompiled {len(names)} templates in {time.monotonic() - started:.2f}s")
+        return len(names)
+
     def render_template(self, template_name: str, context: Dict[str, Any] = None):
         """Render a Jinja2 template"""
         if context is None:
             context = {}
 
-        return self.templates.TemplateResponse(template_name, context)
+        with tracer.span("template.render", **{"template.name": template_name}):
+            return self.templates.TemplateResponse(template_name, context)
+
+    def register_routes(self, routes: Iterable[BaseRoute]) -> None:
+        """Build the reverse-routing index used by url_for from an app's routes"""
+        route_index.register(routes)
+        logger.debug(f"Route index holds {len(route_index)} named routes")
 
     def get_url_for(self, name: str, **path_params: Any) -> str:
         """Get URL for a named route (helper for templates)"""
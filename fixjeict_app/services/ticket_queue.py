@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+
+from ..models import Ticket
+
+logger = logging.getLogger(__name__)
+
+# Tickets in these statuses are never handed out by the work queue
+CLOSED_STATUSES = ("Gereed", "Afgemeld")
+
+# Lower rank is served first
+PRIORITY_RANK = {"spoed": 0, "hoog": 1, "normaal": 2, "laag": 3}
+
+priority_order = case(PRIORITY_RANK, value=Ticket.priority, else_=PRIORITY_RANK["normaal"])
+
+
+def claim_ticket(db: Session, ticket_id: int, fixer_id: int) -> bool:
+    """
+    Atomically assign an unclaimed ticket to a fixer.
+
+    The check and the write happen in a single conditional UPDATE, so when
+    several fixers race for the same ticket exactly one of them wins.
+    Returns False if the ticket was already claimed (or does not exist).
+    """
+    claimed = (
+        db.query(Ticket)
+        .filter(Ticket.id == ticket_id, Ticket.fixer_id.is_(None))
+        .update(
+            {Ticket.fixer_id: fixer_id, Ticket.updated_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return claimed == 1
+
+
+def queue_query(db: Session):
+    """Ids of unclaimed, open tickets in the order fixers should get them"""
+    return (
+        db.query(Ticket.id)
+        .filter(Ticket.fixer_id.is_(None), Ticket.status.notin_(CLOSED_STATUSES))
+        .order_by(priority_order, Ticket.created_at, Ticket.id)
+    )
+
+
+def claim_next_ticket(db: Session, fixer_id: int, batch_size: int = 5) -> Optional[Ticket]:
+    """
+    Hand out the next unclaimed ticket by priority and age.
+
+    On PostgreSQL candidate rows are locked with FOR UPDATE SKIP LOCKED so
+    concurrent fixers skip past each other instead of queueing. SQLite has
+    no row locks, so there we walk a small batch of candidates and claim
+    each with the same conditional UPDATE as claim_ticket; a lost race just
+    moves on to the next candidate.
+    """
+    if db.bind.dialect.name == "postgresql":
+        row = queue_query(db).limit(1).with_for_update(skip_locked=True).first()
+        if row is None:
+            db.rollback()
+            return None
+        db.query(Ticket).filter(Ticket.id == row.id).update(
+            {Ticket.fixer_id: fixer_id, Ticket.updated_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+        return db.query(Ticket).filter_by(id=row.id).first()
+
+    while True:
+        candidates: List[int] = [row.id for row in queue_query(db).limit(batch_size).all()]
+        # End the read before writing so SQLite doesn't have to upgrade a stale snapshot
+        db.rollback()
+        if not candidates:
+            return None
+
+        for ticket_id in candidates:
+            if claim_ticket(db, ticket_id, fixer_id):
+                return db.query(Ticket).filter_by(id=ticket_id).first()
+
+        logger.debug(f"Fixer {fixer_id} lost all {len(candidates)} queue candidates, retrying")
@@ -0,0 +1,239 @@
+"""
+Slow-query log.
+
+Statements slower than SLOW_QUERY_MS are logged with their SQL normalized
+(literals replaced by ?, IN lists collapsed), parameter values redacted to
+their types, the route that issued them and the query plan. Entries are
+appended as JSON lines to SLOW_QUERY_LOG, which every worker of both apps
+shares, so the admin portal can aggregate them by fingerprint.
+
+The plan is captured once per fingerprint per process with EXPLAIN QUERY
+PLAN (EXPLAIN on other databases); neither executes the statement.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .metrics import current_route
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_LENGTH = 4000
+MAX_CACHED_PLANS = 500
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+# Expanding IN lists bind one placeholder per value; the count should not split fingerprints
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?+)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def redact(parameters: Any, executemany: bool = False) -> Any:
+    """Parameter shapes without their values, e.g. {'email': 'str'} or ['int', 'int']"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "first": redact(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+class SlowQueryLog:
+    """Records slow statements and aggregates the shared log by fingerprint"""
+
+    def __init__(self):
+        self._plans: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    # Recording
+
+    def record(self, conn, statement: str, parameters: Any, executemany: bool, elapsed: float) -> None:
+        normalized = normalize(statement)[:MAX_SQL_LENGTH]
+        key = fingerprint(normalized)
+        route = current_route() or "background"
+        entry = {
+            "ts": time.time(),
+            "pid": os.getpid(),
+            "ms": round(elapsed * 1000, 2),
+            "fingerprint": key,
+            "sql": normalized,
+            "params": redact(parameters, executemany),
+            "route": route,
+            "plan": self._plan(conn, key, statement, parameters, executemany),
+        }
+        logger.warning(f"Slow query {key} ({entry['ms']:.0f} ms, {route}): {normalized[:200]}")
+        try:
+            self._append(entry)
+        except OSError as e:
+            logger.error(f"Could not write slow query log: {e}")
+
+    def _plan(self, conn, key: str, statement: str, parameters: Any, executemany: bool) -> Optional[List[str]]:
+        if not settings.SLOW_QUERY_EXPLAIN or executemany:
+            return None
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return None
+        if key in self._plans:
+            return self._plans[key]
+
+        sqlite = conn.dialect.name == "sqlite"
+        prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+        # A separate DBAPI cursor: the statement's own cursor still holds its results
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters or ())
+            rows = cursor.fetchall()
+        except Exception as e:
+            logger.debug(f"EXPLAIN failed for slow query {key}: {e}")
+            return None
+        finally:
+            cursor.close()
+
+        if sqlite:
+            # (id, parent, notused, detail): indent each step under its parent
+            depth = {0: -1}
+            plan = []
+            for row in rows:
+                depth[row[0]] = depth.get(row[1], -1) + 1
+                plan.append("  " * depth[row[0]] + str(row[3]))
+        else:
+            plan = [str(row[0]) for row in rows]
+
+        with self._lock:
+            if len(self._plans) >= MAX_CACHED_PLANS:
+                self._plans.pop(next(iter(self._plans)))
+            self._plans[key] = plan
+        return plan
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        path = settings.SLOW_QUERY_LOG
+        path.parent.mkdir(parents=True, exist_ok=True)
+        line = (json.dumps(entry, separators=(",", ":"), default=str) + "\n").encode()
+        # O_APPEND with a single write keeps lines from different workers whole
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            stat = os.fstat(fd)
+        finally:
+            os.close(fd)
+
+        if stat.st_size > settings.SLOW_QUERY_LOG_MAX_MB * 1024 * 1024:
+            try:
+                # Another worker may have rotated it already
+                if os.stat(path).st_ino == stat.st_ino:
+                    os.replace(path, self._rotated_path())
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _rotated_path():
+        return settings.SLOW_QUERY_LOG.with_name(settings.SLOW_QUERY_LOG.name + ".1")
+
+    # Reading
+
+    def entries(self) -> List[Dict[str, Any]]:
+        entries = []
+        for path in (self._rotated_path(), settings.SLOW_QUERY_LOG):
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        return entries
+
+    def top(self, limit: int = 25) -> List[Dict[str, Any]]:
+        """Fingerprints ordered by total time spent in them"""
+        groups: Dict[str, Dict[str, Any]] = {}
+        for entry in self.entries():
+            group = groups.get(entry["fingerprint"])
+            if group is None:
+                group = groups[entry["fingerprint"]] = {
+                    "fingerprint": entry["fingerprint"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "routes": Counter(),
+                }
+            group["count"] += 1
+            group["total_ms"] += entry["ms"]
+            group["max_ms"] = max(group["max_ms"], entry["ms"])
+            group["routes"][entry.get("route") or "background"] += 1
+            # Keep the latest sample of everything else
+            group["last_seen"] = entry["ts"]
+            group["sql"] = entry["sql"]
+            group["params"] = entry.get("params")
+            if entry.get("plan"):
+                group["plan"] = entry["plan"]
+
+        ranked = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)[:limit]
+        for group in ranked:
+            group["avg_ms"] = group["total_ms"] / group["count"]
+            group["last_seen"] = datetime.fromtimestamp(group["last_seen"])
+            group["routes"] = group["routes"].most_common(5)
+            group.setdefault("plan", None)
+        return ranked
+
+    def clear(self) -> None:
+        for path in (self._rotated_path(), settings.SLOW_QUERY_LOG):
+            path.unlink(missing_ok=True)
+        self._plans.clear()
+
+
+# Global slow query log instance
+slow_query_log = SlowQueryLog()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("slow_query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        slow_query_log.record(conn, statement, parameters, executemany, elapsed)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("slow_query_started"):
+        conn.info["slow_query_started"].pop()
+
+
+def log_slow_queries() -> None:
+    """Watch every engine for statements slower than SLOW_QUERY_MS (0 disables)"""
+    if settings.SLOW_QUERY_MS <= 0:
+        return
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
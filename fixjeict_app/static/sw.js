@@ -1,6 +1,26 @@
 const CACHE_NAME = 'fixjeict-v1';
-const STATIC_CACHE = 'fixjeict-static-v1';
+const STATIC_CACHE = 'fixjeict-static';
+const MEDIA_CACHE = 'fixjeict-media';
+// Knowledge base and blog pages; suffixed with the version from /sw-precache.json
+const CONTENT_CACHE_PREFIX = 'fixjeict-content-';
 
+const PRECACHE_URL = '/sw-precache.json';
+const PRECACHE_HEADER = 'X-SW-Precache';
+const PRECACHE_REFRESH_MS = 10 * 60 * 1000;
+const MEDIA_CACHE_ENTRIES = 60;
+
+const QUEUE_DB = 'fixjeict-offline';
+const QUEUE_STORE = 'requests';
+const QUEUE_SYNC_TAG = 'sync-tickets';
+const MESSAGE_PATH = /^\/tickets\/\d+\/message$/;
+// Where require_login redirects an expired session
+const LOGIN_PATH = '/login';
+// Sent to open pages when queued messages wait for the user to log in again
+const QUEUE_LOGIN_MESSAGE = 'queue-login-required';
+// Queried on every pause while a ticket is typed; never cached
+const SUGGEST_PATH = '/knowledge-base/suggest';
+
+// Replaced with the fingerprinted asset list by `python -m fixjeict_app.assets build`
 const STATIC_ASSETS = [
     '/',
     '/static/css/style.css',
@@ -10,101 +30,314 @@ const STATIC_ASSETS = [
     '/static/images/favicon.svg'
 ];
 
-// Install event - cache static assets
+let lastPrecacheRefresh = 0;
+// Running replayQueue() run; sync events and page messages share it
+let replaying = null;
+
+// Install event - cache static assets and the popular articles
 self.addEventListener('install', (event) => {
     event.waitUntil(
         caches.open(STATIC_CACHE)
             .then((cache) => cache.addAll(STATIC_ASSETS))
+            .then(() => refreshPrecache().catch(() => undefined))
             .then(() => self.skipWaiting())
     );
 });
 
-// Activate event - clean up old caches
+// Activate event - clean up old caches and assets no longer in the build
 self.addEventListener('activate', (event) => {
+    const current = new Set(STATIC_ASSETS.map((path) => new URL(path, self.location.origin).href));
+    const keep = new Set([STATIC_CACHE, CACHE_NAME, MEDIA_CACHE]);
     event.waitUntil(
         caches.keys()
             .then((cacheNames) => {
                 return Promise.all(
                     cacheNames.map((cacheName) => {
-                        if (cacheName !== STATIC_CACHE && cacheName !== CACHE_NAME) {
+                        if (!keep.has(cacheName) && !cacheName.startsWith(CONTENT_CACHE_PREFIX)) {
                             return caches.delete(cacheName);
                         }
                     })
                 );
             })
+            // Hashed assets never change, so only entries from older builds are dropped
+            .then(() => caches.open(STATIC_CACHE))
+            .then((cache) => cache.keys().then((requests) => Promise.all(
+                requests
+                    .filter((request) => !current.has(request.url))
+                    .map((request) => cache.delete(request))
+            )))
             .then(() => self.clients.claim())
+            .then(() => replayQueue())
     );
 });
 
-// Fetch event - cache first for static, network first for HTML
 self.addEventListener('fetch', (event) => {
-    const url = new URL(event.request.url);
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+
+    // Ticket messages posted while offline are queued and replayed later
+    if (request.method === 'POST' && MESSAGE_PATH.test(url.pathname)) {
+        event.respondWith(postOrQueue(request));
+        return;
+    }
+
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    // Server-sent event streams must never be cached
+    if (url.pathname.endsWith('/events') || url.pathname === PRECACHE_URL) {
+        return;
+    }
+
+    // Suggestions go straight to the network
+    if (url.pathname === SUGGEST_PATH) {
+        return;
+    }
+
+    // Cached pages and queued messages belong to the user that is logging out
+    if (url.pathname === '/logout') {
+        event.waitUntil(Promise.all([caches.delete(CACHE_NAME), clearQueue()]));
+        return;
+    }
 
     // Cache first for static assets
     if (url.pathname.startsWith('/static/')) {
-        event.respondWith(
-            caches.match(event.request)
-                .then((cachedResponse) => {
-                    if (cachedResponse) {
-                        return cachedResponse;
-                    }
-                    return fetch(event.request)
-                        .then((response) => {
-                            return caches.open(STATIC_CACHE)
-                                .then((cache) => {
-                                    cache.put(event.request, response.clone());
-                                    return response;
-                                });
-                        });
-                })
-        );
+        event.respondWith(cacheFirst(request, STATIC_CACHE));
         return;
     }
 
-    // Network first for HTML pages
-    if (url.pathname.startsWith('/') || url.pathname.startsWith('/tickets/') || url.pathname.startsWith('/dashboard')) {
-        event.respondWith(
-            fetch(event.request)
-                .then((response) => {
-                    const responseClone = response.clone();
-                    caches.open(CACHE_NAME)
-                        .then((cache) => {
-                            cache.put(event.request, responseClone);
-                        });
-                    return response;
-                })
-                .catch(() => {
-                    return caches.match(event.request);
-                })
-        );
+    // Generated image variants are content-addressed, so cache first as well
+    if (url.pathname.startsWith('/media/')) {
+        event.respondWith(cacheFirst(request, MEDIA_CACHE).then((response) => {
+            event.waitUntil(trimCache(MEDIA_CACHE, MEDIA_CACHE_ENTRIES));
+            return response;
+        }));
         return;
     }
 
-    // Default: network first, fallback to cache
-    event.respondWith(
-        fetch(event.request)
-            .then((response) => {
-                const responseClone = response.clone();
-                caches.open(CACHE_NAME)
-                    .then((cache) => {
-                        cache.put(event.request, responseClone);
-                    });
-                return response;
-            })
-            .catch(() => {
-                return caches.match(event.request);
-            })
-    );
+    // Stale-while-revalidate for articles: answer from cache, refresh in the background
+    if (isContentPath(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, request));
+        return;
+    }
+
+    // Network first for everything else (dashboard, tickets), cache as offline fallback
+    event.respondWith(networkFirst(request));
+});
+
+// Pages send this on load; the manifest is refetched at most every PRECACHE_REFRESH_MS
+self.addEventListener('message', (event) => {
+    if (event.data === 'refresh-precache' && Date.now() - lastPrecacheRefresh > PRECACHE_REFRESH_MS) {
+        event.waitUntil(refreshPrecache().catch(() => undefined));
+    } else if (event.data === 'replay-queue') {
+        event.waitUntil(replayQueue());
+    }
 });
 
-// Background sync for offline actions (optional enhancement)
+// Background sync replays queued messages once the connection is back
 self.addEventListener('sync', (event) => {
-    if (event.tag === 'sync-tickets') {
-        event.waitUntil(syncTickets());
+    if (event.tag === QUEUE_SYNC_TAG) {
+        event.waitUntil(replayQueue());
     }
 });
 
-function syncTickets() {
-    // Implement background sync logic here
-    return Promise.resolve();
+function isContentPath(pathname) {
+    return pathname === '/knowledge-base' || pathname.startsWith('/knowledge-base/')
+        || pathname === '/blog' || pathname.startsWith('/blog/');
+}
+
+function cacheFirst(request, cacheName) {
+    return caches.match(request)
+        .then((cachedResponse) => {
+            if (cachedResponse) {
+                return cachedResponse;
+            }
+            return fetch(request)
+                .then((response) => {
+                    if (!response.ok) {
+                        return response;
+                    }
+                    return caches.open(cacheName)
+                        .then((cache) => {
+                            cache.put(request, response.clone());
+                            return response;
+                        });
+                });
+        });
+}
+
+function networkFirst(request) {
+    return fetch(request)
+        .then((response) => {
+            if (response.ok) {
+                const responseClone = response.clone();
+                caches.open(CACHE_NAME)
+                    .then((cache) => cache.put(request, responseClone));
+            }
+            return response;
+        })
+        .catch(() => caches.match(request));
+}
+
+function staleWhileRevalidate(event, request) {
+    const revalidated = currentContentCache()
+        .then((cacheName) => fetch(request).then((response) => {
+            if (response.ok) {
+                const responseClone = response.clone();
+                return caches.open(cacheName)
+                    .then((cache) => cache.put(request, responseClone))
+                    .then(() => response);
+            }
+            return response;
+        }));
+
+    return caches.match(request).then((cachedResponse) => {
+        if (cachedResponse) {
+            event.waitUntil(revalidated.catch(() => undefined));
+            return cachedResponse;
+        }
+        return revalidated;
+    });
+}
+
+// Name of the newest content cache, or one for a fresh install
+function currentContentCache() {
+    return caches.keys().then((cacheNames) => {
+        const content = cacheNames.filter((name) => name.startsWith(CONTENT_CACHE_PREFIX));
+        return content.length ? content[content.length - 1] : `${CONTENT_CACHE_PREFIX}initial`;
+    });
+}
+
+// Fill a cache for the server's current precache version, then drop older versions
+function refreshPrecache() {
+    lastPrecacheRefresh = Date.now();
+    return fetch(PRECACHE_URL, { cache: 'no-store' })
+        .then((response) => response.json())
+        .then((manifest) => {
+            const cacheName = `${CONTENT_CACHE_PREFIX}${manifest.version}`;
+            return caches.has(cacheName).then((exists) => {
+                if (exists) {
+                    return;
+                }
+                return caches.open(cacheName)
+                    .then((cache) => Promise.all(manifest.urls.map((path) => {
+                        const request = new Request(path, { headers: { [PRECACHE_HEADER]: '1' } });
+                        return fetch(request)
+                            .then((response) => response.ok ? cache.put(path, response) : undefined)
+                            .catch(() => undefined);
+                    })))
+                    .then(() => caches.keys())
+                    .then((cacheNames) => Promise.all(
+                        cacheNames
+                            .filter((name) => name.startsWith(CONTENT_CACHE_PREFIX) && name !== cacheName)
+                            .map((name) => caches.delete(name))
+                    ));
+            });
+        });
+}
+
+function trimCache(cacheName, maxEntries) {
+    return caches.open(cacheName).then((cache) => cache.keys().then((requests) => Promise.all(
+        requests.slice(0, Math.max(requests.length - maxEntries, 0)).map((request) => cache.delete(request))
+    )));
+}
+
+// Offline queue (IndexedDB)
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(QUEUE_DB, 1);
+        open.onupgradeneeded = () => open.result.createObjectStore(QUEUE_STORE, { keyPath: 'id', autoIncrement: true });
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+function queueTransaction(mode, action) {
+    return openQueue().then((db) => new Promise((resolve, reject) => {
+        const transaction = db.transaction(QUEUE_STORE, mode);
+        const result = action(transaction.objectStore(QUEUE_STORE));
+        transaction.oncomplete = () => resolve(result && result.result);
+        transaction.onerror = () => reject(transaction.error);
+    }));
+}
+
+function clearQueue() {
+    return queueTransaction('readwrite', (store) => store.clear()).catch(() => undefined);
+}
+
+function postOrQueue(request) {
+    const queued = request.clone();
+    // Raw bytes, so multipart bodies with attachments are replayed unchanged
+    return fetch(request).catch(() => queued.arrayBuffer().then((body) => {
+        const entry = {
+            url: queued.url,
+            body,
+            contentType: queued.headers.get('Content-Type'),
+            queuedAt: Date.now(),
+        };
+        return queueTransaction('readwrite', (store) => store.add(entry))
+            .then(() => self.registration.sync ? self.registration.sync.register(QUEUE_SYNC_TAG) : undefined)
+            .catch(() => undefined)
+            .then(() => offlineResponse(new URL(queued.url).pathname.replace(/\/message$/, '')));
+    }));
+}
+
+function offlineResponse(ticketPath) {
+    const html = `<!DOCTYPE html><html lang="nl"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Offline - FixJeICT</title></head><body>
+<p>U bent offline. Uw bericht is bewaard en wordt verstuurd zodra u weer verbinding heeft.</p>
+<p><a href="${ticketPath}">Terug naar het ticket</a></p>
+</body></html>`;
+    return new Response(html, { status: 202, headers: { 'Content-Type': 'text/html; charset=utf-8' } });
+}
+
+// Replay queued messages in order, one run at a time so nothing is sent twice
+function replayQueue() {
+    if (!replaying) {
+        replaying = replayEntries().finally(() => {
+            replaying = null;
+        });
+    }
+    return replaying;
+}
+
+// Stops at the first network failure, server error or expired session
+function replayEntries() {
+    return queueTransaction('readonly', (store) => store.getAll())
+        .then((entries) => entries.reduce((chain, entry) => chain.then((online) => {
+            if (!online) {
+                return false;
+            }
+            return fetch(entry.url, {
+                method: 'POST',
+                body: entry.body,
+                headers: entry.contentType ? { 'Content-Type': entry.contentType } : {},
+                credentials: 'same-origin',
+            })
+                .then((response) => {
+                    // Keep it for the next attempt when the server is having trouble
+                    if (response.status >= 500) {
+                        return false;
+                    }
+                    // Session expired: keep it until the user has logged in again
+                    if (response.redirected && new URL(response.url).pathname === LOGIN_PATH) {
+                        return notifyPages(QUEUE_LOGIN_MESSAGE).then(() => false);
+                    }
+                    // Sent, or rejected for good (e.g. ticket archived): either way drop it
+                    return queueTransaction('readwrite', (store) => store.delete(entry.id)).then(() => true);
+                }, () => false);
+        }), Promise.resolve(true)))
+        .catch(() => undefined);
+}
+
+function notifyPages(message) {
+    return self.clients.matchAll({ type: 'window' })
+        .then((clients) => clients.forEach((client) => client.postMessage(message)));
 }
@@ -0,0 +1,336 @@
+"""
+Request tracing with OpenTelemetry-compatible spans.
+
+A sampled request gets a root span from TracingMiddleware; SQL statements,
+template rendering, outbound API calls and functions decorated with
+@traced become child spans. Finished spans are batched by a background
+thread and exported as OTLP/JSON, either appended to TRACE_FILE (one
+export request per line) or POSTed to an OTLP/HTTP collector at
+TRACE_OTLP_ENDPOINT.
+
+Sampling is decided once per request (TRACE_SAMPLE_RATE, or the sampled
+flag of an incoming W3C traceparent header). Unsampled requests create no
+spans at all, so tracing costs one random() and a context variable lookup
+per instrumented call.
+"""
+
+import collections
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATUS_ERROR = 2
+
+MAX_STATEMENT_LENGTH = 1000
+EXPORT_BATCH_SIZE = 512
+EXPORT_QUEUE_SIZE = 10000
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """A timed operation; attribute names follow the OpenTelemetry conventions"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "service", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, service: str):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.service = service
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        if self.error:
+            data["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return data
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+# Innermost open span of the current request; None when the request is not sampled
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("fixjeict_current_span", default=None)
+
+
+class Tracer:
+    """Creates spans for sampled requests and exports them in batches"""
+
+    def __init__(self):
+        # deque appends are atomic, so request threads never take a lock here
+        self._queue: "collections.deque[Span]" = collections.deque()
+        self._exporter: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.TRACE_EXPORTER != "none"
+
+    # Spans
+
+    def start_trace(self, name: str, service: str, traceparent: Optional[str] = None) -> Optional[Span]:
+        """Root span for a request, or None when this request is not sampled"""
+        if not self.enabled:
+            return None
+        trace_id, parent_id = None, None
+        match = TRACEPARENT_PATTERN.match(traceparent or "")
+        if match:
+            # Follow the caller's sampling decision so traces stay complete
+            if not int(match.group(3), 16) & 1:
+                return None
+            trace_id, parent_id = match.group(1), match.group(2)
+        elif random.random() >= settings.TRACE_SAMPLE_RATE:
+            return None
+        return Span(name, trace_id or f"{random.getrandbits(128):032x}", parent_id, KIND_SERVER, service)
+
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Child span of the current one; a no-op outside sampled requests"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(name, parent.trace_id, parent.span_id, kind, parent.service)
+        span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if len(self._queue) < EXPORT_QUEUE_SIZE:
+            self._queue.append(span)
+        else:
+            self.dropped += 1
+
+    # Export
+
+    def start(self) -> None:
+        if not self.enabled or self._exporter is not None:
+            return
+        self._stop.clear()
+        self._exporter = threading.Thread(target=self._export_loop, name="trace-export", daemon=True)
+        self._exporter.start()
+
+    def stop(self) -> None:
+        if self._exporter is None:
+            return
+        self._stop.set()
+        self._exporter.join(timeout=10)
+        self._exporter = None
+        # Spans finished since the last batch
+        self.flush()
+
+    def _export_loop(self) -> None:
+        while not self._stop.is_set():
+            self._stop.wait(settings.TRACE_EXPORT_INTERVAL)
+            self.flush()
+
+    def flush(self) -> int:
+        """Export everything queued so far; returns the number of spans sent"""
+        sent = 0
+        while True:
+            batch: List[Span] = []
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return sent
+            try:
+                self._export(batch)
+                sent += len(batch)
+            except Exception as e:
+                logger.warning(f"Dropping {len(batch)} span(s), export failed: {e}")
+
+    def _export(self, batch: List[Span]) -> None:
+        by_service: Dict[str, List[Dict[str, Any]]] = {}
+        for span in batch:
+            by_service.setdefault(span.service, []).append(span.to_otlp())
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _otlp_attribute("service.name", service),
+                            _otlp_attribute("service.version", settings.APP_VERSION),
+                            _otlp_attribute("process.pid", os.getpid()),
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+                }
+                for service, spans in by_service.items()
+            ]
+        }
+
+        if settings.TRACE_EXPORTER == "otlp":
+            import httpx
+
+            response = httpx.post(settings.TRACE_OTLP_ENDPOINT, json=payload, timeout=5)
+            response.raise_for_status()
+        else:
+            settings.TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            line = json.dumps(payload, separators=(",", ":")) + "\n"
+            # One write() per batch so lines from several workers never interleave
+            fd = os.open(settings.TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode())
+            finally:
+                os.close(fd)
+
+
+# Global tracer instance
+tracer = Tracer()
+
+
+def traced(name: str, kind: int = KIND_INTERNAL) -> Callable:
+    """Decorator: run the function inside a span when the request is sampled"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with tracer.span(name, kind, **{"code.function": func.__qualname__}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TracingMiddleware:
+    """Root span per sampled HTTP request, named after the route template"""
+
+    def __init__(self, app: ASGIApp, service: str = "fixjeict"):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        span = tracer.start_trace(scope["method"], self.service, traceparent)
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        span.set("http.request.method", scope["method"])
+        span.set("url.path", scope["path"])
+        token = _current_span.set(span)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.error = f"HTTP {message['status']}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.set("http.route", route)
+            tracer.finish(span)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    span = Span(statement.split(None, 1)[0].upper() if statement else "SQL", parent.trace_id, parent.span_id, KIND_CLIENT, parent.service)
+    span.set("db.system", conn.dialect.name)
+    span.set("db.statement", statement[:MAX_STATEMENT_LENGTH])
+    span.set("db.executemany", bool(executemany))
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        tracer.finish(spans.pop())
+
+
+def _handle_error(exception_context):
+    spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+    if spans:
+        span = spans.pop()
+        span.error = str(exception_context.original_exception)
+        tracer.finish(span)
+
+
+def trace_sqlalchemy() -> None:
+    """A client span per SQL statement on every engine"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
@@ -234,7 +234,7 @@ APP_URL=${APP_URL}
 HOST=0.0.0.0
 PORT=5000
 ADMIN_PORT=5001
-WORKERS=4
+WORKERS=0
 RESEND_API_KEY=${RESEND_API_KEY}
 RESEND_FROM=${RESEND_FROM}
 CLOUDFLARE_API_KEY=${CLOUDFLARE_API_KEY}
@@ -290,7 +290,12 @@ User=root
 WorkingDirectory=/opt/fixjeictv2
 Environment="PATH=/opt/fixjeictv2/venv/bin"
 EnvironmentFile=/opt/fixjeictv2/.env
-ExecStart=/opt/fixjeictv2/venv/bin/uvicorn app:app --host 0.0.0.0 --port 5000 --workers 4
+# Runs the pre-start hook, preloads the app and forks the workers (see fixjeict_app/serve.py)
+ExecStart=/opt/fixjeictv2/venv/bin/python -m fixjeict_app.serve main
+# Graceful worker replacement with the code that is already loaded; restart to deploy
+ExecReload=/bin/kill -HUP $MAINPID
+KillMode=mixed
+TimeoutStopSec=60
 Restart=always
 RestartSec=10
 
@@ -309,7 +314,11 @@ User=root
 WorkingDirectory=/opt/fixjeictv2
 Environment="PATH=/opt/fixjeictv2/venv/bin"
 EnvironmentFile=/opt/fixjeictv2/.env
-ExecStart=/opt/fixjeictv2/venv/bin/uvicorn admin_app:admin_app --host 0.0.0.0 --port 5001
+ExecStartPre=/opt/fixjeictv2/venv/bin/python -m fixjeict_app.precompile
+ExecStart=/opt/fixjeictv2/venv/bin/python -m fixjeict_app.serve admin
+ExecReload=/bin/kill -HUP $MAINPID
+KillMode=mixed
+TimeoutStopSec=60
 Restart=always
 RestartSec=10
 
@@ -389,6 +398,24 @@ else
     print_info "Backup cron job already exists"
 fi
 
+# Add cron job for weekly ticket archival
+CRON_EXISTS=$(crontab -l 2>/dev/null | grep -c "fixjeict_app.archive" || true)
+if [ "$CRON_EXISTS" -eq 0 ]; then
+    (crontab -l 2>/dev/null; echo "30 3 * * 0 cd $INSTALL_DIR && venv/bin/python -m fixjeict_app.archive run >> /var/log/fixjeictv2-archive.log 2>&1") | crontab -
+    print_success "Weekly ticket archival scheduled (Sunday 3:30 AM)"
+else
+    print_info "Archive cron job already exists"
+fi
+
+# Add cron job for weekly cleanup of unreferenced attachment files
+CRON_EXISTS=$(crontab -l 2>/dev/null | grep -c "fixjeict_app.attachments" || true)
+if [ "$CRON_EXISTS" -eq 0 ]; then
+    (crontab -l 2>/dev/null; echo "45 3 * * 0 cd $INSTALL_DIR && venv/bin/python -m fixjeict_app.attachments prune >> /var/log/fixjeictv2-archive.log 2>&1") | crontab -
+    print_success "Weekly attachment cleanup scheduled (Sunday 3:45 AM)"
+else
+    print_info "Attachment cleanup cron job already exists"
+fi
+
 # Summary
 print_header "Installation Complete!"
 
@@ -26,6 +26,9 @@ if [ ! -f ".env" ]; then
     echo "Please edit .env with your configuration."
 fi
 
+# Migrations, static assets and templates, once for both apps
+python -m fixjeict_app.prestart
+
 echo -e "${BLUE}Starting FixJeICT v3 in development mode...${NC}"
 echo -e "${GREEN}Main app:${NC}    http://localhost:5000"
 echo -e "${GREEN}Admin app:${NC}   http://localhost:5001"
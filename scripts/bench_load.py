@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark for the public, client, fixer and admin flows.
+
+Seeds a fresh SQLite database with fixjeict_app.seed (users, tickets,
+messages, auth tokens, articles), starts a local stand-in for the Resend and Cloudflare APIs, and
+drives a weighted mix of scenarios against app and admin_app in-process
+(httpx ASGI transport: no network or server process in the measurement).
+Every request step is reported with throughput, p50/p95/p99 latency and SQL
+statements per request as JSON, so runs can be compared with --compare.
+
+Scenarios:
+  anonymous      home page, knowledge base and blog (index and article)
+  login          magic-link request, link from the stub mailbox, dashboard
+  client         client dashboard, own ticket, post a message
+  create_ticket  new-ticket form and submit
+  fixer          fixer dashboard, assigned ticket, post a message
+  admin          admin dashboard and ticket, user and KB listings
+
+Usage: python scripts/bench_load.py [--shape small] [--users N] [--tickets N] [--articles N]
+           [--concurrency 10] [--duration 30] [--mix anonymous=40,client=20,...]
+           [--seed 1] [--output result.json] [--compare baseline.json [--max-regression 20]]
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_MIX = {
+    "anonymous": 40,
+    "login": 5,
+    "client": 20,
+    "create_ticket": 5,
+    "fixer": 20,
+    "admin": 10,
+}
+
+PRIORITIES = ["laag", "normaal", "normaal", "normaal", "hoog"]
+WORDS = (
+    "printer netwerk wachtwoord router wifi laptop update back-up email outlook "
+    "account server licentie scherm toetsenbord installatie storing verbinding "
+    "beveiliging virus telefoon synchronisatie agenda bestand map rechten"
+).split()
+
+MAGIC_LINK = re.compile(r"/auth/verify/([\w-]+)")
+
+# SQL statement counter of the request being measured; the driver sets it per request
+_statements: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("bench_statements", default=None)
+
+
+# Stand-in for the external APIs
+
+
+class StubAPI(ThreadingHTTPServer):
+    """Answers Resend and Cloudflare calls locally and keeps the last email per recipient"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.lock = threading.Lock()
+        self.mailbox: Dict[str, str] = {}
+        self.calls: Counter = Counter()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/").endswith("/emails"):
+            with self.server.lock:
+                self.server.calls["resend"] += 1
+                for recipient in payload.get("to", []):
+                    self.server.mailbox[recipient] = payload.get("html", "")
+            self._reply({"id": f"bench-{os.urandom(6).hex()}"})
+        else:
+            with self.server.lock:
+                self.server.calls["cloudflare"] += 1
+            self._reply({"success": True, "result": {"id": os.urandom(8).hex()}})
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.calls["cloudflare"] += 1
+        self._reply({"success": True, "result": []})
+
+    def do_DELETE(self):
+        with self.server.lock:
+            self.server.calls["cloudflare"] += 1
+        self._reply({"success": True, "result": {}})
+
+
+# Setup
+
+
+def _configure(workdir: Path) -> None:
+    """Point every setting that touches disk or the outside world at the scratch directory"""
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+        "DEBUG": "false",
+        "AUTO_MIGRATE": "false",
+        "RESEND_API_KEY": "re_bench",
+        "CLOUDFLARE_API_KEY": "cf_bench",
+        "CLOUDFLARE_ACCOUNT_ID": "bench",
+        "CLOUDFLARE_ZONE_ID": "bench",
+        "ADMIN_USERNAME": "bench",
+        "ADMIN_PASSWORD": "bench",
+        "METRICS_DIR": str(workdir / "metrics"),
+        "MEDIA_DIR": str(workdir / "media"),
+        "PROFILE_DIR": str(workdir / "profiles"),
+        "SLOW_QUERY_LOG": str(workdir / "slow_queries.jsonl"),
+        "TEMPLATE_CACHE_DIR": str(workdir / "templates"),
+        "TRACE_EXPORTER": "none",
+    })
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def seed(args) -> dict:
+    """Generate the dataset and pick what the scenarios need from it"""
+    from dataclasses import replace
+
+    from sqlalchemy import select
+
+    from fixjeict_app import migrations
+    from fixjeict_app.database import engine
+    from fixjeict_app.models import BlogPost, Category, KnowledgeBase, Ticket, User
+    from fixjeict_app.seed import SHAPES, Seeder
+
+    migrations.upgrade(engine)
+    overrides = {name: getattr(args, name) for name in ("users", "tickets", "articles", "posts") if getattr(args, name) is not None}
+    counts = Seeder(engine, replace(SHAPES[args.shape], **overrides), seed=args.seed).run()
+
+    with engine.connect() as conn:
+        emails = dict(conn.execute(select(User.id, User.email).where(User.is_active)).all())
+        # Recent tickets are the ones people open and reply to
+        tickets = conn.execute(
+            select(Ticket.id, Ticket.client_id, Ticket.fixer_id).order_by(Ticket.id.desc()).limit(50_000)
+        ).all()
+        kb_slugs = conn.execute(
+            select(KnowledgeBase.slug).where(KnowledgeBase.is_published).order_by(KnowledgeBase.views.desc()).limit(1000)
+        ).scalars().all()
+        post_slugs = conn.execute(select(BlogPost.slug).where(BlogPost.is_published).limit(1000)).scalars().all()
+        category_ids = conn.execute(select(Category.id)).scalars().all()
+
+    tickets_by_client = defaultdict(list)
+    tickets_by_fixer = defaultdict(list)
+    for ticket in tickets:
+        tickets_by_client[ticket.client_id].append(ticket.id)
+        if ticket.fixer_id:
+            tickets_by_fixer[ticket.fixer_id].append(ticket.id)
+
+    return {
+        "counts": counts,
+        "clients": [(emails[client_id], ids) for client_id, ids in tickets_by_client.items() if client_id in emails],
+        "fixers": [(emails[fixer_id], ids) for fixer_id, ids in tickets_by_fixer.items() if fixer_id in emails],
+        "kb_slugs": kb_slugs,
+        "post_slugs": post_slugs,
+        "category_ids": category_ids,
+    }
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# Measurement
+
+
+class Recorder:
+    """Latency, errors and SQL statements per request step"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.statements: Counter = Counter()
+        self.scenarios: Counter = Counter()
+
+    async def request(self, client, step: str, method: str, url: str, **kwargs):
+        counter = [0]
+        token = _statements.set(counter)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception as e:
+            print(f"{step}: {type(e).__name__}: {e}", file=sys.stderr)
+        finally:
+            elapsed = time.perf_counter() - started
+            _statements.reset(token)
+        self.samples[step].append(elapsed * 1000)
+        self.statements[step] += counter[0]
+        if response is None or response.status_code >= 400:
+            self.errors[step] += 1
+        return response
+
+
+class VirtualUser:
+    """One simulated visitor: an anonymous session, a client, a fixer and an admin"""
+
+    def __init__(self, number: int, apps, data: dict, stub: StubAPI, recorder: Recorder, seed_value: int):
+        import httpx
+
+        self.rng = random.Random(seed_value * 1000 + number)
+        self.data = data
+        self.stub = stub
+        self.recorder = recorder
+        self._httpx = httpx
+        app, admin_app = apps
+        self._app = app
+        self.public = self._client(app)
+        self.client = self._client(app)
+        self.fixer = self._client(app)
+        self.admin = self._client(admin_app, auth=("bench", "bench"))
+        self.client_email, self.client_tickets = data["clients"][number % len(data["clients"])]
+        self.fixer_email, self.fixer_tickets = data["fixers"][number % len(data["fixers"])]
+
+    def _client(self, app, **kwargs):
+        # Unhandled exceptions become 500s and count as errors instead of aborting the run
+        transport = self._httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        return self._httpx.AsyncClient(transport=transport, base_url="https://bench.test", follow_redirects=False, **kwargs)
+
+    async def log_in(self, client, email: str, step_prefix: str = "") -> bool:
+        """Magic-link login through the stub mailbox"""
+        request = self.recorder.request if step_prefix else _unrecorded
+        await request(client, f"{step_prefix}request_link", "POST", "/login", data={"email": email})
+        with self.stub.lock:
+            html = self.stub.mailbox.pop(email, "")
+        match = MAGIC_LINK.search(html)
+        if not match:
+            return False
+        response = await request(client, f"{step_prefix}verify", "GET", f"/auth/verify/{match.group(1)}")
+        return response is not None and response.status_code == 303
+
+    async def close(self) -> None:
+        for client in (self.public, self.client, self.fixer, self.admin):
+            await client.aclose()
+
+
+async def _unrecorded(client, step, method, url, **kwargs):
+    return await client.request(method, url, **kwargs)
+
+
+async def scenario_anonymous(vu: VirtualUser) -> None:
+    record = vu.recorder.request
+    await record(vu.public, "public:home", "GET", "/")
+    await record(vu.public, "public:kb_index", "GET", "/knowledge-base")
+    if vu.data["kb_slugs"]:
+        await record(vu.public, "public:kb_article", "GET", f"/knowledge-base/{vu.rng.choice(vu.data['kb_slugs'])}")
+    await record(vu.public, "public:blog_index", "GET", "/blog")
+    if vu.data["post_slugs"]:
+        await record(vu.public, "public:blog_post", "GET", f"/blog/{vu.rng.choice(vu.data['post_slugs'])}")
+
+
+async def scenario_login(vu: VirtualUser) -> None:
+    email, _ = vu.rng.choice(vu.data["clients"])
+    client = vu._client(vu._app)
+    try:
+        if await vu.log_in(client, email, step_prefix="login:"):
+            await vu.recorder.request(client, "login:dashboard", "GET", "/dashboard")
+    finally:
+        await client.aclose()
+
+
+async def scenario_client(vu: VirtualUser) -> None:
+    record = vu.recorder.request
+    await record(vu.client, "client:dashboard", "GET", "/dashboard")
+    ticket_id = vu.rng.choice(vu.client_tickets)
+    await record(vu.client, "client:ticket", "GET", f"/tickets/{ticket_id}")
+    await record(vu.client, "client:message", "POST", f"/tickets/{ticket_id}/message", data={"content": _sentence(vu.rng, 20)})
+
+
+async def scenario_create_ticket(vu: VirtualUser) -> None:
+    record = vu.recorder.request
+    await record(vu.client, "client:new_ticket_form", "GET", "/tickets/new")
+    response = await record(vu.client, "client:new_ticket", "POST", "/tickets/new", data={
+        "title": _sentence(vu.rng, 5),
+        "description": _sentence(vu.rng, 60),
+        "priority": vu.rng.choice(PRIORITIES),
+        "category_id": str(vu.rng.choice(vu.data["category_ids"])),
+    })
+    match = re.search(r"/tickets/(\d+)$", response.headers.get("location", "")) if response is not None else None
+    if match:
+        vu.client_tickets.append(int(match.group(1)))
+
+
+async def scenario_fixer(vu: VirtualUser) -> None:
+    record = vu.recorder.request
+    await record(vu.fixer, "fixer:dashboard", "GET", "/dashboard")
+    if vu.fixer_tickets:
+        ticket_id = vu.rng.choice(vu.fixer_tickets)
+        await record(vu.fixer, "fixer:ticket", "GET", f"/tickets/{ticket_id}")
+        await record(vu.fixer, "fixer:message", "POST", f"/tickets/{ticket_id}/message", data={"content": _sentence(vu.rng, 30)})
+
+
+async def scenario_admin(vu: VirtualUser) -> None:
+    record = vu.recorder.request
+    await record(vu.admin, "admin:dashboard", "GET", "/admin")
+    await record(vu.admin, "admin:tickets", "GET", "/admin/tickets")
+    await record(vu.admin, "admin:users", "GET", "/admin/users")
+    await record(vu.admin, "admin:kb", "GET", "/admin/kb")
+
+
+SCENARIOS = {
+    "anonymous": scenario_anonymous,
+    "login": scenario_login,
+    "client": scenario_client,
+    "create_ticket": scenario_create_ticket,
+    "fixer": scenario_fixer,
+    "admin": scenario_admin,
+}
+
+
+async def drive(args, apps, data: dict, stub: StubAPI, mix: Dict[str, int]) -> dict:
+    app, admin_app = apps
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+
+    async with app.router.lifespan_context(app), admin_app.router.lifespan_context(admin_app):
+        # Warm up: log every virtual user in and run each scenario once, unrecorded
+        warmup = Recorder()
+        users = [VirtualUser(i, apps, data, stub, warmup, args.seed) for i in range(args.concurrency)]
+        for vu in users:
+            if not (await vu.log_in(vu.client, vu.client_email) and await vu.log_in(vu.fixer, vu.fixer_email)):
+                raise SystemExit("Magic-link login failed during setup; is the Resend stub reachable?")
+        for name in names:
+            await SCENARIOS[name](users[0])
+
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+
+        async def run(vu: VirtualUser) -> None:
+            vu.recorder = recorder
+            while time.monotonic() < deadline:
+                name = vu.rng.choices(names, weights)[0]
+                await SCENARIOS[name](vu)
+                recorder.scenarios[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(vu) for vu in users))
+        elapsed = time.perf_counter() - started
+        for vu in users:
+            await vu.close()
+
+    return {"recorder": recorder, "elapsed": elapsed}
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def _summary(samples: List[float], errors: int, statements: int, elapsed: float) -> dict:
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / count, 3) if count else 0.0,
+        "p50_ms": round(_percentile(ordered, 50), 3),
+        "p95_ms": round(_percentile(ordered, 95), 3),
+        "p99_ms": round(_percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if count else 0.0,
+        "queries_per_request": round(statements / count, 2) if count else 0.0,
+    }
+
+
+def report(args, data: dict, stub: StubAPI, mix: Dict[str, int], run: dict) -> dict:
+    import fastapi
+    import sqlalchemy
+
+    recorder, elapsed = run["recorder"], run["elapsed"]
+    all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "generated_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "environment": {
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fastapi": fastapi.__version__,
+            "sqlalchemy": sqlalchemy.__version__,
+        },
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "shape": args.shape,
+            "seed": args.seed,
+            "mix": mix,
+        },
+        "dataset": data["counts"],
+        "external_calls": dict(stub.calls),
+        "scenarios": dict(recorder.scenarios),
+        "total": _summary(all_samples, sum(recorder.errors.values()), sum(recorder.statements.values()), elapsed),
+        "steps": {
+            step: _summary(samples, recorder.errors[step], recorder.statements[step], elapsed)
+            for step, samples in sorted(recorder.samples.items())
+        },
+    }
+
+
+def compare(result: dict, baseline: dict, max_regression: float) -> int:
+    """Print p95 and throughput changes against a baseline; 1 if any exceed max_regression percent"""
+    failed = False
+    rows = [("total", result["total"], baseline.get("total"))]
+    rows += [(step, stats, baseline.get("steps", {}).get(step)) for step, stats in result["steps"].items()]
+    print(f"{'step':<28} {'p95 ms':>10} {'change':>8} {'rps':>9} {'change':>8}", file=sys.stderr)
+    for step, stats, before in rows:
+        if not before or not before.get("p95_ms") or not before.get("rps"):
+            print(f"{step:<28} {stats['p95_ms']:>10} {'new':>8} {stats['rps']:>9} {'new':>8}", file=sys.stderr)
+            continue
+        p95_change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        rps_change = (stats["rps"] - before["rps"]) / before["rps"] * 100
+        regressed = p95_change > max_regression or (step == "total" and -rps_change > max_regression)
+        failed = failed or regressed
+        marker = "  REGRESSION" if regressed else ""
+        print(
+            f"{step:<28} {stats['p95_ms']:>10} {p95_change:>+7.1f}% {stats['rps']:>9} {rps_change:>+7.1f}%{marker}",
+            file=sys.stderr,
+        )
+    return 1 if failed else 0
+
+
+def _parse_mix(value: str) -> Dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, value.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = int(weight)
+    return mix
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shape", default="small", help="Dataset shape of python -m fixjeict_app.seed (small, medium, large)")
+    parser.add_argument("--users", type=int, help="Override the shape's user count")
+    parser.add_argument("--tickets", type=int, help="Override the shape's ticket count")
+    parser.add_argument("--articles", type=int, help="Override the shape's knowledge base article count")
+    parser.add_argument("--posts", type=int, help="Override the shape's blog post count")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users running scenarios at once")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of measured load")
+    parser.add_argument("--mix", type=_parse_mix, default=dict(DEFAULT_MIX), help="Scenario weights, e.g. anonymous=60,admin=0")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the dataset and the scenario choices")
+    parser.add_argument("--output", type=Path, help="Write the JSON result here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="Earlier result to compare against")
+    parser.add_argument("--max-regression", type=float, default=20, help="Allowed p95/throughput regression in percent")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="fixjeict-bench-") as workdir:
+        _configure(Path(workdir))
+        stub = StubAPI()
+        threading.Thread(target=stub.serve_forever, name="bench-stub", daemon=True).start()
+
+        data = seed(args)
+        if not data["clients"] or not data["fixers"]:
+            print("Dataset too small: need clients with tickets and fixers with assigned tickets", file=sys.stderr)
+            return 2
+        print(f"Seeded {data['counts']}", file=sys.stderr)
+
+        import resend
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        from admin_app import admin_app
+        from app import app
+        from fixjeict_app.cloudflare_service import cloudflare_service
+
+        resend.api_url = stub.url
+        cloudflare_service.base_url = stub.url
+        event.listen(Engine, "before_cursor_execute", _count_statement)
+
+        run = asyncio.run(drive(args, (app, admin_app), data, stub, args.mix))
+        stub.shutdown()
+
+    result = report(args, data, stub, args.mix, run)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+    total = result["total"]
+    print(
+        f"{total['requests']} requests in {args.duration:g}s: {total['rps']} req/s, "
+        f"p50 {total['p50_ms']} ms, p95 {total['p95_ms']} ms, p99 {total['p99_ms']} ms, "
+        f"{total['errors']} errors, {total['queries_per_request']} queries/request",
+        file=sys.stderr,
+    )
+    if args.compare:
+        return compare(result, json.loads(args.compare.read_text()), args.max_regression)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
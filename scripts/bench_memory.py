@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Memory comparison of the separate and the combined deployment.
+
+Starts fresh interpreters the way a worker starts, runs the lifespan
+startup and a round of warm-up requests against both apps, and reads the
+memory and open database connections of each process. "separate" is one
+process for app:app plus one for admin_app:admin_app (python -m
+fixjeict_app.serve main / admin), "combined" is a single process for
+combined_app:combined_app serving both. Totals are for --workers main
+workers plus the admin process versus --workers combined workers.
+
+Usage: python scripts/bench_memory.py [--workers 1] [--runs 3] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Process -> the apps it serves
+DEPLOYMENTS = {
+    "separate": {"main": "app:app", "admin": "admin_app:admin_app"},
+    "combined": {"combined": "combined_app:combined_app"},
+}
+
+# Runs in the child: start the app, warm it up, report memory and pooled connections
+WORKER = """
+import asyncio, importlib, json, sys
+import httpx
+from fixjeict_app.config import settings
+module, _, attr = sys.argv[1].partition(":")
+application = getattr(importlib.import_module(module), attr)
+paths = {
+    "main": [(settings.PORT, path) for path in ("/", "/health", "/health/ready", "/login", "/kennisbank", "/blog")],
+    "admin": [(settings.ADMIN_PORT, path) for path in ("/admin/health", "/admin/health/ready", "/admin", "/metrics")],
+}
+
+def memory():
+    values = {}
+    for line in open("/proc/self/status"):
+        if line.startswith(("VmRSS:", "VmHWM:")):
+            values[line.split(":")[0]] = int(line.split()[1])
+    try:
+        for line in open("/proc/self/smaps_rollup"):
+            if line.startswith(("Pss:", "Private_Clean:", "Private_Dirty:")):
+                values[line.split(":")[0]] = int(line.split()[1])
+    except OSError:
+        pass
+    return values
+
+def connections():
+    from fixjeict_app.database import engine, read_engine
+    return sum(e.pool.checkedin() + e.pool.checkedout() for e in {engine, read_engine})
+
+async def main():
+    apps = sys.argv[2].split(",")
+    async with application.router.lifespan_context(application):
+        transport = httpx.ASGITransport(app=application, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, headers={"X-Forwarded-Proto": "https"}) as client:
+            for _ in range(int(sys.argv[3])):
+                for name in apps:
+                    for port, path in paths[name]:
+                        await client.get(f"https://bench.test:{port}{path}")
+        values = memory()
+        print(json.dumps({
+            "rss_kb": values["VmRSS"],
+            "peak_rss_kb": values["VmHWM"],
+            "uss_kb": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+            "pss_kb": values.get("Pss", 0),
+            "db_connections": connections(),
+        }), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def _environment(workdir: Path) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'memory.db'}",
+        "METRICS_DIR": str(workdir / "metrics"),
+        "MEDIA_DIR": str(workdir / "media"),
+        "PROFILE_DIR": str(workdir / "profiles"),
+        "TEMPLATE_CACHE_DIR": str(workdir / "templates"),
+        "TRACE_EXPORTER": "none",
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")])),
+    })
+    return env
+
+
+def measure(target: str, apps: str, requests: int, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER, target, apps, str(requests)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode or not lines:
+        raise RuntimeError(f"{target} failed:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=1, help="Main (or combined) worker processes to total for")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per app; the median is reported")
+    parser.add_argument("--requests", type=int, default=20, help="Warm-up rounds over the sample pages")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {"workers": args.workers, "processes": {}, "totals": {}}
+    with tempfile.TemporaryDirectory(prefix="fixjeict-memory-") as workdir:
+        env = _environment(Path(workdir))
+        subprocess.run([sys.executable, "-m", "fixjeict_app.prestart"], cwd=ROOT, env=env, check=True, capture_output=True)
+
+        for deployment, processes in DEPLOYMENTS.items():
+            total = {"rss_kb": 0, "uss_kb": 0, "db_connections": 0, "processes": 0}
+            for name, target in processes.items():
+                apps = "main,admin" if name == "combined" else name
+                runs = [measure(target, apps, args.requests, env) for _ in range(args.runs)]
+                process = {key: int(statistics.median(run[key] for run in runs)) for key in runs[0]}
+                results["processes"][name] = process
+                count = 1 if name == "admin" else args.workers
+                total["processes"] += count
+                for key in ("rss_kb", "uss_kb", "db_connections"):
+                    total[key] += process[key] * count
+            results["totals"][deployment] = total
+
+    separate, combined = results["totals"]["separate"], results["totals"]["combined"]
+    results["saved_rss_kb"] = separate["rss_kb"] - combined["rss_kb"]
+    results["saved_db_connections"] = separate["db_connections"] - combined["db_connections"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, process in results["processes"].items():
+            print(f"{name:>9}: RSS {process['rss_kb'] / 1024:7.1f} MB (peak {process['peak_rss_kb'] / 1024:.1f}, "
+                  f"private {process['uss_kb'] / 1024:.1f}), {process['db_connections']} DB connections")
+        for deployment, total in results["totals"].items():
+            print(f"{deployment:>9}: {total['processes']} processes, RSS {total['rss_kb'] / 1024:7.1f} MB, "
+                  f"{total['db_connections']} DB connections")
+        print(f"combined saves {results['saved_rss_kb'] / 1024:.1f} MB and "
+              f"{results['saved_db_connections']} DB connections at {args.workers} worker(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+SQLite connection profile benchmark.
+
+Runs a ticket-detail style read/write mix against a throwaway database with
+an increasing number of worker processes, once with the old setup (one
+engine, only WAL + synchronous=NORMAL) and once with the configured PRAGMA
+profile and reader/writer split, and prints throughput for each.
+
+Usage: python scripts/bench_sqlite.py [--workers 1,2,4,8] [--seconds 5] [--json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+VARIANTS = {
+    "baseline": {
+        "SQLITE_SPLIT_READ_WRITE": "false",
+        "SQLITE_CACHE_SIZE_KB": "2000",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_TEMP_STORE": "DEFAULT",
+        "SQLITE_FOREIGN_KEYS": "false",
+    },
+    "tuned": {},
+}
+
+
+def _seed(database_url: str, tickets: int, messages_per_ticket: int) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    from fixjeict_app.database import SessionLocal, dispose_engines, init_db
+    from fixjeict_app.models import Message, Ticket, User
+
+    init_db()
+    db = SessionLocal()
+    client = User(email="bench@example.com", name="Bench Client")
+    db.add(client)
+    db.commit()
+    db.bulk_save_objects(
+        [Ticket(title=f"Ticket {i}", description="Benchmark ticket", client_id=client.id) for i in range(tickets)]
+    )
+    db.commit()
+    db.bulk_save_objects(
+        [
+            Message(ticket_id=t, user_id=client.id, content="Benchmark message " * 10)
+            for t in range(1, tickets + 1)
+            for _ in range(messages_per_ticket)
+        ]
+    )
+    db.commit()
+    db.close()
+    dispose_engines()
+
+
+def _worker(args):
+    database_url, env, seconds, tickets, write_ratio, seed = args
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.update(env)
+
+    from sqlalchemy.exc import OperationalError
+
+    from fixjeict_app.database import SessionLocal
+    from fixjeict_app.models import Message, Ticket
+
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        ticket_id = rng.randint(1, tickets)
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            if rng.random() < write_ratio:
+                db.add(Message(ticket_id=ticket_id, user_id=1, content="Benchmark reply"))
+                db.commit()
+            else:
+                db.query(Ticket).filter_by(id=ticket_id).first()
+                db.query(Message).filter_by(ticket_id=ticket_id, is_internal=False).order_by(Message.created_at).all()
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+            db.rollback()
+        finally:
+            db.close()
+    return latencies, errors
+
+
+def _run(database_url, variant, workers, args):
+    jobs = [
+        (database_url, VARIANTS[variant], args.seconds, args.tickets, args.write_ratio, i)
+        for i in range(workers)
+    ]
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        results = pool.map(_worker, jobs)
+
+    latencies = sorted(l for lats, _ in results for l in lats)
+    errors = sum(e for _, e in results)
+    ops = len(latencies)
+    return {
+        "variant": variant,
+        "workers": workers,
+        "ops": ops,
+        "ops_per_sec": round(ops / args.seconds, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        "p95_ms": round(latencies[int(ops * 0.95) - 1] * 1000, 3) if ops >= 20 else None,
+        "errors": errors,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=10, help="Messages per ticket")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database_url = f"sqlite:///{tmpdir}/bench.db"
+        _seed(database_url, args.tickets, args.messages)
+        for workers in [int(w) for w in args.workers.split(",")]:
+            for variant in VARIANTS:
+                results.append(_run(database_url, variant, workers, args))
+                if not args.json:
+                    r = results[-1]
+                    print(
+                        f"{r['variant']:>8}  workers={r['workers']:<3} {r['ops_per_sec']:>9} ops/s  "
+                        f"p50={r['p50_ms']}ms  p95={r['p95_ms']}ms  errors={r['errors']}"
+                    )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Worker startup benchmark and import-time check.
+
+Starts fresh interpreters that import app (and admin_app) and run their
+lifespan startup, the way a new worker does after the pre-start hook, and
+reports the median time to import and to be ready. A separate run with
+`python -X importtime` lists the slowest imports, and fails (exit 1) when
+a module from --forbid is imported at module load or the import takes
+longer than --max-import-ms, so slow or eager imports show up in CI.
+
+Usage: python scripts/bench_startup.py [--runs 5] [--top 15] [--forbid resend,requests,httpx]
+           [--max-import-ms 0] [--json]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+ROOT = Path(__file__).resolve().parent.parent
+
+APPS = {"main": "app:app", "admin": "admin_app:admin_app"}
+
+# Runs in the child: import the app, run its lifespan startup, report, shut down
+WORKER = """
+import time
+started = time.perf_counter()
+import asyncio, importlib, json, sys
+module, _, attr = sys.argv[1].partition(":")
+application = getattr(importlib.import_module(module), attr)
+imported = time.perf_counter()
+
+async def main():
+    async with application.router.lifespan_context(application):
+        ready = time.perf_counter()
+        print(json.dumps({"import_ms": (imported - started) * 1000, "lifespan_ms": (ready - imported) * 1000}), flush=True)
+
+asyncio.run(main())
+"""
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _environment(workdir: Path) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'startup.db'}",
+        "METRICS_DIR": str(workdir / "metrics"),
+        "MEDIA_DIR": str(workdir / "media"),
+        "PROFILE_DIR": str(workdir / "profiles"),
+        "TEMPLATE_CACHE_DIR": str(workdir / "templates"),
+        "TRACE_EXPORTER": "none",
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")])),
+    })
+    return env
+
+
+def measure_startup(target: str, env: dict) -> dict:
+    """Wall time until the worker is ready, plus the child's own import and lifespan split"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", WORKER, target],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    ready_ms = (time.perf_counter() - started) * 1000
+    _, stderr = process.communicate()
+    if process.returncode or not line:
+        raise RuntimeError(f"{target} failed to start:\n{stderr[-2000:]}")
+    return {"ready_ms": ready_ms, **json.loads(line)}
+
+
+def import_profile(module: str, env: dict) -> list:
+    """(self_us, cumulative_us, depth, name) per module from python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh worker starts per app")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--forbid", default="resend,requests,httpx",
+                        help="Modules that must not be imported when the apps are imported")
+    parser.add_argument("--max-import-ms", type=float, default=0, help="Fail when importing app takes longer (0: no limit)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    forbidden = {name for name in args.forbid.split(",") if name}
+    results = {"apps": {}, "failures": []}
+    with tempfile.TemporaryDirectory(prefix="fixjeict-startup-") as workdir:
+        env = _environment(Path(workdir))
+        # Same state a worker finds after the deploy: schema, assets and template cache built once
+        subprocess.run([sys.executable, "-m", "fixjeict_app.prestart"], cwd=ROOT, env=env, check=True, capture_output=True)
+
+        for name, target in APPS.items():
+            runs = [measure_startup(target, env) for _ in range(args.runs)]
+            module = target.split(":")[0]
+            profile = import_profile(module, env)
+            loaded = {row[3] for row in profile}
+            total_us = next((row[1] for row in profile if row[3] == module and row[2] == 0), 0)
+            # Top-level packages and our own modules, by cumulative time
+            slowest = sorted(
+                (row for row in profile if row[2] <= 1 or row[3].startswith("fixjeict_app")),
+                key=lambda row: row[1], reverse=True,
+            )[:args.top]
+
+            results["apps"][name] = {
+                "ready_ms": round(statistics.median(run["ready_ms"] for run in runs), 1),
+                "import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+                "lifespan_ms": round(statistics.median(run["lifespan_ms"] for run in runs), 1),
+                "importtime_ms": round(total_us / 1000, 1),
+                "modules": len(profile),
+                "slowest_imports": [
+                    {"module": row[3], "cumulative_ms": round(row[1] / 1000, 1), "self_ms": round(row[0] / 1000, 1)}
+                    for row in slowest
+                ],
+            }
+            for module_name in sorted(forbidden & loaded):
+                results["failures"].append(f"{name}: {module_name} is imported at startup")
+            if args.max_import_ms and total_us / 1000 > args.max_import_ms:
+                results["failures"].append(f"{name}: import took {total_us / 1000:.0f} ms (limit {args.max_import_ms:g} ms)")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, app in results["apps"].items():
+            print(f"{name}: ready in {app['ready_ms']} ms (import {app['import_ms']} ms, "
+                  f"lifespan {app['lifespan_ms']} ms), {app['modules']} modules")
+            for entry in app["slowest_imports"]:
+                print(f"    {entry['cumulative_ms']:>8} ms  {entry['module']}")
+        for failure in results["failures"]:
+            print(f"FAIL {failure}")
+    return 1 if results["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Knowledge base suggestion benchmark.
+
+Generates --articles synthetic articles (fixjeict_app.seed), builds the
+in-memory similarity index and measures: the full build, suggestions for
+half-typed ticket texts (as sent while a client types), related articles
+without and with the per-article cache, and re-indexing one saved
+article. Exits 1 when the p99 suggestion latency exceeds --max-p99-ms.
+
+Usage: python scripts/bench_suggest.py [--articles 2000] [--queries 500] [--max-p99-ms 0] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95)], 3),
+        "p99_ms": round(ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def _timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--articles", type=int, default=2000, help="Knowledge base articles to generate")
+    parser.add_argument("--queries", type=int, default=500, help="Suggestion queries to time")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p99-ms", type=float, default=0, help="Fail when the p99 suggestion takes longer (0: no limit)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fixjeict-suggest-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/suggest.db"
+    os.environ["TEMPLATE_CACHE_DIR"] = f"{workdir}/templates"
+    os.environ["DEBUG"] = "false"
+
+    from fixjeict_app import migrations
+    from fixjeict_app.database import SessionLocal, engine
+    from fixjeict_app.models import KnowledgeBase
+    from fixjeict_app.seed import Shape, Seeder
+    from fixjeict_app.services.kb_index import kb_index
+
+    migrations.upgrade(engine)
+    Seeder(engine, Shape(users=1, tickets=0, articles=args.articles, posts=0, leads=0), seed=args.seed).run()
+
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        build_ms = _timed(kb_index.load, db)
+        articles = db.query(KnowledgeBase).filter_by(is_published=True).all()
+
+        # A ticket title typed up to somewhere in a word, sometimes with the first words of a description
+        queries = []
+        for _ in range(args.queries):
+            article = rng.choice(articles)
+            text = article.title
+            if rng.random() < 0.5:
+                text += " " + " ".join(article.content.split()[3:3 + rng.randint(3, 30)])
+            queries.append(text[:rng.randint(max(len(text) // 2, 3), len(text))])
+        suggest_ms, hits = [], 0
+        for query in queries:
+            started = time.perf_counter()
+            suggestions = kb_index.suggest(db, query, 5)
+            suggest_ms.append((time.perf_counter() - started) * 1000)
+            hits += bool(suggestions)
+
+        sample = [rng.choice(articles).id for _ in range(min(args.queries, len(articles)))]
+        kb_index._related.clear()
+        related_cold_ms = [_timed(kb_index.related, db, article_id, 4) for article_id in sample]
+        related_warm_ms = [_timed(kb_index.related, db, article_id, 4) for article_id in sample]
+
+        # Re-index after an edit, then the first query pays for the norm refresh
+        edited = rng.choice(articles)
+        edited.content += " Extra alinea na een wijziging."
+        upsert_ms = _timed(kb_index.upsert, edited)
+        first_query_ms = _timed(kb_index.suggest, db, queries[0], 5)
+
+        index_bytes = sum(
+            postings.itemsize * len(postings) + weights.itemsize * len(weights)
+            for postings, weights in zip(kb_index._postings, kb_index._weights)
+        )
+        results = {
+            "articles": len(kb_index),
+            "terms": len(kb_index._terms),
+            "posting_bytes": index_bytes,
+            "build_ms": round(build_ms, 1),
+            "suggest": {**_percentiles(suggest_ms), "with_results": round(hits / len(queries), 3)},
+            "related_cold": _percentiles(related_cold_ms),
+            "related_cached": _percentiles(related_warm_ms),
+            "upsert_ms": round(upsert_ms, 3),
+            "first_query_after_upsert_ms": round(first_query_ms, 3),
+        }
+    finally:
+        db.close()
+
+    failed = bool(args.max_p99_ms and results["suggest"]["p99_ms"] > args.max_p99_ms)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['articles']} articles, {results['terms']} terms, "
+              f"{results['posting_bytes'] / 1024:.0f} KB postings, built in {results['build_ms']} ms")
+        for name in ("suggest", "related_cold", "related_cached"):
+            entry = results[name]
+            print(f"{name:>15}: p50 {entry['p50_ms']} ms, p95 {entry['p95_ms']} ms, p99 {entry['p99_ms']} ms")
+        print(f"{results['suggest']['with_results']:.0%} of the queries had suggestions; "
+              f"re-indexing one article took {results['upsert_ms']} ms "
+              f"(+{results['first_query_after_upsert_ms']} ms on the next query)")
+        if failed:
+            print(f"FAIL suggest p99 {results['suggest']['p99_ms']} ms > {args.max_p99_ms:g} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
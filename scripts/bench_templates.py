@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Template rendering benchmark.
+
+Measures a cold start (compile from source), a fresh worker loading the
+bytecode cache, warm renders from the in-memory template cache, warm
+renders with {% cache %} fragments served from the fragment cache, and
+the cost of generating list-page links with url_for.
+
+Usage: python scripts/bench_templates.py [--renders 200] [--testimonials 50] [--posts 3] [--links 250] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _context(testimonials: int, posts: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "request": SimpleNamespace(url=SimpleNamespace(path="/")),
+        "session": {},
+        "get_flashed_messages": lambda **kwargs: [],
+        "featured_posts": [
+            SimpleNamespace(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                excerpt=None,
+                content="Lorem ipsum dolor sit amet " * 20,
+                image_url=None,
+                published_at=now,
+                created_at=now,
+            )
+            for i in range(posts)
+        ],
+        "posts": [],
+        "testimonials": [
+            SimpleNamespace(name=f"Klant {i}", company="Bedrijf BV", content="Top service! " * 10, rating=5)
+            for i in range(testimonials)
+        ],
+    }
+
+
+def _app():
+    """The public app's route table, without importing app.py and its middleware"""
+    from fastapi import FastAPI
+    from fastapi.staticfiles import StaticFiles
+
+    from fixjeict_app.config import settings
+    from fixjeict_app.routers import admin, auth, public, tickets
+
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=str(settings.BASE_DIR / "fixjeict_app" / "static")), name="static")
+    for module in (public, auth, tickets, admin):
+        app.include_router(module.router)
+    return app
+
+
+def _new_service(cache_dir: str, fragment_seconds: int):
+    """A TemplateService as a freshly started worker would build it"""
+    from fixjeict_app.config import settings
+    from fixjeict_app.services import template_service as module
+
+    settings.TEMPLATE_CACHE_DIR = Path(cache_dir)
+    settings.TEMPLATE_FRAGMENT_CACHE_SECONDS = fragment_seconds
+    module.fragment_cache.invalidate()
+    return module.TemplateService()
+
+
+def _time(fn, repeat: int = 1) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--renders", type=int, default=200, help="Warm renders per measurement")
+    parser.add_argument("--testimonials", type=int, default=50)
+    parser.add_argument("--posts", type=int, default=3)
+    parser.add_argument("--links", type=int, default=250, help="Rows on the simulated list page")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    context = _context(args.testimonials, args.posts)
+    results = {}
+
+    from fixjeict_app.services.template_service import route_index, url_for
+
+    app = _app()
+    route_index.register(app.routes)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = _new_service(cache_dir, 0)
+        results["cold_precompile_ms"] = _time(service.precompile)[0]
+
+        service = _new_service(cache_dir, 0)
+        results["bytecode_precompile_ms"] = _time(service.precompile)[0]
+
+        template = service.templates.env.get_template("index.html")
+        results["first_render_ms"] = _time(lambda: template.render(context))[0]
+        results["warm_render_ms"] = statistics.median(_time(lambda: template.render(context), args.renders))
+
+        service = _new_service(cache_dir, 300)
+        template = service.templates.env.get_template("index.html")
+        template.render(context)
+        results["fragment_cached_render_ms"] = statistics.median(
+            _time(lambda: template.render(context), args.renders)
+        )
+
+    # An admin ticket list with --links rows, each linking to detail and edit pages
+    ids = range(args.links)
+    results["url_for_list_page_ms"] = statistics.median(
+        _time(lambda: [(url_for("admin_ticket_detail", id=i), url_for("admin_ticket_edit", id=i)) for i in ids], 20)
+    )
+    results["url_path_for_list_page_ms"] = statistics.median(
+        _time(
+            lambda: [
+                (app.url_path_for("admin_ticket_detail", ticket_id=i), app.url_path_for("admin_ticket_edit", ticket_id=i))
+                for i in ids
+            ],
+            20,
+        )
+    )
+
+    results = {key: round(value, 3) for key, value in results.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for key, value in results.items():
+            print(f"{key:<28} {value:>10} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tracing overhead benchmark.
+
+Drives a request that runs a few SQL statements against SQLite and renders
+a template, directly through the ASGI interface, first without tracing and
+then with TracingMiddleware at several sample rates. Reports the median
+request time and the overhead against the untraced baseline; span export
+runs in a background thread in the apps, so it is timed separately.
+
+Usage: python scripts/bench_tracing.py [--requests 2000] [--queries 5] [--rates 0,0.01,1] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _app(queries: int):
+    from fastapi import FastAPI
+    from fastapi.responses import HTMLResponse
+    from jinja2 import Environment
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import StaticPool
+
+    from fixjeict_app.tracing import tracer
+
+    # One shared in-memory database for the endpoint's worker threads
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE tickets (id INTEGER PRIMARY KEY, title TEXT)"))
+        conn.execute(text("INSERT INTO tickets (title) VALUES " + ",".join(f"('Ticket {i}')" for i in range(50))))
+    template = Environment().from_string("<ul>{% for t in tickets %}<li>{{ t.title }}</li>{% endfor %}</ul>")
+
+    app = FastAPI()
+
+    @app.get("/tickets/{ticket_id}")
+    def ticket_detail(ticket_id: int):
+        with engine.connect() as conn:
+            tickets = []
+            for _ in range(queries):
+                tickets = conn.execute(text("SELECT id, title FROM tickets WHERE id <= :id"), {"id": ticket_id}).all()
+        with tracer.span("template.render", **{"template.name": "bench.html"}):
+            return HTMLResponse(template.render(tickets=tickets))
+
+    return app
+
+
+async def _request(app) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/tickets/25",
+        "raw_path": b"/tickets/25",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def _measure(apps: dict, rates: dict, requests: int, rounds: int = 10) -> dict:
+    """Median request time per configuration; rounds are interleaved so drift hits all of them"""
+    from fixjeict_app.config import settings
+
+    samples = {name: [] for name in apps}
+    for round_number in range(rounds + 1):
+        for name, app in apps.items():
+            settings.TRACE_SAMPLE_RATE = rates.get(name, 0.0)
+            for _ in range(max(requests // rounds, 1)):
+                start = time.perf_counter()
+                await _request(app)
+                # The first round only warms up
+                if round_number:
+                    samples[name].append((time.perf_counter() - start) * 1000)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000, help="Timed requests per measurement")
+    parser.add_argument("--queries", type=int, default=5, help="SQL statements per request")
+    parser.add_argument("--rates", default="0,0.01,1", help="Comma-separated sample rates")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    from fixjeict_app.config import settings
+    from fixjeict_app.tracing import TracingMiddleware, trace_sqlalchemy, tracer
+
+    results = {}
+    with tempfile.TemporaryDirectory() as trace_dir:
+        settings.TRACE_EXPORTER = "file"
+        settings.TRACE_FILE = Path(trace_dir) / "traces.jsonl"
+        trace_sqlalchemy()
+
+        app = _app(args.queries)
+        traced_app = TracingMiddleware(app, service="bench")
+        rates = {f"rate_{float(value):g}": float(value) for value in args.rates.split(",")}
+        apps = {"untraced": app, **{name: traced_app for name in rates}}
+        medians = asyncio.run(_measure(apps, rates, args.requests))
+
+        baseline = medians.pop("untraced")
+        results["untraced_ms"] = baseline
+        for name, median in medians.items():
+            results[f"{name}_ms"] = median
+            results[f"{name}_overhead_percent"] = (median - baseline) / baseline * 100
+
+        start = time.perf_counter()
+        spans = tracer.flush()
+        if spans:
+            results["export_us_per_span"] = (time.perf_counter() - start) * 1_000_000 / spans
+
+    results = {key: round(value, 3) for key, value in results.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for key, value in results.items():
+            print(f"{key:<32} {value:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
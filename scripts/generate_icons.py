@@ -1,24 +1,44 @@
 #!/usr/bin/env python3
-"""Generate PWA icons for FixJeICT"""
-
-import base64
-
-# Simple 1x1 transparent PNG (minimal valid PNG)
-TRANSPARENT_PNG_1x1 = base64.b64decode(
-    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=='
-)
-
-def create_icon(size, color='#667eea'):
-    """Create a simple colored square icon"""
-    # For now, we'll create a minimal PNG
-    # In production, these should be replaced with proper icons
-    filename = f'/home/engine/project/fixjeict_app/static/images/icon-{size}.png'
-    with open(filename, 'wb') as f:
-        f.write(TRANSPARENT_PNG_1x1)
-    print(f"Created placeholder icon: {filename}")
-
-if __name__ == '__main__':
-    create_icon(192)
-    create_icon(512)
-    print("\nNote: These are placeholder icons. Replace them with proper PWA icons.")
-    print("Recommended: Use a service like https://realfavicongenerator.net/")
+"""
+Generate PWA icons for FixJeICT from a source image.
+
+Writes square PNG icons (transparent padding for non-square sources) to
+fixjeict_app/static/images/icon-<size>.png. Needs Pillow. Run
+`python -m fixjeict_app.assets build` afterwards so the fingerprinted
+copies and the service worker pick up the new icons.
+
+Usage: python scripts/generate_icons.py logo.png [--sizes 192 512]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixjeict_app.assets import STATIC_DIR  # noqa: E402
+from fixjeict_app.services import image_service  # noqa: E402
+
+ICON_DIR = STATIC_DIR / "images"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("source", type=Path, help="Source image, ideally square and at least 512px")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[192, 512])
+    args = parser.parse_args()
+
+    if not image_service.image_service.available:
+        print("Pillow is not installed: pip install Pillow", file=sys.stderr)
+        return 1
+
+    ICON_DIR.mkdir(parents=True, exist_ok=True)
+    for size in args.sizes:
+        dest = ICON_DIR / f"icon-{size}.png"
+        image_service.render_icon(args.source, size, dest)
+        print(f"Created icon: {dest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
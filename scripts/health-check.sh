@@ -40,29 +40,59 @@ fi
 
 echo
 
-# Check HTTP responses
-echo "Checking HTTP endpoints..."
-
-if [ "$MAIN_SERVICE" = true ]; then
-    MAIN_HTTP=$(curl -s -o /dev/null -w "%{http_code}" "${MAIN_URL}/health" --max-time 5 || echo "000")
-    if [ "$MAIN_HTTP" = "200" ]; then
-        echo -e "${GREEN}✓${NC} Main app responding (HTTP $MAIN_HTTP)"
-    else
-        echo -e "${RED}✗${NC} Main app not responding (HTTP $MAIN_HTTP)"
+# Check readiness (structured JSON from /health/ready)
+echo "Checking readiness..."
+
+# Prints one line per check and returns 1 when the endpoint is down or a check fails
+check_ready() {
+    local name="$1" url="$2" body
+    body=$(curl -s --max-time 10 "$url") || body=""
+    if [ -z "$body" ]; then
+        echo -e "${RED}✗${NC} $name not responding ($url)"
+        return 1
     fi
+    echo "$body" | python3 -c '
+import json, sys
+marks = {"ok": "\033[0;32m✓\033[0m", "warn": "\033[1;33m⚠\033[0m", "fail": "\033[0;31m✗\033[0m"}
+result = json.load(sys.stdin)
+print(marks.get(result["status"], "?"), sys.argv[1] + ":", result["status"])
+for name, check in result["checks"].items():
+    details = ", ".join("%s=%s" % item for item in check.items() if item[0] != "status")
+    print("   ", marks.get(check["status"], "?"), name + ":", details)
+sys.exit(1 if result["status"] == "fail" else 0)
+' "$name"
+}
+
+MAIN_READY=false
+ADMIN_READY=false
+if [ "$MAIN_SERVICE" = true ]; then
+    check_ready "Main app" "${MAIN_URL}/health/ready" && MAIN_READY=true
 else
-    echo -e "${YELLOW}⊘${NC} Main app service not running, skipping HTTP check"
+    echo -e "${YELLOW}⊘${NC} Main app service not running, skipping readiness check"
 fi
 
 if [ "$ADMIN_SERVICE" = true ]; then
-    ADMIN_HTTP=$(curl -s -o /dev/null -w "%{http_code}" "${ADMIN_URL}/admin/health" --max-time 5 || echo "000")
-    if [ "$ADMIN_HTTP" = "200" ]; then
-        echo -e "${GREEN}✓${NC} Admin portal responding (HTTP $ADMIN_HTTP)"
-    else
-        echo -e "${RED}✗${NC} Admin portal not responding (HTTP $ADMIN_HTTP)"
-    fi
+    check_ready "Admin portal" "${ADMIN_URL}/admin/health/ready" && ADMIN_READY=true
+else
+    echo -e "${YELLOW}⊘${NC} Admin service not running, skipping readiness check"
+fi
+
+echo
+
+# Request metrics (aggregated over all workers of both apps)
+echo "Checking request metrics..."
+METRICS_AUTH=()
+if [ -n "$METRICS_TOKEN" ]; then
+    METRICS_AUTH=(-H "Authorization: Bearer $METRICS_TOKEN")
+fi
+METRICS=$(curl -s "${METRICS_AUTH[@]}" "${MAIN_URL}/metrics" --max-time 5)
+if echo "$METRICS" | grep -q "^fixjeict_http_requests_total"; then
+    TOTAL=$(echo "$METRICS" | awk '/^fixjeict_http_requests_total/ {sum += $NF} END {print sum + 0}')
+    ERRORS=$(echo "$METRICS" | awk '/^fixjeict_http_requests_total.*status="5/ {sum += $NF} END {print sum + 0}')
+    IN_FLIGHT=$(echo "$METRICS" | awk '/^fixjeict_http_requests_in_flight/ {sum += $NF} END {print sum + 0}')
+    echo -e "${GREEN}✓${NC} Requests: $TOTAL total, $ERRORS server errors, $IN_FLIGHT in flight"
 else
-    echo -e "${YELLOW}⊘${NC} Admin service not running, skipping HTTP check"
+    echo -e "${YELLOW}⊘${NC} Metrics not available at ${MAIN_URL}/metrics"
 fi
 
 echo
@@ -103,7 +133,7 @@ echo
 echo "Checking recent backups..."
 BACKUP_DIR="/var/backups/fixjeictv2"
 if [ -d "$BACKUP_DIR" ]; then
-    LATEST_BACKUP=$(ls -t "$BACKUP_DIR"/fixjeict_*.db 2>/dev/null | head -1)
+    LATEST_BACKUP=$(ls -t "$BACKUP_DIR"/fixjeict_*.json 2>/dev/null | head -1)
     if [ -n "$LATEST_BACKUP" ]; then
         BACKUP_AGE=$((($(date +%s) - $(stat -c %Y "$LATEST_BACKUP")) / 86400))
         BACKUP_SIZE=$(du -h "$LATEST_BACKUP" | cut -f1)
@@ -123,7 +153,7 @@ echo
 
 # Summary
 echo "=========================="
-if [ "$MAIN_SERVICE" = true ] && [ "$ADMIN_SERVICE" = true ]; then
+if [ "$MAIN_READY" = true ] && [ "$ADMIN_READY" = true ]; then
     echo -e "${GREEN}Overall Status: HEALTHY${NC}"
     exit 0
 else
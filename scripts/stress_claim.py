@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for ticket claiming.
+
+Spawns several worker processes that race each other through the fixer work
+queue and through direct claims on the same tickets, then verifies that no
+ticket was handed to more than one fixer.
+
+Usage: python scripts/stress_claim.py [--workers 8] [--tickets 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+import multiprocessing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _worker(args):
+    database_url, fixer_id, ticket_ids, seed = args
+    os.environ["DATABASE_URL"] = database_url
+
+    from fixjeict_app.database import SessionLocal
+    from fixjeict_app.services.ticket_queue import claim_next_ticket, claim_ticket
+
+    rng = random.Random(seed)
+    won = []
+    db = SessionLocal()
+    try:
+        # Half of the workers hammer direct claims on random tickets first
+        if fixer_id % 2:
+            for ticket_id in rng.sample(ticket_ids, k=len(ticket_ids) // 4):
+                if claim_ticket(db, ticket_id, fixer_id):
+                    won.append(ticket_id)
+
+        while True:
+            ticket = claim_next_ticket(db, fixer_id)
+            if ticket is None:
+                break
+            won.append(ticket.id)
+    finally:
+        db.close()
+    return fixer_id, won
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--tickets", type=int, default=500)
+    parser.add_argument("--database-url", help="Defaults to a throwaway SQLite file")
+    args = parser.parse_args()
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{tmpdir.name}/stress.db"
+    os.environ["DATABASE_URL"] = database_url
+
+    from fixjeict_app.database import SessionLocal, init_db
+    from fixjeict_app.models import Ticket, User
+
+    init_db()
+    db = SessionLocal()
+    client = User(email="stress-client@example.com", name="Stress Client")
+    fixers = [
+        User(email=f"stress-fixer-{i}@example.com", name=f"Fixer {i}", role="fixer")
+        for i in range(args.workers)
+    ]
+    db.add_all([client] + fixers)
+    db.commit()
+    priorities = ["laag", "normaal", "hoog", "spoed"]
+    db.add_all(
+        Ticket(
+            title=f"Stress ticket {i}",
+            description="Generated by stress_claim.py",
+            client_id=client.id,
+            priority=priorities[i % len(priorities)],
+        )
+        for i in range(args.tickets)
+    )
+    db.commit()
+    ticket_ids = [row.id for row in db.query(Ticket.id).all()]
+    fixer_ids = [fixer.id for fixer in fixers]
+    db.close()
+
+    jobs = [(database_url, fixer_id, ticket_ids, fixer_id) for fixer_id in fixer_ids]
+    # Spawn fresh interpreters so no pooled SQLite connection crosses a fork
+    with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+        results = pool.map(_worker, jobs)
+
+    claims = Counter(ticket_id for _, won in results for ticket_id in won)
+    doubles = [ticket_id for ticket_id, count in claims.items() if count > 1]
+
+    db = SessionLocal()
+    assigned = dict(db.query(Ticket.id, Ticket.fixer_id).all())
+    db.close()
+    winners = {ticket_id: fixer_id for fixer_id, won in results for ticket_id in won}
+    mismatched = [t for t, f in winners.items() if assigned.get(t) != f]
+    unclaimed = [t for t, f in assigned.items() if f is None]
+
+    for fixer_id, won in results:
+        print(f"fixer {fixer_id}: {len(won)} tickets")
+    print(f"claimed: {len(claims)}/{len(ticket_ids)}")
+    print(f"double assignments: {len(doubles)}")
+    print(f"winner/database mismatches: {len(mismatched)}")
+    print(f"left unclaimed: {len(unclaimed)}")
+
+    if tmpdir:
+        tmpdir.cleanup()
+    return 1 if doubles or mismatched or unclaimed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())